@@ -0,0 +1,275 @@
+import glob
+import heapq
+import os
+import re
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import click
+from flask import current_app
+from sqlalchemy import (Column, Index, Integer, MetaData, PrimaryKeyConstraint, Table, create_engine, delete, func,
+                        insert, select)
+
+from branches import branch_dir
+from models import db
+from models.inventory import Inventory
+from models.photos import Photo
+from models.registration_status import RegistrationStatus
+from models.claims import Claim
+from models.approvals import Approval
+from models.work_status import WorkStatus, WorkItem
+from models.delivery import Delivery
+from snapshots import VehicleSnapshot, mark_vehicle_changed
+
+# Vehicles delivered long ago move, with every related row, into one SQLite
+# file per delivery year (archive-2024.db, ...) next to the main database.
+# The working tables then hold only active vehicles. Each batch is copied
+# into the archive first and deleted from the working tables second, so an
+# interrupted run leaves rows in both places and the next run finishes it.
+#
+# SQLite hands out the ids of deleted rows again, so an archived photo, claim
+# or work item id alone may name rows of two different vehicles. Archived
+# related rows are keyed by (inventory_id, id) instead; inventory ids stay
+# unique because the newest vehicle never leaves the working tables, and a
+# copy that would clash with a different archived vehicle fails.
+
+ARCHIVE_PATTERN = re.compile(r'archive-(\d{4})\.db$')
+
+archive_metadata = MetaData()
+
+
+class ArchiveConflictError(RuntimeError):
+    """An archive file already holds a different vehicle under the same inventory id"""
+
+
+def _archive_table(model, *indexed):
+    """Copy a model's columns without uniqueness or foreign keys
+
+    A returning car gets a new inventory row under the same vehicle number,
+    so archived rows must be free to repeat it. Rows other than the vehicle
+    itself are keyed by (inventory_id, id); work items get an inventory_id
+    column for that.
+    """
+    table = model.__table__
+    columns = [Column(column.name, column.type) for column in table.columns]
+    if model is Inventory:
+        key = ('id',)
+    else:
+        key = ('inventory_id', 'id')
+        if 'inventory_id' not in table.columns:
+            columns.append(Column('inventory_id', Integer))
+    archived = Table(table.name, archive_metadata, *columns, PrimaryKeyConstraint(*key))
+    for column in indexed:
+        Index(f'ix_{table.name}_{column}', archived.c[column])
+    return archived
+
+
+ARCHIVE_TABLES = {
+    Inventory: _archive_table(Inventory, 'vehicle_number'),
+    Photo: _archive_table(Photo, 'inventory_id'),
+    RegistrationStatus: _archive_table(RegistrationStatus, 'inventory_id'),
+    Claim: _archive_table(Claim, 'inventory_id'),
+    Approval: _archive_table(Approval, 'inventory_id'),
+    WorkStatus: _archive_table(WorkStatus, 'inventory_id'),
+    WorkItem: _archive_table(WorkItem, 'work_status_id'),
+    Delivery: _archive_table(Delivery, 'inventory_id'),
+}
+
+_engines = {}
+
+
+def archive_dir():
+    directory = current_app.config.get('ARCHIVE_DIR')
+    if not directory:
+        directory = os.path.dirname(db.session.get_bind().url.database or '') or current_app.instance_path
+    return branch_dir(directory)
+
+
+def archive_path(year):
+    return os.path.join(archive_dir(), f'archive-{year}.db')
+
+
+def archive_paths():
+    """Existing archive files, newest year first"""
+    paths = [path for path in glob.glob(os.path.join(archive_dir(), 'archive-*.db')) if ARCHIVE_PATTERN.search(path)]
+    return sorted(paths, reverse=True)
+
+
+def archive_engine(path):
+    engine = _engines.get(path)
+    if engine is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        engine = _engines[path] = create_engine(f'sqlite:///{path}')
+        archive_metadata.create_all(engine)
+        _add_missing_columns(engine)
+    return engine
+
+
+def _add_missing_columns(engine):
+    """Give archive files written by an older schema the columns added since"""
+    with engine.begin() as conn:
+        for table in archive_metadata.sorted_tables:
+            existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table.name})')}
+            for column in table.columns:
+                if column.name not in existing:
+                    conn.exec_driver_sql(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}')
+
+
+def _rows(statement):
+    return [dict(row._mapping) for row in db.session.execute(statement)]
+
+
+def _copy_to_archive(path, vehicle_ids):
+    """Write vehicles and their related rows into an archive file, replacing earlier partial copies"""
+    vehicles = _rows(select(Inventory.__table__).where(Inventory.id.in_(vehicle_ids)))
+    batches = [
+        (Inventory, vehicles),
+        (WorkItem, _rows(select(WorkItem.__table__, WorkStatus.inventory_id)
+                         .join(WorkStatus, WorkStatus.id == WorkItem.work_status_id)
+                         .where(WorkStatus.inventory_id.in_(vehicle_ids)))),
+    ]
+    for model in (Photo, RegistrationStatus, Claim, Approval, WorkStatus, Delivery):
+        batches.append((model, _rows(select(model.__table__).where(model.inventory_id.in_(vehicle_ids)))))
+
+    archived = ARCHIVE_TABLES[Inventory]
+    with archive_engine(path).begin() as conn:
+        earlier = dict(conn.execute(
+            select(archived.c.id, archived.c.serial_number).where(archived.c.id.in_(vehicle_ids))).all())
+        for vehicle in vehicles:
+            if vehicle['id'] in earlier and earlier[vehicle['id']] != vehicle['serial_number']:
+                raise ArchiveConflictError(
+                    f'{os.path.basename(path)} already holds serial {earlier[vehicle["id"]]} under inventory id '
+                    f'{vehicle["id"]}, which now belongs to serial {vehicle["serial_number"]}')
+        # The same vehicles copied by an interrupted run: drop that copy and write them again
+        if earlier:
+            for model, table in ARCHIVE_TABLES.items():
+                key = table.c.id if model is Inventory else table.c.inventory_id
+                conn.execute(delete(table).where(key.in_(list(earlier))))
+        for model, rows in batches:
+            if rows:
+                conn.execute(insert(ARCHIVE_TABLES[model]), rows)
+
+
+def archive_delivered(days, batch_size=200, log=print):
+    """Move vehicles delivered more than ``days`` ago into the per-year archive files"""
+    cutoff = datetime.now() - timedelta(days=days)
+    # The newest serial number stays behind so new check-ins keep counting up from it
+    newest = db.session.execute(select(func.max(Inventory.serial_number))).scalar()
+    archived = 0
+    while True:
+        batch = db.session.execute(
+            select(Inventory.id, Delivery.delivery_date)
+            .join(Delivery, Delivery.inventory_id == Inventory.id)
+            .where(Delivery.is_delivered.is_(True), Delivery.delivery_date < cutoff,
+                   Inventory.serial_number != newest)
+            .order_by(Delivery.delivery_date.asc())
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+
+        by_year = defaultdict(list)
+        for vehicle_id, delivery_date in batch:
+            by_year[delivery_date.year].append(vehicle_id)
+        for year, vehicle_ids in by_year.items():
+            _copy_to_archive(archive_path(year), vehicle_ids)
+
+        vehicle_ids = [vehicle_id for vehicle_id, _ in batch]
+        # Related rows go with the vehicle through ON DELETE CASCADE
+        db.session.execute(delete(Inventory).where(Inventory.id.in_(vehicle_ids)))
+        for vehicle_id in vehicle_ids:
+            mark_vehicle_changed(vehicle_id)
+        db.session.commit()
+
+        archived += len(batch)
+        log(f'Archived {archived} vehicles')
+    return archived
+
+
+def _record(row):
+    return SimpleNamespace(**row._mapping) if row is not None else None
+
+
+def load_archived_snapshot(vehicle_number):
+    """Find the most recent archived visit of a vehicle, or None"""
+    vehicles, photos, work_items = ARCHIVE_TABLES[Inventory], ARCHIVE_TABLES[Photo], ARCHIVE_TABLES[WorkItem]
+    for path in archive_paths():
+        with archive_engine(path).connect() as conn:
+            vehicle = _record(conn.execute(
+                select(vehicles).where(vehicles.c.vehicle_number == vehicle_number)
+                .order_by(vehicles.c.check_in_date.desc()).limit(1)
+            ).first())
+            if vehicle is None:
+                continue
+
+            def one(model):
+                table = ARCHIVE_TABLES[model]
+                return _record(conn.execute(select(table).where(table.c.inventory_id == vehicle.id)).first())
+
+            work_status = one(WorkStatus)
+            items = conn.execute(
+                select(work_items).where(work_items.c.inventory_id == vehicle.id,
+                                         work_items.c.work_status_id == work_status.id)
+                .order_by(work_items.c.id)
+            ).all() if work_status else []
+            return VehicleSnapshot(
+                vehicle=vehicle,
+                photos=[_record(row) for row in conn.execute(
+                    select(photos).where(photos.c.inventory_id == vehicle.id).order_by(photos.c.id))],
+                registration=one(RegistrationStatus),
+                claim=one(Claim),
+                approval=one(Approval),
+                work_status=work_status,
+                work_items=[_record(row) for row in items],
+                delivery=one(Delivery),
+                archived=True
+            )
+    return None
+
+
+def archived_vehicles(batch_size=500):
+    """Yield every archived vehicle with its claim number, in serial number order across all files"""
+    vehicles, claims = ARCHIVE_TABLES[Inventory], ARCHIVE_TABLES[Claim]
+    with ExitStack() as stack:
+        streams = []
+        for path in archive_paths():
+            conn = stack.enter_context(archive_engine(path).connect())
+            streams.append(conn.execution_options(yield_per=batch_size).execute(
+                select(vehicles, claims.c.claim_number)
+                .outerjoin(claims, claims.c.inventory_id == vehicles.c.id)
+                .order_by(vehicles.c.serial_number)
+            ))
+        yield from heapq.merge(*streams, key=lambda row: row.serial_number)
+
+
+def archived_through():
+    """Date of the latest delivery moved into an archive file, or None before the first run"""
+    deliveries = ARCHIVE_TABLES[Delivery]
+    latest = None
+    for path in archive_paths():
+        with archive_engine(path).connect() as conn:
+            value = conn.execute(select(func.max(deliveries.c.delivery_date))).scalar()
+        if value is not None and (latest is None or value > latest):
+            latest = value
+    return latest.date() if latest else None
+
+
+def init_archive(app):
+    """Register the archive-delivered command"""
+
+    @app.cli.command('archive-delivered')
+    @click.option('--days', default=None, type=int, help='Archive vehicles delivered more than this many days ago')
+    @click.option('--batch-size', default=200, help='Vehicles moved per transaction')
+    def archive_delivered_command(days, batch_size):
+        """Move long-delivered vehicles out of the working tables"""
+        days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+        try:
+            count = archive_delivered(days, batch_size, log=click.echo)
+        except ArchiveConflictError as error:
+            raise click.ClickException(str(error))
+        click.echo(f'{count} vehicles delivered before {days} days ago are archived.')
+
+    return app
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+import anyio
+from sqlalchemy import and_, case, event, exists, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import lazyload, selectinload
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from app import create_app
+from branches import BRANCH_HEADER
+from cache import LRUCache
+from models import db
+from models.claims import Claim
+from models.inventory import Inventory
+from models.registration_status import RegistrationStatus
+from models.work_status import WorkItem, WorkStatus
+from snapshots import build_snapshot, completion_stats, snapshot_query, version_query
+
+# Read-only async tier for the high-volume lookups: vehicle snapshots,
+# dashboard counters, claim duplicate checks, photo listings and the photo
+# files themselves. Paths and JSON match the Flask routes, so a reverse proxy
+# can send them here while gunicorn keeps every page and write:
+#
+#     uvicorn --factory asgi:create_asgi_app --port 9697
+#
+# Queries run on aiosqlite connections from a small pool, opened with
+# PRAGMA query_only, and files are sent from a worker thread, so one process
+# keeps thousands of requests in flight instead of one per worker. Concurrent
+# requests for the same data share one query. Vehicle snapshots are cached
+# under the vehicle's inventory.version, checked with one indexed lookup per
+# request, so a write committed by the Flask app is seen on the next request.
+
+
+def _async_url(url):
+    return url.set(drivername='sqlite+aiosqlite')
+
+
+def _read_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only = ON')
+    cursor.close()
+
+
+def create_async_engines(flask_app):
+    """One pooled aiosqlite engine per database of the Flask app, keyed like db.engines"""
+    config = flask_app.config
+    engines = {}
+    with flask_app.app_context():
+        for key, engine in db.engines.items():
+            engines[key] = create_async_engine(
+                _async_url(engine.url),
+                pool_size=config['ASYNC_DB_POOL_SIZE'],
+                max_overflow=0,
+                pool_timeout=config['ASYNC_DB_POOL_TIMEOUT'],
+            )
+            event.listen(engines[key].sync_engine, 'connect', _read_only)
+    return engines
+
+
+def _completed_condition():
+    """SQL twin of calculate_progress(...) == 100"""
+    work_status = WorkStatus.__table__
+    items = WorkItem.__table__
+    return and_(
+        exists().where(RegistrationStatus.inventory_id == Inventory.id, RegistrationStatus.is_completed.is_(True)),
+        exists().where(Claim.inventory_id == Inventory.id, Claim.claim_number.is_not(None), Claim.claim_number != ''),
+        exists().where(work_status.c.inventory_id == Inventory.id, items.c.work_status_id == work_status.c.id),
+        ~exists().where(work_status.c.inventory_id == Inventory.id, items.c.work_status_id == work_status.c.id,
+                        func.coalesce(items.c.is_completed, False).is_(False)),
+    )
+
+
+async def _shared(in_flight, key, load):
+    """Await load() once for all concurrent callers asking for the same key"""
+    task = in_flight.get(key)
+    if task is None:
+        task = in_flight[key] = asyncio.ensure_future(load())
+        task.add_done_callback(lambda _: in_flight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def _json(body, status_code=200):
+    return Response(body, status_code=status_code, media_type='application/json')
+
+
+def _photo_url(filepath):
+    return '/photo/' + filepath.replace('\\', '/')
+
+
+def create_asgi_app(config=None):
+    """Build the async read API on the same configuration and models as create_app()"""
+    flask_app = create_app(config)
+    settings = flask_app.config
+    engines = create_async_engines(flask_app)
+    sessions = {key: async_sessionmaker(engine, expire_on_commit=False) for key, engine in engines.items()}
+    upload_root = os.path.realpath(settings['UPLOAD_FOLDER'])
+    placeholder = os.path.join(flask_app.root_path, 'static', 'images', 'placeholder.jpg')
+    snapshot_cache = LRUCache(maxsize=settings['SNAPSHOT_CACHE_SIZE'], ttl=settings['SNAPSHOT_CACHE_TTL'])
+    in_flight = {}
+
+    def branch_for(request):
+        """The request's branch, chosen like the Flask app does; None outside multi-branch mode"""
+        branches = settings['BRANCH_DATABASES']
+        if not branches:
+            return None
+        branch = request.headers.get(BRANCH_HEADER) or request.query_params.get('branch') or settings['BRANCH']
+        if branch not in branches:
+            raise HTTPException(404)
+        return branch
+
+    async def vehicle_snapshot(request):
+        """A vehicle with all its related records, as /api/vehicle/<vehicle_number>"""
+        branch = branch_for(request)
+        vehicle_number = request.path_params['vehicle_number'].upper()
+        async with sessions[branch]() as session:
+            stamp = (await session.execute(version_query(vehicle_number))).first()
+        if stamp is None:
+            return JSONResponse({'success': False, 'error': 'Vehicle not found'}, status_code=404)
+        key = ('snapshot', branch, stamp.id, stamp.version)
+        body = snapshot_cache.get(key)
+        if body is None:
+            async def load():
+                async with sessions[branch]() as session:
+                    result = await session.execute(snapshot_query(vehicle_number))
+                    vehicle = result.unique().scalar_one_or_none()
+                    return json.dumps(build_snapshot(vehicle).to_dict()) if vehicle is not None else None
+
+            body = await _shared(in_flight, key, load)
+            if body is None:
+                return JSONResponse({'success': False, 'error': 'Vehicle not found'}, status_code=404)
+            snapshot_cache.set(key, body)
+        return _json(body)
+
+    async def dashboard_stats(request):
+        """Dashboard counters, as /api/dashboard_stats, from one aggregate query"""
+        branch = branch_for(request)
+
+        async def load():
+            async with sessions[branch]() as session:
+                total, completed = (await session.execute(select(
+                    func.count(Inventory.id), func.coalesce(func.sum(case((_completed_condition(), 1), else_=0)), 0)
+                ))).one()
+            return json.dumps(completion_stats(total, completed))
+
+        return _json(await _shared(in_flight, ('dashboard_stats', branch), load))
+
+    async def validate_claim(request):
+        """Duplicate check for a claim number, as POST /validate_claim (or GET with query parameters)"""
+        params = await request.json() if request.method == 'POST' else request.query_params
+        claim_number = (params.get('claim_number') or '').strip()
+        vehicle_number = params.get('vehicle_number') or ''
+        async with sessions[branch_for(request)]() as session:
+            duplicate = (await session.execute(
+                select(Claim.id).join(Inventory).where(
+                    Claim.claim_number == claim_number, Inventory.vehicle_number != vehicle_number).limit(1)
+            )).first() is not None
+        return JSONResponse({
+            'is_duplicate': duplicate,
+            'message': 'Claim number already exists for another vehicle' if duplicate else 'Claim number is available'
+        })
+
+    async def vehicle_photos(request):
+        """A vehicle's photos grouped by type, the data behind /view_photos/<vehicle_number>"""
+        async with sessions[branch_for(request)]() as session:
+            vehicle = (await session.execute(
+                select(Inventory).options(lazyload('*'), selectinload(Inventory.photos))
+                .where(Inventory.vehicle_number == request.path_params['vehicle_number'])
+            )).scalar_one_or_none()
+            if vehicle is None:
+                return JSONResponse({'success': False, 'error': 'Vehicle not found'}, status_code=404)
+            photo_groups = {}
+            for photo in vehicle.photos:
+                photo_groups.setdefault(photo.photo_type, []).append(dict(photo.to_dict(), url=_photo_url(photo.filepath)))
+            return JSONResponse({'vehicle': vehicle.to_dict(), 'photo_groups': photo_groups,
+                                 'total_photos': len(vehicle.photos)})
+
+    async def serve_photo(request):
+        """Send an uploaded photo from a worker thread, as /photo/<filepath>"""
+        path = os.path.realpath(request.path_params['filepath'])
+        if os.path.commonpath([path, upload_root]) != upload_root or not await anyio.Path(path).is_file():
+            path = placeholder
+        return FileResponse(path)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        for engine in engines.values():
+            await engine.dispose()
+
+    return Starlette(
+        routes=[
+            Route('/api/vehicle/{vehicle_number}', vehicle_snapshot),
+            Route('/api/dashboard_stats', dashboard_stats),
+            Route('/validate_claim', validate_claim, methods=['GET', 'POST']),
+            Route('/api/photos/{vehicle_number}', vehicle_photos),
+            Route('/photo/{filepath:path}', serve_photo),
+        ],
+        lifespan=lifespan,
+    )
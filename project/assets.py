@@ -0,0 +1,155 @@
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import abort, request, send_from_directory
+from werkzeug.security import safe_join
+
+from compression import accepted_encodings, brotli, compress_bytes
+
+MANIFEST_NAME = 'assets-manifest.json'
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def file_hash(path):
+    """Return a short content hash for a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class AssetManifest:
+    """Content hashes for files in the static folder"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.hashes = {}
+        self._stats = {}
+        self.load()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.static_folder, MANIFEST_NAME)
+
+    def load(self):
+        """Load hashes and file stats written by the build step, if present"""
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            entries = json.load(f)
+        for filename, entry in entries.items():
+            # Entries without size and mtime (older manifests) are rehashed on first use
+            if isinstance(entry, dict):
+                self.hashes[filename] = entry['hash']
+                self._stats[filename] = (entry.get('size'), entry.get('mtime'))
+
+    def get(self, filename):
+        """Return the hash for a static file, rehashing it when its size or mtime changed"""
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = _file_stat(path)
+        except OSError:
+            return None
+        if filename in self.hashes and self._stats.get(filename) == stat:
+            return self.hashes[filename]
+        self.hashes[filename] = file_hash(path)
+        self._stats[filename] = stat
+        return self.hashes[filename]
+
+    def build(self, level=9):
+        """Hash every static file and write .gz/.br siblings next to text assets"""
+        hashes = {}
+        stats = {}
+        saved = 0
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                if name == MANIFEST_NAME or name.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                stats[filename] = _file_stat(path)
+                hashes[filename] = file_hash(path)
+
+                if os.path.splitext(name)[1].lower() not in PRECOMPRESS_EXTENSIONS:
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                encodings = ['gzip', 'br'] if brotli is not None else ['gzip']
+                for encoding in encodings:
+                    compressed = compress_bytes(data, encoding, level)
+                    suffix = '.gz' if encoding == 'gzip' else '.br'
+                    tmp_path = f"{path}{suffix}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(compressed)
+                    os.replace(tmp_path, path + suffix)
+                    saved += len(data) - len(compressed)
+
+        tmp_manifest = self.manifest_path + '.tmp'
+        with open(tmp_manifest, 'w') as f:
+            json.dump({filename: {'hash': content_hash, 'size': stats[filename][0], 'mtime': stats[filename][1]}
+                       for filename, content_hash in hashes.items()}, f, indent=2, sort_keys=True)
+        os.replace(tmp_manifest, self.manifest_path)
+        self.hashes = hashes
+        self._stats = stats
+        return hashes, saved
+
+
+def init_assets(app):
+    """Fingerprint static URLs and serve them with long-lived caching"""
+    manifest = AssetManifest(app.static_folder)
+    app.extensions['assets'] = manifest
+
+    @app.url_defaults
+    def add_static_hash(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            content_hash = manifest.get(values['filename'])
+            if content_hash:
+                values['v'] = content_hash
+
+    def serve_static(filename):
+        """Serve a static file, preferring a precompressed variant"""
+        encodings = accepted_encodings(request.headers.get('Accept-Encoding'))
+        source = safe_join(app.static_folder, filename)
+        if source is None:
+            abort(404)
+        response = None
+
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            variant = source + suffix
+            if (encoding in encodings and os.path.isfile(variant) and os.path.isfile(source)
+                    and os.path.getmtime(variant) >= os.path.getmtime(source)):
+                response = send_from_directory(app.static_folder, filename + suffix)
+                response.headers['Content-Encoding'] = encoding
+                response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                break
+
+        if response is None:
+            response = send_from_directory(app.static_folder, filename)
+        response.vary.add('Accept-Encoding')
+
+        version = request.args.get('v')
+        if version and version == manifest.get(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
+
+    @app.cli.command('build-assets')
+    def build_assets():
+        """Hash and precompress static assets"""
+        hashes, saved = manifest.build()
+        print(f"Fingerprinted {len(hashes)} static files, precompression saved {saved} bytes.")
+
+    return app
@@ -0,0 +1,86 @@
+from flask import Blueprint, render_template, request, jsonify
+from datetime import datetime, date
+from sqlalchemy.orm import lazyload
+from models import db
+from models.inventory import Inventory
+from models.delivery import Delivery
+
+bp = Blueprint('delivery', __name__)
+
+# Module 8: Delivery Management
+@bp.route('/delivery_details')
+def delivery_details():
+    """Show delivery management page"""
+    vehicles = Inventory.query.options(lazyload(Inventory.photos)).all()
+    pending_vehicles = []
+    delivered_vehicles = []
+    
+    for vehicle in vehicles:
+        # Check if all steps are completed
+        registration = vehicle.registration
+        claim = vehicle.claim
+        approval = vehicle.approval
+        work_status = vehicle.work_status
+        
+        # Vehicle is ready for delivery if all major steps are completed
+        is_ready = (
+            registration and registration.is_completed and
+            claim and claim.claim_number and
+            approval and approval.is_approved and
+            work_status
+        )
+        
+        if work_status:
+            work_items = work_status.work_items
+            work_completed = all(item.is_completed for item in work_items) if work_items else False
+            is_ready = is_ready and work_completed
+        
+        # Check delivery status
+        delivery = vehicle.delivery
+        
+        if is_ready:
+            if delivery and delivery.is_delivered:
+                delivered_vehicles.append((vehicle, delivery))
+            else:
+                pending_vehicles.append(vehicle)
+    
+    return render_template('delivery_details.html', 
+                         pending_vehicles=pending_vehicles,
+                         delivered_vehicles=delivered_vehicles,
+                         current_date=date.today())
+
+@bp.route('/mark_delivered/<vehicle_number>', methods=['POST'])
+def mark_delivered(vehicle_number):
+    """Mark vehicle as delivered"""
+    delivered_by = request.json.get('delivered_by', '')
+    notes = request.json.get('notes', '')
+    
+    vehicle_id = Inventory.id_for(vehicle_number)
+    if vehicle_id is None:
+        return jsonify({'success': False, 'error': 'Vehicle not found'}), 404
+    
+    delivery = Delivery.query.filter_by(inventory_id=vehicle_id).first()
+    if not delivery:
+        delivery = Delivery(inventory_id=vehicle_id)
+        db.session.add(delivery)
+    
+    delivery.is_delivered = True
+    delivery.delivery_date = datetime.now()
+    delivery.delivered_by = delivered_by
+    delivery.notes = notes
+    
+    db.session.commit()
+    return jsonify({'success': True})
+
+@bp.route('/undo_delivery/<vehicle_number>', methods=['POST'])
+def undo_delivery(vehicle_number):
+    """Undo delivery status"""
+    delivery = Delivery.query.join(Inventory).filter(Inventory.vehicle_number == vehicle_number).first()
+    if delivery:
+        delivery.is_delivered = False
+        delivery.delivery_date = None
+        delivery.delivered_by = None
+        delivery.notes = None
+        db.session.commit()
+    
+    return jsonify({'success': True})
@@ -0,0 +1,118 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from datetime import datetime
+from models import db
+from models.inventory import Inventory
+from work_items import seed_work_status
+
+bp = Blueprint('inventory', __name__)
+
+# Module 1: Inventory Management
+@bp.route('/add_inventory', methods=['GET', 'POST'])
+def add_inventory():
+    """Add new vehicle to inventory"""
+    if request.method == 'POST':
+        vehicle_number = request.form['vehicle_number'].upper()
+        
+        # Check if vehicle already exists
+        existing_vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first()
+        if existing_vehicle:
+            flash('Vehicle already exists in inventory!', 'error')
+            return redirect(url_for('inventory.add_inventory'))
+        
+        # Generate serial number
+        last_vehicle = Inventory.query.order_by(Inventory.serial_number.desc()).first()
+        serial_number = (last_vehicle.serial_number + 1) if last_vehicle else 1
+        
+        vehicle = Inventory(
+            serial_number=serial_number,
+            vehicle_number=vehicle_number,
+            vehicle_name=request.form.get('vehicle_name', ''),
+            customer_name=request.form.get('customer_name', ''),
+            phone_number=request.form.get('phone_number', ''),
+            insurance_name=request.form.get('insurance_name', ''),
+            kilometer_reading=int(request.form['kilometer_reading']),
+            engine_number=request.form['engine_number'],
+            chassis_number=request.form['chassis_number'],
+            description=request.form['description'],
+            check_in_date=datetime.now()
+        )
+        
+        db.session.add(vehicle)
+        seed_work_status(vehicle)
+        db.session.commit()
+        
+        flash('Vehicle added successfully!', 'success')
+        return redirect(url_for('inventory.view_inventory'))
+    
+    return render_template('inventory_form.html')
+
+@bp.route('/view_inventory')
+def view_inventory():
+    """View all vehicles in inventory"""
+    search = request.args.get('search', '')
+    sort_by = request.args.get('sort', 'check_in_date')
+    order = request.args.get('order', 'asc')  # Default to ascending
+    
+    query = Inventory.query
+    
+    if search:
+        query = query.filter(db.or_(
+                Inventory.vehicle_number.contains(search.upper()),
+                Inventory.customer_name.contains(search),
+                Inventory.insurance_name.contains(search),
+                Inventory.phone_number.contains(search)
+            ))
+    
+    if sort_by == 'vehicle_number':
+        if order == 'desc':
+            query = query.order_by(Inventory.vehicle_number.desc())
+        else:
+            query = query.order_by(Inventory.vehicle_number.asc())
+    elif sort_by == 'serial_number':
+        if order == 'desc':
+            query = query.order_by(Inventory.serial_number.desc())
+        else:
+            query = query.order_by(Inventory.serial_number.asc())
+    elif sort_by == 'customer_name':
+        if order == 'desc':
+            query = query.order_by(Inventory.customer_name.desc())
+        else:
+            query = query.order_by(Inventory.customer_name.asc())
+    else:
+        # Default sort by check_in_date
+        if order == 'desc':
+            query = query.order_by(Inventory.check_in_date.desc())
+        else:
+            query = query.order_by(Inventory.check_in_date.asc())
+    
+    vehicles = query.all()
+    
+    # Get first photo for each vehicle for thumbnail display (photos are selectin-loaded)
+    photos_dict = {}
+    for vehicle in vehicles:
+        if vehicle.photos:
+            photos_dict[vehicle.vehicle_number] = vehicle.photos[:1]
+    
+    return render_template('inventory_list.html', vehicles=vehicles, search=search, 
+                         sort_by=sort_by, order=order, photos_dict=photos_dict)
+@bp.route('/edit_inventory/<int:vehicle_id>', methods=['GET', 'POST'])
+def edit_inventory(vehicle_id):
+    """Edit vehicle inventory details"""
+    vehicle = Inventory.query.get_or_404(vehicle_id)
+    
+    if request.method == 'POST':
+        vehicle.vehicle_number = request.form['vehicle_number'].upper()
+        vehicle.vehicle_name = request.form.get('vehicle_name', '')
+        vehicle.customer_name = request.form.get('customer_name', '')
+        vehicle.phone_number = request.form.get('phone_number', '')
+        vehicle.insurance_name = request.form.get('insurance_name', '')
+        vehicle.kilometer_reading = int(request.form['kilometer_reading'])
+        vehicle.engine_number = request.form['engine_number']
+        vehicle.chassis_number = request.form['chassis_number']
+        vehicle.description = request.form['description']
+        
+        db.session.commit()
+        flash('Vehicle details updated successfully!', 'success')
+        return redirect(url_for('inventory.view_inventory'))
+    
+    return render_template('edit_inventory.html', vehicle=vehicle)
@@ -0,0 +1,197 @@
+from flask import (Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, send_file,
+                   stream_with_context, abort, jsonify)
+from datetime import datetime
+import os
+from models import db
+from models.inventory import Inventory
+from models.photos import Photo, STANDARD_PHOTO_TYPES
+from metrics import PHOTO_BYTES
+from zipstream import stream_zip
+from branches import branch_dir
+from photo_ingest import ingest_options, normalize_many, photo_path_key, record_normalized, remove_replaced
+
+bp = Blueprint('photos', __name__)
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def get_monthly_folder(vehicle_number):
+    """Create monthly folder structure for photos"""
+    current_date = datetime.now()
+    month_folder = current_date.strftime('%Y-%m')
+    vehicle_folder = os.path.join(branch_dir(current_app.config['UPLOAD_FOLDER']), month_folder, vehicle_number)
+    os.makedirs(vehicle_folder, exist_ok=True)
+    return vehicle_folder
+
+def save_upload(vehicle_folder, file, stem):
+    """Save an uploaded image as <stem>.<ext> and return its path, or None if it is not an allowed image"""
+    if not (file and file.filename and allowed_file(file.filename)):
+        return None
+    filepath = os.path.join(vehicle_folder, f"{stem}.{file.filename.rsplit('.', 1)[1].lower()}")
+    file.save(filepath)
+    PHOTO_BYTES.labels(direction='uploaded').inc(os.path.getsize(filepath))
+    return filepath
+
+def store_photos(vehicle, saved):
+    """Normalize saved (photo_type, filepath) uploads and record them; the caller commits"""
+    config = current_app.config
+    normalized = {}
+    if saved and config['PHOTO_NORMALIZE']:
+        # Inline in the request: a process pool per upload costs more than the few photos it would share out
+        normalized = normalize_many([filepath for _, filepath in saved], workers=1, **ingest_options(config))
+        remove_replaced(normalized)
+        record_normalized(branch_dir(config['UPLOAD_FOLDER']), normalized)
+    
+    existing = {photo_path_key(photo.filepath): photo for photo in vehicle.photos}
+    photos = []
+    for photo_type, filepath in saved:
+        filepath = normalized[filepath][0] if filepath in normalized else filepath
+        
+        # A re-upload overwrites the same file, so it reuses that file's row, even one saved with backslashes
+        photo = existing.get(photo_path_key(filepath))
+        if photo is None:
+            photo = Photo(
+                inventory_id=vehicle.id,
+                photo_type=photo_type,
+                filename=os.path.basename(filepath),
+                filepath=filepath
+            )
+            db.session.add(photo)
+        photo.upload_date = datetime.now()
+        photos.append(photo)
+    return photos
+
+# Module 2: Photo Upload & Inspection
+@bp.route('/upload_photos/<vehicle_number>', methods=['GET', 'POST'])
+def upload_photos(vehicle_number):
+    """Upload inspection photos for a vehicle"""
+    vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first_or_404()
+    
+    if request.method == 'POST':
+        vehicle_folder = get_monthly_folder(vehicle_number)
+        saved = []
+        
+        for photo_type in STANDARD_PHOTO_TYPES:
+            filepath = save_upload(vehicle_folder, request.files.get(photo_type), photo_type)
+            if filepath:
+                saved.append((photo_type, filepath))
+        
+        # Handle damage photos (multiple allowed)
+        damage_files = request.files.getlist('damages')
+        for i, file in enumerate(damage_files):
+            filepath = save_upload(vehicle_folder, file, f'damage_{i+1}')
+            if filepath:
+                saved.append(('damage', filepath))
+        
+        uploaded_count = len(store_photos(vehicle, saved))
+        db.session.commit()
+        flash(f'{uploaded_count} photos uploaded successfully!', 'success')
+        return redirect(url_for('photos.view_photos', vehicle_number=vehicle_number))
+    
+    return render_template('photo_upload.html', vehicle=vehicle)
+
+@bp.route('/upload_photo/<vehicle_number>', methods=['POST'])
+def upload_photo(vehicle_number):
+    """Upload a single photo; used by the upload page to send files concurrently"""
+    vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first_or_404()
+    photo_type = request.form.get('photo_type', '')
+    if photo_type in STANDARD_PHOTO_TYPES:
+        stem = photo_type
+    elif photo_type == 'damage' and request.form.get('index', '').isdigit():
+        stem = f"damage_{request.form['index']}"
+    else:
+        return jsonify({'success': False, 'error': 'Unknown photo type'}), 400
+    
+    filepath = save_upload(get_monthly_folder(vehicle_number), request.files.get('photo'), stem)
+    if not filepath:
+        return jsonify({'success': False, 'error': 'Not an allowed image file'}), 400
+    
+    photo = store_photos(vehicle, [(photo_type, filepath)])[0]
+    db.session.commit()
+    return jsonify({'success': True, 'id': photo.id, 'filename': photo.filename,
+                    'size': os.path.getsize(photo.filepath)})
+
+@bp.route('/api/upload_config')
+def upload_config():
+    """Target size and encoding the upload page resizes photos to before sending them"""
+    config = current_app.config
+    image_format = ingest_options(config)['image_format']
+    return jsonify({
+        'resize': config['UPLOAD_CLIENT_RESIZE'],
+        'max_px': config['PHOTO_MAX_PX'],
+        'quality': config['PHOTO_QUALITY'] / 100,
+        'mime_type': 'image/webp' if image_format == 'WEBP' else 'image/jpeg',
+        'concurrency': config['UPLOAD_CONCURRENCY'],
+        'retries': config['UPLOAD_RETRIES']
+    })
+
+@bp.route('/view_photos/<vehicle_number>')
+def view_photos(vehicle_number):
+    """View all photos for a vehicle"""
+    vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first_or_404()
+    photos = vehicle.photos
+    
+    # Group photos by type
+    photo_groups = {}
+    for photo in photos:
+        if photo.photo_type not in photo_groups:
+            photo_groups[photo.photo_type] = []
+        # Replace backslashes with forward slashes for URL compatibility
+        photo.filepath = photo.filepath.replace('\\', '/')
+        photo_groups[photo.photo_type].append(photo)
+    
+    total_photos = len(photos)
+    
+    return render_template('photo_gallery.html', vehicle=vehicle, photo_groups=photo_groups, total_photos=total_photos)
+
+@bp.route('/photos/<vehicle_number>/bundle.zip')
+def photo_bundle(vehicle_number):
+    """Stream every photo of a vehicle as a ZIP, optionally filtered by ?type= and ?month=YYYY-MM"""
+    vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first_or_404()
+    photo_types = set(request.args.getlist('type'))
+    month = request.args.get('month', '')
+    
+    entries = []
+    seen = set()
+    for photo in vehicle.photos:
+        if photo_types and photo.photo_type not in photo_types:
+            continue
+        if month and not (photo.upload_date and photo.upload_date.strftime('%Y-%m') == month):
+            continue
+        filepath = photo.filepath.replace('\\', '/')
+        if not os.path.isfile(filepath):
+            continue
+        arcname = f"{photo.photo_type}/{photo.filename}"
+        if arcname in seen:
+            arcname = f"{photo.photo_type}/{photo.id}-{photo.filename}"
+        seen.add(arcname)
+        entries.append((arcname, filepath))
+    
+    if not entries:
+        abort(404)
+    
+    suffix = '-'.join(filter(None, ['-'.join(sorted(photo_types)), month]))
+    download_name = f"{vehicle_number}{'-' + suffix if suffix else ''}-photos.zip"
+    served = PHOTO_BYTES.labels(direction='served')
+    return Response(
+        stream_with_context(stream_zip(entries, on_file=lambda path, size: served.inc(size))),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
+
+@bp.route('/photo/<path:filepath>')
+def serve_photo(filepath):
+    """Serve uploaded photos"""
+    try:
+        # Check if file exists
+        if os.path.exists(filepath):
+            PHOTO_BYTES.labels(direction='served').inc(os.path.getsize(filepath))
+            return send_file(filepath)
+        else:
+            # Return placeholder image if file not found
+            return send_file('static/images/placeholder.jpg')
+    except FileNotFoundError:
+        # Return a default placeholder image if file not found
+        return send_file('static/images/placeholder.jpg')
@@ -0,0 +1,193 @@
+from flask import (Blueprint, render_template, stream_template, request, redirect, url_for, flash, send_file, jsonify,
+                   current_app, abort)
+from datetime import datetime, date, timedelta
+import heapq
+import os
+import click
+from sqlalchemy import select
+from models import db
+from models.inventory import Inventory
+from models.claims import Claim
+from archive import archived_through, archived_vehicles
+from branches import branch_dir, for_each_branch
+from reports.analytics import turnaround_summary, kpi_trend, rollup_range
+from reports.prebuild import (STANDARD_REPORTS, find_current_report, build_report, data_fingerprint,
+                              manifest_entry, manifest_key, record_reports, prebuild_reports, run_schedule)
+
+bp = Blueprint('reports', __name__, cli_group=None)
+
+@bp.route('/generate_report')
+def generate_report():
+    """Generate and download reports"""
+    report_type = request.args.get('type', 'daily')
+    format_type = 'pdf' if request.args.get('format', 'pdf') == 'pdf' else 'excel'
+    reports_dir = branch_dir(current_app.config['REPORTS_DIR'])
+    
+    if report_type not in ('daily', 'monthly', 'all_cars'):
+        flash('Invalid report type!', 'error')
+        return redirect(url_for('status.dashboard'))
+    
+    # Serve the off-peak build while it still matches the data
+    filename = find_current_report(reports_dir, report_type, format_type)
+    if filename is None:
+        fingerprint = data_fingerprint(reports_dir)
+        filename = build_report(reports_dir, report_type, format_type)
+        if filename is None:
+            flash('This report is not available in that format.', 'error')
+            return redirect(url_for('reports.reports'))
+        record_reports(reports_dir, {manifest_key(report_type, format_type): manifest_entry(filename, fingerprint)})
+    
+    return send_file(filename, as_attachment=True)
+
+def _photo_sheet_options():
+    config = current_app.config
+    return {
+        'cache_dir': config['PHOTO_CACHE_DIR'] or os.path.join(current_app.instance_path, 'photo-cache'),
+        'max_px': config['PHOTO_SHEET_MAX_PX'],
+        'workers': config['PHOTO_SHEET_WORKERS'] or None
+    }
+
+@bp.route('/photo_sheet/<vehicle_number>')
+def vehicle_photo_sheet(vehicle_number):
+    """Download the insurer inspection sheet for one vehicle"""
+    from reports.generator import ReportGenerator
+    generator = ReportGenerator(branch_dir(current_app.config['REPORTS_DIR']))
+    filename = generator.generate_vehicle_photo_sheet(vehicle_number.upper(), **_photo_sheet_options())
+    if filename is None:
+        flash('Vehicle not found!', 'error')
+        return redirect(url_for('status.search_vehicle'))
+    return send_file(filename, as_attachment=True)
+
+@bp.route('/photo_sheets')
+def insurer_photo_sheets():
+    """Download inspection sheets for an insurer's vehicles, optionally by check-in date range"""
+    insurer = request.args.get('insurer', '').strip()
+    start = _parse_date(request.args.get('start'), None)
+    end = _parse_date(request.args.get('end'), None)
+    if not insurer:
+        flash('Choose an insurer for the photo sheets.', 'error')
+        return redirect(url_for('reports.reports'))
+    
+    from reports.generator import ReportGenerator
+    generator = ReportGenerator(branch_dir(current_app.config['REPORTS_DIR']))
+    filename = generator.generate_insurer_photo_sheets(insurer, start=start, end=end, **_photo_sheet_options())
+    return send_file(filename, as_attachment=True)
+
+@bp.route('/reports')
+def reports():
+    """Reports page"""
+    insurers = [name for (name,) in db.session.query(Inventory.insurance_name).filter(
+        Inventory.insurance_name.isnot(None), Inventory.insurance_name != ''
+    ).distinct().order_by(Inventory.insurance_name)]
+    return render_template('reports.html', insurers=insurers)
+
+def _vehicle_rows(*criteria, batch_size=500):
+    """Stream the report table columns and claim number for the matching vehicles only"""
+    statement = select(
+        Inventory.serial_number, Inventory.vehicle_number, Inventory.customer_name, Inventory.phone_number,
+        Inventory.insurance_name, Inventory.engine_number, Inventory.chassis_number, Inventory.check_in_date,
+        Claim.claim_number
+    ).outerjoin(Claim, Claim.inventory_id == Inventory.id).where(*criteria).order_by(Inventory.serial_number.asc())
+    return db.session.execute(statement.execution_options(yield_per=batch_size))
+
+def _check_in_between(start, end):
+    return (Inventory.check_in_date >= datetime.combine(start, datetime.min.time()),
+            Inventory.check_in_date < datetime.combine(end, datetime.min.time()))
+
+@bp.route('/all_cars_report')
+def all_cars_report():
+    """Display all cars in a table"""
+    include_archived = bool(request.args.get('archived'))
+    vehicles = _vehicle_rows()
+    if include_archived:
+        vehicles = heapq.merge(vehicles, archived_vehicles(), key=lambda vehicle: vehicle.serial_number)
+    return stream_template('all_cars_report.html', vehicles=vehicles, include_archived=include_archived)
+
+@bp.route('/daily_report')
+def daily_report():
+    """Display daily report in a table"""
+    today = date.today()
+    vehicles = _vehicle_rows(*_check_in_between(today, today + timedelta(days=1)))
+    return stream_template('daily_report.html', vehicles=vehicles)
+
+@bp.route('/monthly_report')
+def monthly_report():
+    """Display monthly report in a table"""
+    today = date.today()
+    vehicles = _vehicle_rows(*_check_in_between(today.replace(day=1), today + timedelta(days=1)))
+    return stream_template('monthly_report.html', vehicles=vehicles)
+
+HQ_REPORT_TITLES = {'daily': 'Daily Report', 'monthly': 'Monthly Report', 'all_cars': 'All Cars Report'}
+
+@bp.route('/hq/<any(daily, monthly, all_cars):report_type>_report')
+def hq_report(report_type):
+    """Head-office report: one report queried from every branch in parallel and merged"""
+    if not current_app.config['BRANCH_DATABASES']:
+        abort(404)
+    today = date.today()
+    criteria = {
+        'daily': _check_in_between(today, today + timedelta(days=1)),
+        'monthly': _check_in_between(today.replace(day=1), today + timedelta(days=1)),
+        'all_cars': (),
+    }[report_type]
+    
+    per_branch = for_each_branch(lambda: _vehicle_rows(*criteria).all())
+    vehicles = [(branch, vehicle) for branch, rows in per_branch.items() for vehicle in rows]
+    if report_type != 'all_cars':
+        vehicles.sort(key=lambda row: row[1].check_in_date)
+    return stream_template('hq_report.html', title=HQ_REPORT_TITLES[report_type], vehicles=vehicles,
+                           branch_counts={branch: len(rows) for branch, rows in per_branch.items()})
+
+def _parse_date(value, default):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else default
+    except ValueError:
+        return None
+
+@bp.route('/api/turnaround')
+def turnaround():
+    """Cycle-time percentiles for a date range (end inclusive), default the last 30 days"""
+    today = date.today()
+    start = _parse_date(request.args.get('start'), today - timedelta(days=29))
+    end = _parse_date(request.args.get('end'), today)
+    if start is None or end is None or start > end:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD with start <= end'}), 400
+    return jsonify(turnaround_summary(start, end + timedelta(days=1)))
+
+@bp.route('/api/kpi_trends')
+def kpi_trends():
+    """Daily KPI series for one stage from the nightly roll-up"""
+    stage = request.args.get('stage', 'delivery')
+    insurer = request.args.get('insurer', '')
+    days = min(request.args.get('days', 365, type=int), 3660)
+    return jsonify({'stage': stage, 'insurer': insurer, 'points': kpi_trend(stage, insurer, days)})
+
+@bp.cli.command('rollup-kpis')
+@click.option('--date', 'day', default=None, help='Day to roll up (YYYY-MM-DD), default yesterday')
+@click.option('--days', default=1, help='Number of days ending on --date to roll up')
+def rollup_kpis(day, days):
+    """Recompute daily turnaround KPIs; run nightly from cron"""
+    end = _parse_date(day, date.today() - timedelta(days=1))
+    if end is None:
+        raise click.BadParameter('expected YYYY-MM-DD', param_hint='--date')
+    start = end - timedelta(days=days - 1)
+    written = rollup_range(start, end + timedelta(days=1))
+    click.echo(f'Rolled up {written} KPI rows for {start} to {end}.')
+    horizon = archived_through()
+    if horizon is not None and start <= horizon:
+        click.echo(f'Days up to {horizon} include archived vehicles and were kept as they are.')
+
+@bp.cli.command('prebuild-reports')
+@click.option('--schedule', default=None, help='Cron expression; keep running and build on that schedule')
+@click.option('--workers', default=None, type=int, help='Reports built in parallel')
+@click.option('--worker', 'as_worker', is_flag=True, help='Run on REPORT_PREBUILD_SCHEDULE until stopped')
+def prebuild_reports_command(schedule, workers, as_worker):
+    """Build the standard PDF and Excel reports ahead of time"""
+    app = current_app._get_current_object()
+    if workers:
+        app.config['REPORT_PREBUILD_WORKERS'] = workers
+    if schedule or as_worker:
+        run_schedule(app, schedule or app.config['REPORT_PREBUILD_SCHEDULE'], log=click.echo)
+    else:
+        entries = prebuild_reports(app, log=click.echo)
+        click.echo(f'Prebuilt {len(entries)} of {len(STANDARD_REPORTS)} reports.')
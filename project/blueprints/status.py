@@ -0,0 +1,272 @@
+import os
+import re
+import uuid
+from flask import Blueprint, render_template, request, flash, jsonify, current_app, abort, redirect, url_for
+from datetime import datetime
+from markupsafe import Markup
+from sqlalchemy import select
+from sqlalchemy.orm import lazyload
+from models import db
+from models.inventory import Inventory
+from models.claims import Claim
+from models.approvals import Approval
+from models.registration_status import RegistrationStatus
+from snapshots import calculate_progress, completion_stats, load_vehicle_snapshot
+from archive import load_archived_snapshot
+from fragments import vehicle_fragments
+from branches import branch_dir, for_each_branch
+from claim_import import ClaimImportError, apply_import, plan_file, summarize
+from changes import changes_since
+
+bp = Blueprint('status', __name__)
+
+@bp.route('/')
+def dashboard():
+    """Main dashboard showing all vehicles and their progress"""
+    stamps = _vehicle_stamps()
+    progress = _vehicle_progress(stamps)
+    shown = stamps[:10]
+    
+    def render_rows(vehicle_ids):
+        return {vehicle.id: Markup(render_template('dashboard_row.html', vehicle=vehicle,
+                                                   progress=progress[vehicle.id]))
+                for vehicle in _load_vehicles(vehicle_ids)}
+    
+    # Only rows of vehicles changed since they were last rendered go through Jinja
+    rows = vehicle_fragments('dashboard_row', shown, render_rows)
+    
+    return render_template('dashboard.html',
+                           rows=[rows[vehicle_id] for vehicle_id, _ in shown if vehicle_id in rows],
+                           total_vehicles=len(stamps),
+                           completed_vehicles=sum(1 for value in progress.values() if value == 100))
+
+def _vehicle_stamps():
+    """(id, version) of every vehicle in serial number order"""
+    return db.session.execute(
+        select(Inventory.id, Inventory.version).order_by(Inventory.serial_number.asc())
+    ).all()
+
+def _load_vehicles(vehicle_ids, chunk_size=500):
+    """Load vehicles with their status records; photos are not needed here"""
+    for start in range(0, len(vehicle_ids), chunk_size):
+        yield from Inventory.query.options(lazyload(Inventory.photos)).filter(
+            Inventory.id.in_(vehicle_ids[start:start + chunk_size]))
+
+def _vehicle_progress(stamps):
+    """{vehicle_id: progress}, recomputed only for vehicles changed since last time"""
+    return vehicle_fragments('progress', stamps, lambda vehicle_ids: {
+        vehicle.id: calculate_vehicle_progress(vehicle) for vehicle in _load_vehicles(vehicle_ids)
+    })
+
+def calculate_vehicle_progress(vehicle):
+    """Calculate completion percentage for a vehicle"""
+    work_items = vehicle.work_status.work_items if vehicle.work_status else []
+    
+    return calculate_progress(vehicle.registration, vehicle.claim, work_items)
+
+# Module 3: Registration Status
+@bp.route('/update_registration/<vehicle_number>', methods=['POST'])
+def update_registration(vehicle_number):
+    """Update registration status"""
+    is_completed = request.json.get('is_completed', False)
+    
+    vehicle_id = Inventory.id_for(vehicle_number)
+    if vehicle_id is None:
+        return jsonify({'success': False, 'error': 'Vehicle not found'}), 404
+    
+    registration = RegistrationStatus.query.filter_by(inventory_id=vehicle_id).first()
+    if not registration:
+        registration = RegistrationStatus(inventory_id=vehicle_id)
+        db.session.add(registration)
+    
+    registration.is_completed = is_completed
+    registration.completion_date = datetime.now() if is_completed else None
+    
+    db.session.commit()
+    return jsonify({'success': True})
+
+# Module 4: Claim Number Management
+@bp.route('/update_claim/<vehicle_number>', methods=['POST'])
+def update_claim(vehicle_number):
+    """Update claim number"""
+    claim_number = request.json.get('claim_number', '').strip()
+    
+    vehicle_id = Inventory.id_for(vehicle_number)
+    if vehicle_id is None:
+        return jsonify({'success': False, 'error': 'Vehicle not found'}), 404
+    
+    claim = Claim.query.filter_by(inventory_id=vehicle_id).first()
+    if not claim:
+        claim = Claim(inventory_id=vehicle_id)
+        db.session.add(claim)
+    
+    claim.claim_number = claim_number
+    claim.updated_date = datetime.now()
+    
+    db.session.commit()
+    return jsonify({'success': True})
+
+# Module 5: Application Approval Status
+@bp.route('/update_approval/<vehicle_number>', methods=['POST'])
+def update_approval(vehicle_number):
+    """Update approval status"""
+    is_approved = request.json.get('is_approved', False)
+    
+    vehicle_id = Inventory.id_for(vehicle_number)
+    if vehicle_id is None:
+        return jsonify({'success': False, 'error': 'Vehicle not found'}), 404
+    
+    approval = Approval.query.filter_by(inventory_id=vehicle_id).first()
+    if not approval:
+        approval = Approval(inventory_id=vehicle_id)
+        db.session.add(approval)
+    
+    approval.is_approved = is_approved
+    approval.approval_date = datetime.now() if is_approved else None
+    
+    db.session.commit()
+    return jsonify({'success': True})
+
+@bp.route('/validate_claim', methods=['POST'])
+def validate_claim():
+    """Validate claim number for duplicates"""
+    claim_number = request.json.get('claim_number', '').strip()
+    vehicle_number = request.json.get('vehicle_number', '')
+    
+    existing_claim = Claim.query.join(Inventory).filter(
+        Claim.claim_number == claim_number,
+        Inventory.vehicle_number != vehicle_number
+    ).first()
+    
+    return jsonify({
+        'is_duplicate': existing_claim is not None,
+        'message': 'Claim number already exists for another vehicle' if existing_claim else 'Claim number is available'
+    })
+
+# Bulk claim numbers and approvals from insurer spreadsheets
+IMPORT_TOKEN = re.compile(r'^[0-9a-f]{32}\.(csv|xlsx)$')
+
+def _import_dir():
+    return branch_dir(current_app.config['IMPORT_DIR'] or os.path.join(current_app.instance_path, 'imports'))
+
+def _import_path(token):
+    if not IMPORT_TOKEN.match(token or ''):
+        abort(404)
+    path = os.path.join(_import_dir(), token)
+    if not os.path.exists(path):
+        abort(404)
+    return path
+
+@bp.route('/import_claims', methods=['GET', 'POST'])
+def import_claims():
+    """Upload an insurer CSV/XLSX and preview the claim and approval changes"""
+    if request.method == 'GET':
+        return render_template('import_claims.html')
+    
+    file = request.files.get('file')
+    extension = os.path.splitext(file.filename)[1].lower() if file and file.filename else ''
+    if extension not in ('.csv', '.xlsx'):
+        flash('Choose a .csv or .xlsx file', 'error')
+        return render_template('import_claims.html')
+    
+    os.makedirs(_import_dir(), exist_ok=True)
+    token = uuid.uuid4().hex + extension
+    path = os.path.join(_import_dir(), token)
+    file.save(path)
+    try:
+        plan = plan_file(path)
+    except ClaimImportError as error:
+        os.remove(path)
+        flash(str(error), 'error')
+        return render_template('import_claims.html')
+    
+    return render_template('import_claims.html', plan=plan, summary=summarize(plan),
+                           token=token, filename=file.filename)
+
+@bp.route('/import_claims/apply', methods=['POST'])
+def apply_claim_import():
+    """Apply a previewed import; the file is matched again so changes made since the preview are seen"""
+    path = _import_path(request.form.get('token'))
+    try:
+        summary = apply_import(plan_file(path))
+    finally:
+        os.remove(path)
+    message = f"Imported {summary['claims']} claim numbers and {summary['approvals']} approvals"
+    if summary['errors']:
+        message += f", skipped {summary['errors']} rows with errors"
+    flash(message, 'success')
+    return redirect(url_for('status.import_claims'))
+
+# Module 7: Search & Status Overview
+@bp.route('/search_vehicle')
+def search_vehicle():
+    """Search for a specific vehicle"""
+    vehicle_number = request.args.get('vehicle_number', '').upper()
+    
+    if not vehicle_number:
+        return render_template('search_vehicle.html')
+    
+    # Delivered vehicles moved to the archive are still found, read-only
+    snapshot = load_vehicle_snapshot(vehicle_number) or load_archived_snapshot(vehicle_number)
+    if not snapshot:
+        flash('Vehicle not found!', 'error')
+        return render_template('search_vehicle.html')
+    
+    return render_template('vehicle_status.html', 
+                         vehicle=snapshot.vehicle, 
+                         photos=snapshot.photos,
+                         registration=snapshot.registration,
+                         claim=snapshot.claim,
+                         approval=snapshot.approval,
+                         work_items=snapshot.work_items,
+                         progress=snapshot.progress,
+                         archived=snapshot.archived)
+
+@bp.route('/api/vehicle/<vehicle_number>')
+def vehicle_snapshot(vehicle_number):
+    """API endpoint returning a vehicle with all its related records"""
+    snapshot = load_vehicle_snapshot(vehicle_number.upper())
+    if not snapshot and request.args.get('archived'):
+        snapshot = load_archived_snapshot(vehicle_number.upper())
+    if not snapshot:
+        return jsonify({'success': False, 'error': 'Vehicle not found'}), 404
+    
+    return jsonify(snapshot.to_dict())
+
+@bp.route('/api/changes')
+def changes():
+    """Vehicles changed since a cursor, for clients that keep a local copy"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', current_app.config['CHANGES_PAGE_SIZE'], type=int),
+                current_app.config['CHANGES_PAGE_SIZE'])
+    return jsonify(changes_since(since, max(limit, 1)))
+
+def _dashboard_counts():
+    progress = _vehicle_progress(_vehicle_stamps())
+    return completion_stats(len(progress), sum(1 for value in progress.values() if value == 100))
+
+@bp.route('/api/dashboard_stats')
+def dashboard_stats():
+    """API endpoint for dashboard statistics"""
+    return jsonify(_dashboard_counts())
+
+def _head_office_stats():
+    """Dashboard statistics of every branch, gathered in parallel, and their sum"""
+    if not current_app.config['BRANCH_DATABASES']:
+        abort(404)
+    branches = for_each_branch(_dashboard_counts)
+    total = completion_stats(sum(stats['total'] for stats in branches.values()),
+                              sum(stats['completed'] for stats in branches.values()))
+    return branches, total
+
+@bp.route('/hq')
+def hq_dashboard():
+    """Head-office dashboard comparing all branches"""
+    branches, total = _head_office_stats()
+    return render_template('hq_dashboard.html', branch_stats=branches, total=total)
+
+@bp.route('/api/hq/dashboard_stats')
+def hq_dashboard_stats():
+    """Dashboard statistics for every branch and for the whole business"""
+    branches, total = _head_office_stats()
+    return jsonify({'branches': branches, 'total': total})
@@ -0,0 +1,91 @@
+from flask import Blueprint, render_template, request, jsonify
+from datetime import datetime
+import click
+from models import db
+from models.inventory import Inventory
+from models.work_status import WorkStatus, WorkItem
+from work_items import seed_work_status, set_template
+
+bp = Blueprint('work', __name__, cli_group=None)
+
+# Module 6: Work Status Tracker
+@bp.route('/work_status/<vehicle_number>')
+def work_status(vehicle_number):
+    """View and manage work status"""
+    vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first_or_404()
+    
+    # Read-only: checklists are seeded at check-in (or lazily by add_work_item)
+    work_items = vehicle.work_status.work_items if vehicle.work_status else []
+    
+    # Calculate progress
+    completed_items = sum(1 for item in work_items if item.is_completed)
+    total_items = len(work_items)
+    progress = int((completed_items / total_items) * 100) if total_items > 0 else 0
+    
+    return render_template('work_status.html', vehicle=vehicle, work_items=work_items, progress=progress)
+
+@bp.route('/update_work_item/<int:item_id>', methods=['POST'])
+def update_work_item(item_id):
+    """Update work item completion status"""
+    is_completed = request.json.get('is_completed', False)
+    
+    work_item = WorkItem.query.get_or_404(item_id)
+    work_item.is_completed = is_completed
+    work_item.completion_date = datetime.now() if is_completed else None
+    
+    db.session.commit()
+    return jsonify({'success': True})
+
+@bp.route('/add_work_item/<vehicle_number>', methods=['POST'])
+def add_work_item(vehicle_number):
+    """Add custom work item"""
+    item_name = request.json.get('item_name', '').strip()
+    
+    if not item_name:
+        return jsonify({'success': False, 'error': 'Item name is required'})
+    
+    vehicle = Inventory.query.filter_by(vehicle_number=vehicle_number).first()
+    if not vehicle:
+        return jsonify({'success': False, 'error': 'Vehicle not found'})
+    
+    # Vehicles checked in before checklists were seeded get theirs now
+    seed_work_status(vehicle)
+    work_status = WorkStatus.query.filter_by(inventory_id=vehicle.id).first()
+    
+    work_item = WorkItem(
+        work_status_id=work_status.id,
+        item_name=item_name,
+        is_completed=False
+    )
+    db.session.add(work_item)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'item_id': work_item.id})
+
+@bp.route('/remove_work_item/<int:item_id>', methods=['POST'])
+def remove_work_item(item_id):
+    """Remove work item"""
+    work_item = WorkItem.query.get_or_404(item_id)
+    db.session.delete(work_item)
+    db.session.commit()
+    
+    return jsonify({'success': True})
+
+@bp.cli.command('seed-work-items')
+def seed_work_items_command():
+    """Seed the default checklist for vehicles that have none"""
+    seeded = 0
+    for vehicle in Inventory.query.order_by(Inventory.id.asc()):
+        if seed_work_status(vehicle):
+            seeded += 1
+    db.session.commit()
+    print(f"Seeded work items for {seeded} vehicles.")
+
+@bp.cli.command('set-work-template')
+@click.argument('items', nargs=-1)
+@click.option('--insurer', default=None, help='Only apply to vehicles with this insurer')
+@click.option('--vehicle', default=None, help='Only apply to vehicles with this vehicle name')
+def set_work_template_command(items, insurer, vehicle):
+    """Replace the checklist template for an insurer and/or vehicle type"""
+    set_template(list(items), insurance_name=insurer, vehicle_name=vehicle)
+    print(f"Saved {len(items)} template items.")
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, current_app, g, request, session
+
+from models import current_branch
+
+# Multi-branch mode gives every workshop its own SQLite file. Each branch is
+# an SQLAlchemy bind; BranchSession routes a request's queries to the branch
+# picked here, so writers in one branch never wait on another branch's lock.
+# Head-office pages query every branch at once with for_each_branch().
+
+BRANCH_HEADER = 'X-Branch'
+
+
+def configure_branches(app):
+    """Turn BRANCH_DATABASES into binds; call before the database is initialized"""
+    branches = app.config.get('BRANCH_DATABASES')
+    if not branches:
+        return app
+    if not app.config['BRANCH']:
+        app.config['BRANCH'] = next(iter(branches))
+    elif app.config['BRANCH'] not in branches:
+        raise ValueError(f"BRANCH {app.config['BRANCH']!r} is not one of BRANCH_DATABASES")
+    app.config['SQLALCHEMY_BINDS'] = dict(branches)
+    # The default engine is the branch CLI commands work on
+    app.config['SQLALCHEMY_DATABASE_URI'] = branches[app.config['BRANCH']]
+    return app
+
+
+def branch_dir(path):
+    """The current branch's subdirectory of path in multi-branch mode, else path"""
+    branch = current_branch()
+    return os.path.join(path, branch) if branch else path
+
+
+def for_each_branch(fn, workers=None):
+    """Call fn() once per branch in parallel, each in its own app context bound to that branch
+
+    Returns {branch: result} in BRANCH_DATABASES order.
+    """
+    app = current_app._get_current_object()
+    branches = list(app.config['BRANCH_DATABASES'])
+
+    def run(branch):
+        with app.app_context():
+            g.branch = branch
+            return fn()
+
+    with ThreadPoolExecutor(max_workers=workers or app.config['HQ_WORKERS'] or len(branches)) as pool:
+        return dict(zip(branches, pool.map(run, branches)))
+
+
+def init_branches(app):
+    """Bind each request to a branch: X-Branch header, then ?branch=, then the one remembered in the session"""
+
+    @app.before_request
+    def select_branch():
+        branches = app.config['BRANCH_DATABASES']
+        if not branches:
+            return
+        branch = request.headers.get(BRANCH_HEADER) or request.args.get('branch')
+        if branch is not None:
+            if branch not in branches:
+                abort(404)
+            if BRANCH_HEADER not in request.headers:
+                session['branch'] = branch
+        else:
+            branch = session.get('branch')
+            if branch not in branches:
+                branch = app.config['BRANCH']
+        g.branch = branch
+
+    @app.context_processor
+    def branch_context():
+        return {'current_branch': current_branch(), 'branches': list(app.config['BRANCH_DATABASES'])}
+
+    return app
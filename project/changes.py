@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import db
+from models.change_log import ChangeLog
+from models.inventory import Inventory
+from snapshots import calculate_progress, pending_vehicle_changes
+
+# Every commit that touches a vehicle or its status records appends the
+# vehicle's id to change_log in the same transaction. Tablets keep a local
+# copy and poll /api/changes?since=<cursor>: the feed returns the current
+# compact state of each vehicle changed after the cursor (or its id under
+# "deleted"), so a sync costs a primary-key range scan instead of reloading
+# the list pages. Compaction keeps only the newest entry per vehicle and
+# drops old entries of vehicles that are gone; a client whose cursor is older
+# than what was dropped is told to start again from 0. Surviving entries keep
+# their ids, so every other cursor stays valid. A sync from 0 holds nothing
+# that was dropped, so until it passes the horizon its cursor is handed out
+# negated, which exempts it from the reset check.
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_new_vehicles(session, flush_context):
+    # New vehicles only get their id in the flush, after the snapshot bookkeeping ran
+    new_ids = {obj.id for obj in session.new if isinstance(obj, Inventory)}
+    if new_ids:
+        session.info.setdefault('new_vehicles', set()).update(new_ids)
+
+
+@event.listens_for(Session, 'before_commit')
+def _log_changes(session):
+    session.flush()
+    vehicle_ids = pending_vehicle_changes(session) | session.info.pop('new_vehicles', set())
+    if vehicle_ids:
+        now = datetime.now()
+        session.execute(insert(ChangeLog), [{'inventory_id': vehicle_id, 'changed_at': now}
+                                            for vehicle_id in sorted(vehicle_ids)])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_new_vehicles(session):
+    session.info.pop('new_vehicles', None)
+
+
+def vehicle_delta(vehicle):
+    """Compact state of a vehicle and its stage records for the change feed"""
+    registration, claim, approval, delivery = vehicle.registration, vehicle.claim, vehicle.approval, vehicle.delivery
+    work_items = vehicle.work_status.work_items if vehicle.work_status else []
+    delta = vehicle.to_dict()
+    delta.update({
+        'version': vehicle.version,
+        'registered': bool(registration and registration.is_completed),
+        'claim_number': claim.claim_number if claim else None,
+        'approved': bool(approval and approval.is_approved),
+        'delivered': bool(delivery and delivery.is_delivered),
+        'delivery_date': delivery.delivery_date.isoformat() if delivery and delivery.delivery_date else None,
+        'work_items': [{'id': item.id, 'name': item.item_name, 'done': bool(item.is_completed)}
+                       for item in work_items],
+        'photos': [{'id': photo.id, 'type': photo.photo_type, 'path': photo.filepath}
+                   for photo in vehicle.photos],
+        'progress': calculate_progress(registration, claim, work_items),
+    })
+    return delta
+
+
+def changes_since(since, limit=500):
+    """Vehicles changed after cursor ``since``, at most ``limit`` log entries per call
+
+    Returns {'cursor', 'more', 'reset', 'vehicles', 'deleted'}; pass ``cursor``
+    back as the next ``since``. ``reset`` means entries after ``since`` were
+    compacted away: drop the local copy and sync again from 0. A negative
+    cursor is a sync from 0 still below the compaction horizon.
+    """
+    horizon = db.session.execute(
+        select(func.max(ChangeLog.id)).where(ChangeLog.inventory_id.is_(None))).scalar() or 0
+    if 0 < since < horizon:
+        return {'cursor': 0, 'more': True, 'reset': True, 'vehicles': [], 'deleted': []}
+
+    entries = db.session.execute(
+        select(ChangeLog.id, ChangeLog.inventory_id)
+        .where(ChangeLog.id > abs(since), ChangeLog.inventory_id.is_not(None))
+        .order_by(ChangeLog.id).limit(limit + 1)
+    ).all()
+    more = len(entries) > limit
+    entries = entries[:limit]
+    position = entries[-1].id if entries else abs(since)
+    if since > 0:
+        cursor = position
+    elif more and position < horizon:
+        cursor = -position
+    else:
+        # A sync from 0 that has read everything below the horizon continues from it
+        cursor = max(position, horizon)
+    if not entries:
+        return {'cursor': cursor, 'more': False, 'reset': False, 'vehicles': [], 'deleted': []}
+
+    vehicle_ids = list(dict.fromkeys(vehicle_id for _, vehicle_id in entries))
+    vehicles = {vehicle.id: vehicle for vehicle in Inventory.query.filter(Inventory.id.in_(vehicle_ids))}
+    return {
+        'cursor': cursor,
+        'more': more,
+        'reset': False,
+        'vehicles': [vehicle_delta(vehicles[vehicle_id]) for vehicle_id in vehicle_ids if vehicle_id in vehicles],
+        'deleted': [vehicle_id for vehicle_id in vehicle_ids if vehicle_id not in vehicles],
+    }
+
+
+def compact_change_log(retention_days=30):
+    """Keep the newest entry per vehicle and drop entries of vehicles gone for retention_days
+
+    Dropping gone vehicles leaves a horizon marker at the newest dropped id;
+    only cursors before it have to resync. Returns the number of entries removed.
+    """
+    latest = select(func.max(ChangeLog.id)).where(ChangeLog.inventory_id.is_not(None)).group_by(ChangeLog.inventory_id)
+    removed = db.session.execute(
+        delete(ChangeLog).where(ChangeLog.inventory_id.is_not(None), ChangeLog.id.not_in(latest))).rowcount
+
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    gone = db.session.execute(
+        select(ChangeLog.id).where(ChangeLog.inventory_id.is_not(None), ChangeLog.changed_at < cutoff,
+                                   ChangeLog.inventory_id.not_in(select(Inventory.id)))
+    ).scalars().all()
+    if gone:
+        horizon = db.session.execute(
+            select(func.max(ChangeLog.id)).where(ChangeLog.inventory_id.is_(None))).scalar() or 0
+        db.session.execute(delete(ChangeLog).where(ChangeLog.id.in_(gone) | ChangeLog.inventory_id.is_(None)))
+        # Reuse the newest freed id as the horizon so only cursors before it have to resync
+        horizon = max(max(gone), horizon)
+        db.session.execute(insert(ChangeLog), [{'id': horizon, 'inventory_id': None, 'changed_at': datetime.now()}])
+        removed += len(gone)
+    db.session.commit()
+    return removed
+
+
+def init_changes(app):
+    """Register the compact-changes command"""
+
+    @app.cli.command('compact-changes')
+    @click.option('--days', default=None, type=int, help='Keep entries of deleted or archived vehicles this long '
+                                                          '(default CHANGE_LOG_RETENTION_DAYS)')
+    def compact_changes_command(days):
+        """Shrink the change feed to one entry per vehicle"""
+        removed = compact_change_log(days if days is not None else current_app.config['CHANGE_LOG_RETENTION_DAYS'])
+        click.echo(f'Removed {removed} change log entries.')
+
+    return app
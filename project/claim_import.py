@@ -0,0 +1,316 @@
+import csv
+import io
+import os
+import re
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from branches import branch_dir
+from models import db
+from models.inventory import Inventory
+from models.claims import Claim
+from models.approvals import Approval
+from reports.prebuild import mark_reports_stale
+from snapshots import mark_vehicle_changed
+
+# Insurer spreadsheets (CSV or XLSX) of claim numbers and approval decisions.
+# A file is read row by row into a plan: every row is matched to a vehicle
+# and diffed against its current claim and approval with a few set queries
+# for the whole file. The plan is shown as a preview and applied in one
+# transaction.
+
+HEADER_ALIASES = {
+    'vehicle_number': ('vehicle_number', 'vehicle_no', 'vehicle', 'registration', 'registration_number', 'reg_no'),
+    'chassis_number': ('chassis_number', 'chassis_no', 'chassis', 'vin'),
+    'engine_number': ('engine_number', 'engine_no', 'engine'),
+    'claim_number': ('claim_number', 'claim_no', 'claim'),
+    'approved': ('approved', 'approval', 'approval_status', 'decision', 'status'),
+}
+APPROVED_VALUES = {'yes', 'y', 'true', '1', 'approved', 'accept', 'accepted'}
+REJECTED_VALUES = {'no', 'n', 'false', '0', 'rejected', 'declined', 'pending', 'not approved'}
+MATCH_KEYS = ('vehicle_number', 'chassis_number', 'engine_number')
+CHUNK_SIZE = 500
+
+
+class ClaimImportError(ValueError):
+    """The file cannot be read as a claims spreadsheet"""
+
+
+def _header_key(value):
+    name = re.sub(r'[^a-z0-9]+', '_', str(value or '').strip().lower()).strip('_')
+    for key, aliases in HEADER_ALIASES.items():
+        if name in aliases:
+            return key
+    return None
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet numbers such as claim 123456.0
+    return str(value).strip()
+
+
+def read_rows(stream, filename):
+    """Yield (line, {column: text}) for each data row of a CSV or XLSX file, reading it incrementally"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            yield from _keyed_rows(rows)
+        finally:
+            workbook.close()
+    elif extension == '.csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        yield from _keyed_rows(csv.reader(text))
+    else:
+        raise ClaimImportError('Upload a .csv or .xlsx file')
+
+
+def _keyed_rows(rows):
+    header = next(rows, None)
+    if header is None:
+        raise ClaimImportError('The file is empty')
+    keys = [_header_key(value) for value in header]
+    if not any(key in MATCH_KEYS for key in keys):
+        raise ClaimImportError('No vehicle, chassis or engine number column found')
+    if 'claim_number' not in keys and 'approved' not in keys:
+        raise ClaimImportError('No claim number or approval column found')
+    for line, row in enumerate(rows, start=2):
+        record = {key: _cell_text(value) for key, value in zip(keys, row) if key}
+        if any(record.values()):
+            yield line, record
+
+
+def _parse_approval(text):
+    if not text:
+        return None
+    value = text.lower()
+    if value in APPROVED_VALUES:
+        return True
+    if value in REJECTED_VALUES:
+        return False
+    raise ValueError(f'Unrecognised approval value "{text}"')
+
+
+def _lookup(column, values):
+    """Map each value to the inventory ids holding it, in chunked IN queries on an indexed column"""
+    found = {}
+    values = list(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        for vehicle_id, value in db.session.execute(
+                select(Inventory.id, column).where(column.in_(values[start:start + CHUNK_SIZE]))):
+            found.setdefault(value, set()).add(vehicle_id)
+    return found
+
+
+def _by_vehicle(model, vehicle_ids):
+    rows = {}
+    vehicle_ids = list(vehicle_ids)
+    for start in range(0, len(vehicle_ids), CHUNK_SIZE):
+        for row in db.session.execute(
+                select(model.__table__).where(model.inventory_id.in_(vehicle_ids[start:start + CHUNK_SIZE]))):
+            rows[row.inventory_id] = row
+    return rows
+
+
+def plan_import(rows):
+    """Match rows to vehicles and diff them against current claims and approvals
+
+    Returns a list of dicts, one per row, with ``line``, ``key`` (the
+    identifier used), ``vehicle_id``, ``vehicle_number``, ``claim`` and
+    ``approval`` as (old, new) pairs when they change, and ``error``.
+    """
+    entries = []
+    for line, record in rows:
+        entry = {'line': line, 'key': '', 'vehicle_id': None, 'vehicle_number': None,
+                 'claim': None, 'approval': None, 'error': None, 'record': record}
+        entry['key'] = next((record[key] for key in MATCH_KEYS if record.get(key)), '')
+        try:
+            record['approved'] = _parse_approval(record.get('approved'))
+        except ValueError as error:
+            entry['error'] = str(error)
+        entries.append(entry)
+
+    # One set lookup per identifier column; vehicle numbers are stored upper case
+    lookups = {}
+    for key in MATCH_KEYS:
+        values = {entry['record'][key] for entry in entries if entry['record'].get(key)}
+        values |= {value.upper() for value in values}
+        lookups[key] = _lookup(getattr(Inventory, key), values)
+
+    for entry in entries:
+        if entry['error']:
+            continue
+        record = entry['record']
+        for key in MATCH_KEYS:
+            value = record.get(key)
+            if value:
+                vehicle_ids = lookups[key].get(value) or lookups[key].get(value.upper())
+                if vehicle_ids:
+                    break
+        else:
+            vehicle_ids = None
+        if not vehicle_ids:
+            entry['error'] = 'No matching vehicle'
+        elif len(vehicle_ids) > 1:
+            entry['error'] = f'{len(vehicle_ids)} vehicles match {key.replace("_", " ")} {value}'
+        else:
+            entry['vehicle_id'] = next(iter(vehicle_ids))
+
+    matched = [entry for entry in entries if entry['vehicle_id'] is not None]
+    vehicle_numbers = {}
+    matched_ids = list({entry['vehicle_id'] for entry in matched})
+    for start in range(0, len(matched_ids), CHUNK_SIZE):
+        vehicle_numbers.update(db.session.execute(
+            select(Inventory.id, Inventory.vehicle_number).where(
+                Inventory.id.in_(matched_ids[start:start + CHUNK_SIZE]))).all())
+    claims = _by_vehicle(Claim, vehicle_numbers)
+    approvals = _by_vehicle(Approval, vehicle_numbers)
+
+    seen = {}
+    for entry in matched:
+        vehicle_id = entry['vehicle_id']
+        entry['vehicle_number'] = vehicle_numbers.get(vehicle_id)
+        if vehicle_id in seen:
+            entry['error'] = f'Vehicle already listed on line {seen[vehicle_id]}'
+            continue
+        seen[vehicle_id] = entry['line']
+
+        record = entry['record']
+        current_claim = claims[vehicle_id].claim_number if vehicle_id in claims else None
+        if record.get('claim_number') and record['claim_number'] != current_claim:
+            entry['claim'] = (current_claim, record['claim_number'])
+        current_approval = bool(approvals[vehicle_id].is_approved) if vehicle_id in approvals else None
+        if record.get('approved') is not None and record['approved'] != current_approval:
+            entry['approval'] = (current_approval, record['approved'])
+
+    _check_duplicate_claims(matched)
+    for entry in entries:
+        del entry['record']
+    return entries
+
+
+def _check_duplicate_claims(entries):
+    """Flag claim numbers used twice in the file or already held by another vehicle, in one query"""
+    changing = [entry for entry in entries if entry['claim'] and not entry['error']]
+    in_file = {}
+    for entry in changing:
+        in_file.setdefault(entry['claim'][1], []).append(entry)
+
+    numbers = list(in_file)
+    owners = {}
+    for start in range(0, len(numbers), CHUNK_SIZE):
+        owners.update(db.session.execute(
+            select(Claim.claim_number, Claim.inventory_id).where(
+                Claim.claim_number.in_(numbers[start:start + CHUNK_SIZE]))).all())
+    single = []
+    for number, users in in_file.items():
+        if len(users) > 1:
+            for entry in users:
+                entry['error'] = f'Claim number {number} appears on {len(users)} rows'
+        else:
+            single.append(users[0])
+
+    # A vehicle whose row replaces its claim releases its old number, but only
+    # if that row goes through; each rejection can keep another number taken,
+    # so check again until no more rows are rejected
+    rejected = True
+    while rejected:
+        rejected = False
+        released = {entry['vehicle_id'] for entry in single if not entry['error']}
+        for entry in single:
+            number = entry['claim'][1]
+            owner = owners.get(number)
+            if not entry['error'] and owner is not None and owner != entry['vehicle_id'] and owner not in released:
+                entry['error'] = f'Claim number {number} already belongs to another vehicle'
+                rejected = True
+
+
+def summarize(plan):
+    """Counts of rows by outcome"""
+    return {
+        'rows': len(plan),
+        'claims': sum(1 for entry in plan if entry['claim'] and not entry['error']),
+        'approvals': sum(1 for entry in plan if entry['approval'] and not entry['error']),
+        'unchanged': sum(1 for entry in plan if not (entry['claim'] or entry['approval'] or entry['error'])),
+        'errors': sum(1 for entry in plan if entry['error']),
+    }
+
+
+def apply_import(plan):
+    """Upsert every valid change of a plan in a single transaction and return the summary"""
+    now = datetime.now()
+    valid = [entry for entry in plan if not entry['error']]
+    claim_rows = [{'inventory_id': entry['vehicle_id'], 'claim_number': entry['claim'][1], 'updated_date': now}
+                  for entry in valid if entry['claim']]
+    approval_rows = [{'inventory_id': entry['vehicle_id'], 'is_approved': entry['approval'][1],
+                      'approval_date': now if entry['approval'][1] else None}
+                     for entry in valid if entry['approval']]
+
+    if claim_rows:
+        statement = sqlite_insert(Claim)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['inventory_id'],
+            set_={'claim_number': statement.excluded.claim_number, 'updated_date': statement.excluded.updated_date}
+        ), claim_rows)
+    if approval_rows:
+        statement = sqlite_insert(Approval)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['inventory_id'],
+            set_={'is_approved': statement.excluded.is_approved, 'approval_date': statement.excluded.approval_date}
+        ), approval_rows)
+    for entry in valid:
+        if entry['claim'] or entry['approval']:
+            mark_vehicle_changed(entry['vehicle_id'])
+    db.session.commit()
+    if claim_rows or approval_rows:
+        mark_reports_stale(branch_dir(current_app.config['REPORTS_DIR']))
+    return summarize(plan)
+
+
+def plan_file(path):
+    with open(path, 'rb') as stream:
+        return plan_import(read_rows(stream, path))
+
+
+def _describe(entry):
+    changes = []
+    if entry['claim']:
+        changes.append(f"claim {entry['claim'][0] or '-'} -> {entry['claim'][1]}")
+    if entry['approval']:
+        old, new = entry['approval']
+        changes.append(f"approval {'-' if old is None else old} -> {new}")
+    return ', '.join(changes) or 'unchanged'
+
+
+def init_claim_import(app):
+    """Register the import-claims command"""
+
+    @app.cli.command('import-claims')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--apply', 'apply_changes', is_flag=True, help='Write the changes; without it only the preview is shown')
+    def import_claims_command(path, apply_changes):
+        """Preview or apply claim numbers and approvals from an insurer CSV/XLSX file"""
+        try:
+            plan = plan_file(path)
+        except ClaimImportError as error:
+            raise click.ClickException(str(error))
+        for entry in plan:
+            if entry['error']:
+                click.echo(f"line {entry['line']}: {entry['key']}: ERROR {entry['error']}")
+            elif entry['claim'] or entry['approval']:
+                click.echo(f"line {entry['line']}: {entry['vehicle_number']}: {_describe(entry)}")
+        summary = apply_import(plan) if apply_changes else summarize(plan)
+        click.echo(f"{summary['rows']} rows: {summary['claims']} claim and {summary['approvals']} approval changes, "
+                   f"{summary['unchanged']} unchanged, {summary['errors']} errors"
+                   + ('' if apply_changes else ' (preview only, pass --apply to write)'))
+
+    return app
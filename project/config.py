@@ -0,0 +1,98 @@
+import os
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def env_mapping(name):
+    """Parse comma-separated key=value pairs, keeping their order"""
+    pairs = [item.split('=', 1) for item in os.environ.get(name, '').split(',') if '=' in item]
+    return {key.strip(): value.strip() for key, value in pairs}
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    return value.strip().lower() in ('1', 'true', 'yes', 'on') if value not in (None, '') else default
+
+
+class Config:
+    """Default configuration, overridable through environment variables"""
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///car_service.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Multi-branch mode: one database per workshop, e.g. north=sqlite:///north.db,south=sqlite:///south.db
+    BRANCH_DATABASES = env_mapping('BRANCH_DATABASES')
+    # Branch for CLI commands and for requests that have not picked one (default: the first)
+    BRANCH = os.environ.get('BRANCH', '')
+    # Threads used by head-office pages to query every branch at once (0 = one per branch)
+    HQ_WORKERS = env_int('HQ_WORKERS', 0)
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'photos')
+    # Remove file size limit for images
+    MAX_CONTENT_LENGTH = None
+
+    COMPRESS_MIN_SIZE = env_int('COMPRESS_MIN_SIZE', 500)
+    COMPRESS_LEVEL = env_int('COMPRESS_LEVEL', 6)
+    SNAPSHOT_CACHE_SIZE = env_int('SNAPSHOT_CACHE_SIZE', 512)
+    SNAPSHOT_CACHE_TTL = env_int('SNAPSHOT_CACHE_TTL', 30)
+    # Per-process dashboard fragments: one progress entry per vehicle plus the rendered rows
+    FRAGMENT_CACHE_SIZE = env_int('FRAGMENT_CACHE_SIZE', 20000)
+
+    # Delivered vehicles move to per-year archive files (default: next to the database)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', '')
+    ARCHIVE_AFTER_DAYS = env_int('ARCHIVE_AFTER_DAYS', 90)
+
+    REPORTS_DIR = os.environ.get('REPORTS_DIR', 'reports')
+    # Off-peak pre-generation of the standard reports (cron syntax, local time)
+    REPORT_PREBUILD_SCHEDULE = os.environ.get('REPORT_PREBUILD_SCHEDULE', '30 6 * * *')
+    REPORT_PREBUILD_WORKERS = env_int('REPORT_PREBUILD_WORKERS', 2)
+    # Build reports from an in-memory point-in-time copy instead of the live file
+    REPORT_SNAPSHOT = env_bool('REPORT_SNAPSHOT', False)
+
+    # Uploaded originals are turned upright, stripped of metadata, capped at PHOTO_MAX_PX
+    # and re-encoded as PHOTO_FORMAT ('jpeg' or 'webp'); backfill with flask normalize-photos
+    PHOTO_NORMALIZE = env_bool('PHOTO_NORMALIZE', True)
+    PHOTO_MAX_PX = env_int('PHOTO_MAX_PX', 2560)
+    PHOTO_QUALITY = env_int('PHOTO_QUALITY', 85)
+    PHOTO_FORMAT = os.environ.get('PHOTO_FORMAT', 'jpeg')
+    # Processes for flask normalize-photos (0 = CPUs); uploads are normalized in the request itself
+    PHOTO_INGEST_WORKERS = env_int('PHOTO_INGEST_WORKERS', 0)
+    # The upload page downscales to PHOTO_MAX_PX / PHOTO_QUALITY in the browser and sends files in parallel
+    UPLOAD_CLIENT_RESIZE = env_bool('UPLOAD_CLIENT_RESIZE', True)
+    UPLOAD_CONCURRENCY = env_int('UPLOAD_CONCURRENCY', 3)
+    UPLOAD_RETRIES = env_int('UPLOAD_RETRIES', 3)
+
+    # Insurer photo sheets: downscaled photo cache (default instance/photo-cache) and pool size (0 = CPUs)
+    PHOTO_CACHE_DIR = os.environ.get('PHOTO_CACHE_DIR', '')
+    PHOTO_SHEET_MAX_PX = env_int('PHOTO_SHEET_MAX_PX', 800)
+    PHOTO_SHEET_WORKERS = env_int('PHOTO_SHEET_WORKERS', 0)
+
+    # Insurer claim/approval spreadsheets awaiting confirmation (default instance/imports)
+    IMPORT_DIR = os.environ.get('IMPORT_DIR', '')
+
+    # Change feed for tablets (/api/changes); flask compact-changes forgets deleted vehicles after this long
+    CHANGES_PAGE_SIZE = env_int('CHANGES_PAGE_SIZE', 500)
+    CHANGE_LOG_RETENTION_DAYS = env_int('CHANGE_LOG_RETENTION_DAYS', 30)
+
+    # Async read API (uvicorn --factory asgi:create_asgi_app): aiosqlite connections per database
+    ASYNC_DB_POOL_SIZE = env_int('ASYNC_DB_POOL_SIZE', 4)
+    ASYNC_DB_POOL_TIMEOUT = env_int('ASYNC_DB_POOL_TIMEOUT', 30)
+
+    # Opt-in profiling: requests carrying PROFILE_TOKEN (X-Profile header or ?_profile=) and a
+    # PROFILE_JOB_RATE fraction of report builds; listed on /admin/profiles (default instance/profiles)
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sample')  # 'sample' (collapsed stacks) or 'cprofile'
+    PROFILE_INTERVAL_MS = env_int('PROFILE_INTERVAL_MS', 5)
+    PROFILE_JOB_RATE = env_float('PROFILE_JOB_RATE', 0.0)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+    PROFILE_KEEP = env_int('PROFILE_KEEP', 200)
+
+    # Online backups (flask backup-db); default directory is backups/ next to the database
+    BACKUP_DIR = os.environ.get('BACKUP_DIR', '')
+    BACKUP_KEEP = env_int('BACKUP_KEEP', 7)
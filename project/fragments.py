@@ -0,0 +1,50 @@
+from flask import current_app
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+from models import current_branch
+from models.inventory import Inventory
+from snapshots import pending_vehicle_changes
+
+# Rendered pieces of pages, keyed by (kind, branch, inventory id, version).
+# Every commit that touches a vehicle bumps inventory.version, so a changed
+# vehicle misses under its new key in every process and its old entries age
+# out of the LRU; nothing has to be invalidated.
+fragment_cache = LRUCache(maxsize=20000)
+
+
+def vehicle_fragments(kind, stamps, build):
+    """Return {vehicle_id: fragment} for (vehicle_id, version) stamps
+
+    Only cache misses are passed to ``build(vehicle_ids)``, which returns
+    {vehicle_id: fragment} for them.
+    """
+    fragment_cache.maxsize = current_app.config.get('FRAGMENT_CACHE_SIZE', 20000)
+
+    branch = current_branch()
+    fragments = {}
+    missing = {}
+    for vehicle_id, version in stamps:
+        fragment = fragment_cache.get((kind, branch, vehicle_id, version))
+        if fragment is None:
+            missing[vehicle_id] = version
+        else:
+            fragments[vehicle_id] = fragment
+
+    if missing:
+        for vehicle_id, fragment in build(list(missing)).items():
+            fragment_cache.set((kind, branch, vehicle_id, missing[vehicle_id]), fragment)
+            fragments[vehicle_id] = fragment
+    return fragments
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_versions(session):
+    # Flush first so changes still pending at commit are counted too
+    session.flush()
+    vehicle_ids = pending_vehicle_changes(session)
+    if vehicle_ids:
+        inventory = Inventory.__table__
+        session.execute(
+            update(inventory).where(inventory.c.id.in_(vehicle_ids)).values(version=inventory.c.version + 1))
@@ -0,0 +1,37 @@
+import os
+import resource
+import shutil
+import time
+
+# Shared directory for prometheus_client's multiprocess registry. Each
+# worker writes its own files here and /metrics aggregates across them.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(os.getcwd(), 'instance', 'metrics'))
+
+wsgi_app = 'app:create_app()'
+bind = '0.0.0.0:9696'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+max_requests = 1000
+max_requests_jitter = 100
+
+
+def on_starting(server):
+    """Start each run with an empty metrics directory"""
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    worker.started_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """Log how long the worker took to load the app and its peak RSS"""
+    elapsed = time.perf_counter() - worker.started_at
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker.log.info('Worker %s ready in %.0f ms, max RSS %.1f MiB', worker.pid, elapsed * 1000, max_rss)
+
+
+def child_exit(server, worker):
+    """Drop live gauges owned by workers that have exited"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
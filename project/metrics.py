@@ -0,0 +1,125 @@
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess, REGISTRY)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+# When PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py) every worker
+# writes its samples to mmap'd files in that directory and /metrics merges
+# them. Without it the default in-process registry is used, which is what
+# tests and the development server get.
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by Flask endpoint',
+    ['endpoint', 'method', 'status']
+)
+DB_QUERIES = Counter(
+    'db_queries_total', 'SQL statements executed', ['statement']
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+REPORT_BUILD_SECONDS = Histogram(
+    'report_build_duration_seconds', 'ReportGenerator build time',
+    ['report_type', 'format'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+PHOTO_BYTES = Counter(
+    'photo_bytes_total', 'Photo bytes transferred', ['direction']
+)
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+class SQLiteFileCollector:
+    """Report SQLite database and WAL file sizes of every bind at scrape time"""
+
+    def __init__(self, database_paths):
+        # {bind: path}: the branch databases by name, or the one database as "default"
+        self.database_paths = database_paths
+
+    def collect(self):
+        gauge = GaugeMetricFamily('sqlite_file_size_bytes', 'Size of SQLite files on disk', labels=['bind', 'file'])
+        for bind, database_path in self.database_paths.items():
+            for label, path in (('db', database_path), ('wal', database_path + '-wal')):
+                try:
+                    gauge.add_metric([bind, label], os.path.getsize(path))
+                except OSError:
+                    gauge.add_metric([bind, label], 0)
+        yield gauge
+
+
+def _instrument_engine(engine):
+    """Count SQL statements and time pool checkouts on an engine"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERIES.labels(statement=statement.lstrip().split(' ', 1)[0].upper()).inc()
+
+    pool = engine.pool
+    pool_connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+
+def init_metrics(app, db):
+    """Record request, database and photo metrics and expose them on /metrics"""
+    with app.app_context():
+        for engine in set(db.engines.values()):
+            _instrument_engine(engine)
+        # In multi-branch mode the default engine is one of the branch databases again
+        database_paths = {bind: engine.url.database
+                          for bind, engine in db.engines.items() if bind and engine.url.database}
+        if not database_paths and db.engine.url.database:
+            database_paths = {'default': db.engine.url.database}
+
+    file_collector = SQLiteFileCollector(database_paths) if database_paths else None
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            REQUEST_LATENCY.labels(
+                endpoint=request.endpoint or 'unknown',
+                method=request.method,
+                status=str(response.status_code)
+            ).observe(time.perf_counter() - start)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint"""
+        if multiprocess_enabled():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = CollectorRegistry()
+            registry.register(_DefaultRegistryProxy())
+        if file_collector:
+            registry.register(file_collector)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+    return app
+
+
+class _DefaultRegistryProxy:
+    """Expose the process-local default registry inside a per-scrape registry"""
+
+    def collect(self):
+        return REGISTRY.collect()
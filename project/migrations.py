@@ -0,0 +1,241 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import click
+
+# Schema changes for existing databases. Fresh databases get the current
+# schema from db.create_all(); PRAGMA user_version records which of these
+# steps a database has been through. Migrations use plain SQL so they keep
+# working after the models move on.
+
+SCHEMA_VERSION = 4
+
+# Tables that referenced inventory through a duplicated vehicle_number.
+# Each entry: (table, CREATE statement for the new layout, data columns, indexes)
+INVENTORY_FK_TABLES = [
+    ('photos', '''
+        CREATE TABLE photos_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            inventory_id INTEGER NOT NULL REFERENCES inventory (id) ON DELETE CASCADE,
+            photo_type VARCHAR(50) NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            filepath VARCHAR(500) NOT NULL,
+            upload_date DATETIME
+        )''', ['id', 'photo_type', 'filename', 'filepath', 'upload_date'],
+     ['CREATE INDEX ix_photos_inventory_id ON photos (inventory_id)']),
+    ('registration_status', '''
+        CREATE TABLE registration_status_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            inventory_id INTEGER NOT NULL UNIQUE REFERENCES inventory (id) ON DELETE CASCADE,
+            is_completed BOOLEAN,
+            completion_date DATETIME
+        )''', ['id', 'is_completed', 'completion_date'], []),
+    ('claims', '''
+        CREATE TABLE claims_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            inventory_id INTEGER NOT NULL UNIQUE REFERENCES inventory (id) ON DELETE CASCADE,
+            claim_number VARCHAR(100),
+            updated_date DATETIME
+        )''', ['id', 'claim_number', 'updated_date'], []),
+    ('approvals', '''
+        CREATE TABLE approvals_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            inventory_id INTEGER NOT NULL UNIQUE REFERENCES inventory (id) ON DELETE CASCADE,
+            is_approved BOOLEAN,
+            approval_date DATETIME
+        )''', ['id', 'is_approved', 'approval_date'], []),
+    ('work_status', '''
+        CREATE TABLE work_status_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            inventory_id INTEGER NOT NULL UNIQUE REFERENCES inventory (id) ON DELETE CASCADE,
+            created_date DATETIME
+        )''', ['id', 'created_date'], []),
+    ('deliveries', '''
+        CREATE TABLE deliveries_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            inventory_id INTEGER NOT NULL UNIQUE REFERENCES inventory (id) ON DELETE CASCADE,
+            is_delivered BOOLEAN,
+            delivery_date DATETIME,
+            delivered_by VARCHAR(100),
+            notes TEXT
+        )''', ['id', 'is_delivered', 'delivery_date', 'delivered_by', 'notes'], []),
+]
+
+WORK_ITEMS_TABLE = ('work_items', '''
+    CREATE TABLE work_items_new (
+        id INTEGER NOT NULL PRIMARY KEY,
+        work_status_id INTEGER NOT NULL REFERENCES work_status (id) ON DELETE CASCADE,
+        item_name VARCHAR(100) NOT NULL,
+        is_completed BOOLEAN,
+        completion_date DATETIME
+    )''', ['id', 'work_status_id', 'item_name', 'is_completed', 'completion_date'],
+    ['CREATE INDEX ix_work_items_work_status_id ON work_items (work_status_id)'])
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def _migrate_inventory_foreign_keys(conn, log):
+    """Replace vehicle_number string links with an inventory_id foreign key"""
+    for table, create_sql, columns, indexes in INVENTORY_FK_TABLES:
+        existing = _columns(conn, table)
+        if not existing or 'vehicle_number' not in existing:
+            continue
+
+        orphans = conn.execute(
+            f'SELECT COUNT(*) FROM {table} t LEFT JOIN inventory i ON i.vehicle_number = t.vehicle_number '
+            f'WHERE i.id IS NULL'
+        ).fetchone()[0]
+
+        column_list = ', '.join(columns)
+        source_list = ', '.join(f't.{column}' for column in columns)
+        conn.execute(create_sql)
+        conn.execute(
+            f'INSERT INTO {table}_new ({column_list}, inventory_id) '
+            f'SELECT {source_list}, i.id FROM {table} t JOIN inventory i ON i.vehicle_number = t.vehicle_number'
+        )
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+        for index_sql in indexes:
+            conn.execute(index_sql)
+        log(f'{table}: linked by inventory_id' + (f', dropped {orphans} orphaned rows' if orphans else ''))
+
+    # Rebuild work_items so its foreign key cascades and is indexed
+    table, create_sql, columns, indexes = WORK_ITEMS_TABLE
+    if _columns(conn, table) and not conn.execute(
+            f"SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ix_work_items_work_status_id'").fetchone():
+        orphans = conn.execute(
+            f'SELECT COUNT(*) FROM {table} WHERE work_status_id NOT IN (SELECT id FROM work_status)'
+        ).fetchone()[0]
+        column_list = ', '.join(columns)
+        conn.execute(create_sql)
+        conn.execute(
+            f'INSERT INTO {table}_new ({column_list}) SELECT {column_list} FROM {table} '
+            f'WHERE work_status_id IN (SELECT id FROM work_status)'
+        )
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+        for index_sql in indexes:
+            conn.execute(index_sql)
+        log('work_items: foreign key now cascades' + (f', dropped {orphans} orphaned rows' if orphans else ''))
+
+
+def _add_inventory_version(conn, log):
+    """Add the per-vehicle version stamp used by the dashboard fragment cache"""
+    if 'version' not in _columns(conn, 'inventory'):
+        conn.execute('ALTER TABLE inventory ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        log('inventory: added version column')
+
+
+LOOKUP_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_inventory_engine_number ON inventory (engine_number)',
+    'CREATE INDEX IF NOT EXISTS ix_inventory_chassis_number ON inventory (chassis_number)',
+    'CREATE INDEX IF NOT EXISTS ix_claims_claim_number ON claims (claim_number)',
+]
+
+
+def _add_lookup_indexes(conn, log):
+    """Index the columns insurer spreadsheets are matched and checked on"""
+    for index_sql in LOOKUP_INDEXES:
+        conn.execute(index_sql)
+    log('inventory, claims: added lookup indexes')
+
+
+def _add_change_log(conn, log):
+    """Create the change feed and list every current vehicle once, so a client syncing from 0 sees them all"""
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS change_log ('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, inventory_id INTEGER, changed_at DATETIME NOT NULL)'
+    )
+    conn.execute(
+        "INSERT INTO change_log (inventory_id, changed_at) "
+        "SELECT id, datetime('now', 'localtime') FROM inventory ORDER BY serial_number"
+    )
+    log('change_log: created')
+
+
+MIGRATIONS = [
+    (1, _migrate_inventory_foreign_keys),
+    (2, _add_inventory_version),
+    (3, _add_lookup_indexes),
+    (4, _add_change_log),
+]
+
+
+def backup_database(path, suffix):
+    """Copy a live SQLite database with the online backup API"""
+    backup_path = f"{path}.{suffix}.bak"
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(backup_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return backup_path
+
+
+def upgrade_database(path, log=print):
+    """Bring an existing SQLite database up to SCHEMA_VERSION in place"""
+    if not os.path.exists(path):
+        return SCHEMA_VERSION
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        pending = [(target, step) for target, step in MIGRATIONS if target > version]
+        if not pending:
+            return version
+
+        log(f"Backed up to {backup_database(path, 'pre-v' + str(pending[0][0]) + datetime.now().strftime('-%Y%m%d%H%M%S'))}")
+
+        # Table rebuilds need foreign keys off; checked again before committing
+        conn.execute('PRAGMA foreign_keys = OFF')
+        for target, step in pending:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                step(conn, log)
+                violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+                if violations:
+                    raise RuntimeError(f'Foreign key violations after migration {target}: {violations[:5]}')
+                conn.execute(f'PRAGMA user_version = {target}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            log(f'Database upgraded to schema version {target}')
+            version = target
+        return version
+    finally:
+        conn.close()
+
+
+def prepare_database(app, db, log=print):
+    """Upgrade each existing database (every branch in multi-branch mode), then create any missing tables"""
+    with app.app_context():
+        engines = {str(engine.url): engine for engine in db.engines.values()}
+        for engine in engines.values():
+            database_path = engine.url.database
+            fresh = not database_path or not os.path.exists(database_path)
+            if not fresh:
+                engine.dispose()
+                upgrade_database(database_path, log=log)
+            db.metadata.create_all(engine)
+            if fresh and database_path:
+                # create_all already produced the current schema
+                with sqlite3.connect(database_path) as conn:
+                    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def init_migrations(app, db):
+    """Register the upgrade-db command"""
+
+    @app.cli.command('upgrade-db')
+    def upgrade_db():
+        """Migrate an existing database to the current schema and create missing tables"""
+        prepare_database(app, db, log=click.echo)
+        click.echo('Database is up to date.')
+
+    return app
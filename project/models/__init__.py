@@ -1,12 +1,40 @@
+import sqlite3
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
-db = SQLAlchemy()
+def current_branch():
+    """Branch whose database the current request or command uses; None unless running multi-branch"""
+    if not has_app_context() or not current_app.config.get('BRANCH_DATABASES'):
+        return None
+    return g.get('branch') or current_app.config['BRANCH']
+
+class BranchSession(Session):
+    """Session that sends every query to the current branch's database in multi-branch mode"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        branch = current_branch() if bind is None else None
+        if branch is not None:
+            return self._db.engines[branch]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': BranchSession})
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked to"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
 
 def init_db(app):
     """Initialize database with Flask app"""
     db.init_app(app)
     
     # Import all models to ensure they're registered
-    from . import inventory, photos, work_status, claims, approvals, registration_status, delivery
+    from . import inventory, photos, work_status, claims, approvals, registration_status, delivery, kpis, change_log
     
     return db
\ No newline at end of file
@@ -6,17 +6,17 @@ class Approval(db.Model):
     __tablename__ = 'approvals'
     
     id = db.Column(db.Integer, primary_key=True)
-    vehicle_number = db.Column(db.String(20), unique=True, nullable=False)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id', ondelete='CASCADE'), unique=True, nullable=False)
     is_approved = db.Column(db.Boolean, default=False)
     approval_date = db.Column(db.DateTime)
     
     def __repr__(self):
-        return f'<Approval {self.vehicle_number} - {self.is_approved}>'
+        return f'<Approval {self.inventory_id} - {self.is_approved}>'
     
     def to_dict(self):
         return {
             'id': self.id,
-            'vehicle_number': self.vehicle_number,
+            'inventory_id': self.inventory_id,
             'is_approved': self.is_approved,
             'approval_date': self.approval_date.isoformat() if self.approval_date else None
         }
\ No newline at end of file
@@ -0,0 +1,17 @@
+from . import db
+from datetime import datetime
+
+class ChangeLog(db.Model):
+    """Append-only feed of changed vehicles read by /api/changes"""
+    __tablename__ = 'change_log'
+    # AUTOINCREMENT: ids are client cursors and must never be reused after compaction
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: the entry for a deleted or archived vehicle must outlive it.
+    # NULL marks a compaction horizon; cursors older than it must resync.
+    inventory_id = db.Column(db.Integer)
+    changed_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    
+    def __repr__(self):
+        return f'<ChangeLog {self.id} - {self.inventory_id}>'
@@ -6,17 +6,17 @@ class Claim(db.Model):
     __tablename__ = 'claims'
     
     id = db.Column(db.Integer, primary_key=True)
-    vehicle_number = db.Column(db.String(20), unique=True, nullable=False)
-    claim_number = db.Column(db.String(100))
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id', ondelete='CASCADE'), unique=True, nullable=False)
+    claim_number = db.Column(db.String(100), index=True)
     updated_date = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<Claim {self.vehicle_number} - {self.claim_number}>'
+        return f'<Claim {self.inventory_id} - {self.claim_number}>'
     
     def to_dict(self):
         return {
             'id': self.id,
-            'vehicle_number': self.vehicle_number,
+            'inventory_id': self.inventory_id,
             'claim_number': self.claim_number,
             'updated_date': self.updated_date.isoformat() if self.updated_date else None
         }
\ No newline at end of file
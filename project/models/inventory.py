@@ -13,10 +13,31 @@ class Inventory(db.Model):
     phone_number = db.Column(db.String(15))
     insurance_name = db.Column(db.String(100))
     kilometer_reading = db.Column(db.Integer, nullable=False)
-    engine_number = db.Column(db.String(50), nullable=False)
-    chassis_number = db.Column(db.String(50), nullable=False)
+    engine_number = db.Column(db.String(50), nullable=False, index=True)
+    chassis_number = db.Column(db.String(50), nullable=False, index=True)
     description = db.Column(db.Text)
     check_in_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every commit that changes the vehicle or its status records
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    # Related records are keyed by inventory.id; vehicle_number lives only here
+    photos = db.relationship('Photo', backref='vehicle', lazy='selectin', order_by='Photo.id',
+                             cascade='all, delete-orphan', passive_deletes=True)
+    registration = db.relationship('RegistrationStatus', backref='vehicle', uselist=False, lazy='selectin',
+                                   cascade='all, delete-orphan', passive_deletes=True)
+    claim = db.relationship('Claim', backref='vehicle', uselist=False, lazy='selectin',
+                            cascade='all, delete-orphan', passive_deletes=True)
+    approval = db.relationship('Approval', backref='vehicle', uselist=False, lazy='selectin',
+                               cascade='all, delete-orphan', passive_deletes=True)
+    work_status = db.relationship('WorkStatus', backref='vehicle', uselist=False, lazy='selectin',
+                                  cascade='all, delete-orphan', passive_deletes=True)
+    delivery = db.relationship('Delivery', backref='vehicle', uselist=False, lazy='selectin',
+                               cascade='all, delete-orphan', passive_deletes=True)
+    
+    @classmethod
+    def id_for(cls, vehicle_number):
+        """Look up a vehicle's id without loading the row or its relationships"""
+        return db.session.query(cls.id).filter(cls.vehicle_number == vehicle_number).scalar()
     
     def __repr__(self):
         return f'<Inventory {self.vehicle_number}>'
@@ -0,0 +1,32 @@
+from . import db
+from datetime import datetime
+
+class DailyKpi(db.Model):
+    """Nightly roll-up of turnaround times per day, insurer and stage"""
+    __tablename__ = 'daily_kpis'
+    __table_args__ = (db.UniqueConstraint('day', 'stage', 'insurer'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    stage = db.Column(db.String(120), nullable=False)  # registration, claim, approval, delivery, work:<item>, check_in
+    insurer = db.Column(db.String(100), nullable=False, default='')  # '' is all insurers
+    count = db.Column(db.Integer, nullable=False, default=0)
+    mean_hours = db.Column(db.Float)
+    p50_hours = db.Column(db.Float)
+    p90_hours = db.Column(db.Float)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DailyKpi {self.day} {self.stage} {self.insurer}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'day': self.day.isoformat() if self.day else None,
+            'stage': self.stage,
+            'insurer': self.insurer,
+            'count': self.count,
+            'mean_hours': self.mean_hours,
+            'p50_hours': self.p50_hours,
+            'p90_hours': self.p90_hours
+        }
\ No newline at end of file
@@ -1,24 +1,28 @@
 from . import db
 from datetime import datetime
 
+# The inspection set every vehicle is photographed in, in sheet order; damage photos follow
+STANDARD_PHOTO_TYPES = ['front', 'right_front', 'full_right', 'right_back', 'full_back',
+                        'left_back', 'full_left', 'left_front', 'odometer', 'chassis_number']
+
 class Photo(db.Model):
     """Photo storage model"""
     __tablename__ = 'photos'
     
     id = db.Column(db.Integer, primary_key=True)
-    vehicle_number = db.Column(db.String(20), nullable=False)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id', ondelete='CASCADE'), nullable=False, index=True)
     photo_type = db.Column(db.String(50), nullable=False)  # front, right_front, damage, etc.
     filename = db.Column(db.String(255), nullable=False)
     filepath = db.Column(db.String(500), nullable=False)
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<Photo {self.vehicle_number} - {self.photo_type}>'
+        return f'<Photo {self.inventory_id} - {self.photo_type}>'
     
     def to_dict(self):
         return {
             'id': self.id,
-            'vehicle_number': self.vehicle_number,
+            'inventory_id': self.inventory_id,
             'photo_type': self.photo_type,
             'filename': self.filename,
             'filepath': self.filepath,
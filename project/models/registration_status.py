@@ -6,17 +6,17 @@ class RegistrationStatus(db.Model):
     __tablename__ = 'registration_status'
     
     id = db.Column(db.Integer, primary_key=True)
-    vehicle_number = db.Column(db.String(20), unique=True, nullable=False)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id', ondelete='CASCADE'), unique=True, nullable=False)
     is_completed = db.Column(db.Boolean, default=False)
     completion_date = db.Column(db.DateTime)
     
     def __repr__(self):
-        return f'<RegistrationStatus {self.vehicle_number} - {self.is_completed}>'
+        return f'<RegistrationStatus {self.inventory_id} - {self.is_completed}>'
     
     def to_dict(self):
         return {
             'id': self.id,
-            'vehicle_number': self.vehicle_number,
+            'inventory_id': self.inventory_id,
             'is_completed': self.is_completed,
             'completion_date': self.completion_date.isoformat() if self.completion_date else None
         }
\ No newline at end of file
@@ -6,21 +6,22 @@ class WorkStatus(db.Model):
     __tablename__ = 'work_status'
     
     id = db.Column(db.Integer, primary_key=True)
-    vehicle_number = db.Column(db.String(20), unique=True, nullable=False)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id', ondelete='CASCADE'), unique=True, nullable=False)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship with work items
-    work_items = db.relationship('WorkItem', backref='work_status', lazy=True, cascade='all, delete-orphan')
+    work_items = db.relationship('WorkItem', backref='work_status', lazy='selectin', cascade='all, delete-orphan',
+                                 order_by='WorkItem.id')
     
     def __repr__(self):
-        return f'<WorkStatus {self.vehicle_number}>'
+        return f'<WorkStatus {self.inventory_id}>'
 
 class WorkItem(db.Model):
     """Individual work item model"""
     __tablename__ = 'work_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    work_status_id = db.Column(db.Integer, db.ForeignKey('work_status.id'), nullable=False)
+    work_status_id = db.Column(db.Integer, db.ForeignKey('work_status.id', ondelete='CASCADE'), nullable=False, index=True)
     item_name = db.Column(db.String(100), nullable=False)
     is_completed = db.Column(db.Boolean, default=False)
     completion_date = db.Column(db.DateTime)
@@ -35,4 +36,26 @@ class WorkItem(db.Model):
             'item_name': self.item_name,
             'is_completed': self.is_completed,
             'completion_date': self.completion_date.isoformat() if self.completion_date else None
+        }
+
+class WorkItemTemplate(db.Model):
+    """Default checklist item seeded for new vehicles, optionally per insurer or vehicle type"""
+    __tablename__ = 'work_item_templates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    item_name = db.Column(db.String(100), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    insurance_name = db.Column(db.String(100))  # None applies to every insurer
+    vehicle_name = db.Column(db.String(100))  # None applies to every vehicle type
+    
+    def __repr__(self):
+        return f'<WorkItemTemplate {self.item_name}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'item_name': self.item_name,
+            'position': self.position,
+            'insurance_name': self.insurance_name,
+            'vehicle_name': self.vehicle_name
         }
\ No newline at end of file
@@ -0,0 +1,221 @@
+import glob
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app
+from sqlalchemy import func, or_
+
+from branches import branch_dir
+from models import db
+from models.photos import Photo
+
+# Camera originals are normalized once, on upload or by the backfill: the
+# EXIF orientation is applied to the pixels, metadata (GPS, embedded
+# thumbnails, maker notes) is dropped, the long side is capped and the image
+# is re-encoded. A ledger in the upload folder holds one entry per
+# normalized file, so nothing is re-encoded twice, an interrupted backfill
+# picks up where it stopped and a re-upload replaces its file's entry
+# instead of being counted again. It is a small SQLite table so upload
+# workers and the backfill can write it at the same time.
+
+LEDGER_NAME = '.normalized.db'
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp', 'PNG': '.png'}
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def ingest_options(config):
+    return {
+        'max_px': config['PHOTO_MAX_PX'],
+        'quality': config['PHOTO_QUALITY'],
+        'image_format': config['PHOTO_FORMAT'].upper().replace('JPG', 'JPEG')
+    }
+
+
+def normalize_photo(source, max_px=2560, quality=85, image_format='JPEG'):
+    """Re-encode source upright, without metadata and no larger than max_px; return the new path
+
+    Files already in the target format, within max_px and without EXIF are
+    kept as they are. Otherwise the new file replaces source in place; when
+    the format changes it is written under the new extension and source is
+    left for the caller to remove. Images with transparency stay PNG unless
+    the target is WebP. GIFs are left alone and None is returned.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        if image.format == 'GIF':
+            return None
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        out_format = 'PNG' if has_alpha and image_format == 'JPEG' else image_format
+        if image.format == out_format and max(image.size) <= max_px and not image.getexif():
+            return source  # already small and clean, e.g. resized by the upload page
+        scale = min(1.0, max_px / max(image.size))
+        image.draft('RGB', (round(image.width * scale), round(image.height * scale)))
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image).convert('RGBA' if has_alpha else 'RGB')
+        if max(image.size) > max_px:
+            image.thumbnail((max_px, max_px), Image.LANCZOS)
+
+        target = os.path.splitext(source)[0] + EXTENSIONS[out_format]
+        options = {'icc_profile': icc_profile} if icc_profile else {}
+        if out_format == 'JPEG':
+            options.update(quality=quality, optimize=True, progressive=True)
+        elif out_format == 'WEBP':
+            options.update(quality=quality, method=4)
+        else:
+            options.update(optimize=True)
+        temp_path = f'{target}.{os.getpid()}.tmp'
+        # No exif= argument: the saved file carries no EXIF block at all
+        image.save(temp_path, out_format, **options)
+    os.replace(temp_path, target)
+    return target
+
+
+def _normalize_job(source, max_px, quality, image_format):
+    from PIL import Image
+
+    try:
+        before = os.path.getsize(source)
+        target = normalize_photo(source, max_px, quality, image_format)
+        return source, target, before, os.path.getsize(target) if target else None
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return source, None, None, None
+
+
+def normalize_many(sources, max_px=2560, quality=85, image_format='JPEG', workers=None):
+    """Normalize photos, in a process pool when there is more than one and workers is not 1
+
+    Returns {source: (target, bytes_before, bytes_after)}; sources that are
+    skipped or cannot be decoded are left out.
+    """
+    sources = list(dict.fromkeys(sources))
+    options = [max_px] * len(sources), [quality] * len(sources), [image_format] * len(sources)
+    if len(sources) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(sources))) as pool:
+            done = list(pool.map(_normalize_job, sources, *options))
+    else:
+        done = [_normalize_job(source, max_px, quality, image_format) for source in sources]
+    return {source: (target, before, after) for source, target, before, after in done if target}
+
+
+def _ledger_key(upload_folder, path):
+    return os.path.relpath(path, upload_folder).replace(os.sep, '/')
+
+
+def _open_ledger(upload_folder):
+    """Connect to the ledger, creating it on first use"""
+    os.makedirs(upload_folder, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(upload_folder, LEDGER_NAME), timeout=30, isolation_level=None)
+    conn.execute('CREATE TABLE IF NOT EXISTS normalized ('
+                 'path TEXT PRIMARY KEY, source TEXT NOT NULL, '
+                 'bytes_before INTEGER NOT NULL, bytes_after INTEGER NOT NULL)')
+    return conn
+
+
+def read_ledger(upload_folder):
+    """Return ({normalized relative path, ...}, bytes_before, bytes_after) from the ledger"""
+    conn = _open_ledger(upload_folder)
+    try:
+        rows = conn.execute('SELECT path, source, bytes_before, bytes_after FROM normalized').fetchall()
+    finally:
+        conn.close()
+    done = {path for path, _, _, _ in rows} | {source for _, source, _, _ in rows}
+    return done, sum(row[2] for row in rows), sum(row[3] for row in rows)
+
+
+def record_normalized(upload_folder, results):
+    """Record {source: (target, bytes_before, bytes_after)} in the ledger, replacing earlier entries for target"""
+    if not results:
+        return
+    conn = _open_ledger(upload_folder)
+    try:
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT OR REPLACE INTO normalized (path, source, bytes_before, bytes_after) VALUES (?, ?, ?, ?)',
+                [(_ledger_key(upload_folder, target), _ledger_key(upload_folder, source), before, after)
+                 for source, (target, before, after) in results.items()])
+    finally:
+        conn.close()
+
+
+def photo_path_key(path):
+    """A stored photo path in one spelling, whatever separators it was saved with"""
+    return os.path.normpath(path.replace('\\', '/'))
+
+
+def remove_replaced(results, sources=None):
+    """Delete originals that were re-encoded under another extension, only those in sources if given"""
+    for source, (target, _, _) in results.items():
+        if target != source and (sources is None or source in sources) and os.path.exists(source):
+            os.remove(source)
+
+
+def _relink_photos(results):
+    """Point Photo rows at files whose extension changed and return the sources that were relinked"""
+    moved = {photo_path_key(source): (source, target)
+             for source, (target, _, _) in results.items() if target != source}
+    if not moved:
+        return set()
+    relinked = set()
+    # Rows may hold Windows separators: narrow down by file name or slash path, then compare normalized paths
+    names = list({os.path.basename(key) for key in moved})
+    slashed = list({source.replace('\\', '/') for source, _ in moved.values()})
+    for photo in Photo.query.filter(or_(Photo.filename.in_(names),
+                                        func.replace(Photo.filepath, '\\', '/').in_(slashed))):
+        source, target = moved.get(photo_path_key(photo.filepath), (None, None))
+        if source is not None:
+            photo.filepath = target
+            photo.filename = os.path.basename(target)
+            relinked.add(source)
+    db.session.commit()
+    return relinked
+
+
+def pending_photos(upload_folder):
+    """Original photos under the YYYY-MM folders not yet in the ledger, oldest month first"""
+    done, _, _ = read_ledger(upload_folder)
+    for month_dir in sorted(glob.glob(os.path.join(upload_folder, '[0-9][0-9][0-9][0-9]-[0-9][0-9]'))):
+        for directory, _, filenames in sorted(os.walk(month_dir)):
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                if filename.lower().endswith(SOURCE_EXTENSIONS) and _ledger_key(upload_folder, path) not in done:
+                    yield path
+
+
+def backfill_photos(upload_folder, max_px, quality, image_format, workers=None, batch_size=50, log=print):
+    """Normalize every photo not yet in the ledger and return (files, bytes saved) for this run"""
+    pending = list(pending_photos(upload_folder))
+    files = saved = 0
+    for start in range(0, len(pending), batch_size):
+        results = normalize_many(pending[start:start + batch_size], max_px, quality, image_format, workers)
+        relinked = _relink_photos(results)
+        record_normalized(upload_folder, results)
+        # An original no row was moved off stays, so no row is left pointing at a deleted file
+        remove_replaced(results, relinked)
+        files += len(results)
+        saved += sum(before - after for _, before, after in results.values())
+        log(f'{min(start + batch_size, len(pending))}/{len(pending)} photos processed, '
+            f'{saved / 2**20:.1f} MiB saved so far')
+    return files, saved
+
+
+def init_photo_ingest(app):
+    """Register the normalize-photos command"""
+
+    @app.cli.command('normalize-photos')
+    @click.option('--workers', default=None, type=int, help='Processes used (default PHOTO_INGEST_WORKERS)')
+    @click.option('--batch-size', default=50, help='Photos per batch between progress records')
+    def normalize_photos_command(workers, batch_size):
+        """Backfill orientation, metadata stripping and re-encoding over the existing photo tree"""
+        upload_folder = branch_dir(current_app.config['UPLOAD_FOLDER'])
+        workers = workers or current_app.config['PHOTO_INGEST_WORKERS'] or None
+        files, saved = backfill_photos(upload_folder, workers=workers, batch_size=batch_size, log=click.echo,
+                                       **ingest_options(current_app.config))
+        _, before, after = read_ledger(upload_folder)
+        click.echo(f'Normalized {files} photos this run, saving {saved / 2**20:.1f} MiB.')
+        click.echo(f'All normalized photos: {before / 2**20:.1f} MiB -> {after / 2**20:.1f} MiB.')
+
+    return app
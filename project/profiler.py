@@ -0,0 +1,232 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import abort, current_app, g, render_template, request, send_from_directory, session
+
+from models import current_branch
+
+# Opt-in profiling for slow pages and background jobs. A request is profiled
+# when it carries the PROFILE_TOKEN in the X-Profile header or the ?_profile=
+# parameter; report builds are profiled at random with PROFILE_JOB_RATE. The
+# default "sample" mode walks the profiled thread's stack every few
+# milliseconds and writes collapsed stacks ("a;b;c 12" per line), which
+# flamegraph.pl and https://www.speedscope.app open directly. The "cprofile"
+# mode writes a pstats file instead. Each profile has a .json sidecar with
+# the request or job details, listed on /admin/profiles.
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = '_profile'
+PROFILE_EXTENSIONS = {'sample': '.collapsed', 'cprofile': '.prof'}
+ADMIN_ENDPOINTS = ('profiles', 'profile_file')
+
+
+class StackSampler:
+    """Sample one thread's Python stack on a timer and count identical stacks"""
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._labels = {}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for root in sorted(sys.path, key=len, reverse=True):
+                if root and filename.startswith(root + os.sep):
+                    filename = filename[len(root) + 1:]
+                    break
+            label = self._labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ',')
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """A running profile of the current thread in "sample" or "cprofile" mode"""
+
+    def __init__(self, mode='sample', interval=0.005):
+        if mode not in PROFILE_EXTENSIONS:
+            raise ValueError(f'Unknown profile mode {mode!r}')
+        self.mode = mode
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        if mode == 'sample':
+            self._profiler = StackSampler(interval).start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._start
+        if self.mode == 'sample':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, directory, metadata, keep=200):
+        """Write the profile and its metadata sidecar, prune old ones and return the file name"""
+        os.makedirs(directory, exist_ok=True)
+        name = f'{self.started:%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}{PROFILE_EXTENSIONS[self.mode]}'
+        path = os.path.join(directory, name)
+        if self.mode == 'sample':
+            with open(path, 'w') as profile_file:
+                profile_file.write(self._profiler.collapsed())
+            samples = sum(self._profiler.stacks.values())
+        else:
+            self._profiler.dump_stats(path)
+            samples = None
+        metadata = dict(metadata, file=name, mode=self.mode, samples=samples,
+                        started=self.started.isoformat(timespec='seconds'),
+                        duration_ms=round(self.duration * 1000, 1))
+        with open(path + '.json', 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+        _prune(directory, keep)
+        return name
+
+
+def profile_dir(config):
+    return config['PROFILE_DIR'] or os.path.join(current_app.instance_path, 'profiles')
+
+
+def recent_profiles(directory, limit=100):
+    """Metadata of the newest profiles, newest first"""
+    try:
+        names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name)) as metadata_file:
+                profiles.append(json.load(metadata_file))
+        except (OSError, ValueError):
+            continue  # pruned or half-written
+    return profiles
+
+
+def _prune(directory, keep):
+    names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    for name in names[keep:]:
+        for path in (os.path.join(directory, name), os.path.join(directory, name[:-len('.json')])):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _has_token(value):
+    token = current_app.config['PROFILE_TOKEN']
+    return bool(token and value and hmac.compare_digest(value.encode(), token.encode()))
+
+
+@contextmanager
+def profiled_job(name, **metadata):
+    """Profile a background job in a sampled fraction of runs (PROFILE_JOB_RATE)"""
+    config = current_app.config
+    if not config['PROFILE_JOB_RATE'] or random.random() >= config['PROFILE_JOB_RATE']:
+        yield
+        return
+    profile = Profile(config['PROFILE_MODE'], config['PROFILE_INTERVAL_MS'] / 1000)
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        profile.stop()
+        profile.save(profile_dir(config), dict(metadata, kind='job', name=name, status=status,
+                                               branch=current_branch(), pid=os.getpid()),
+                     config['PROFILE_KEEP'])
+
+
+def init_profiler(app):
+    """Profile requests that carry the profile token and list profiles on /admin/profiles"""
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint in ADMIN_ENDPOINTS:
+            return
+        if _has_token(request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_PARAM)):
+            mode = request.args.get('_profile_mode', app.config['PROFILE_MODE'])
+            if mode not in PROFILE_EXTENSIONS:
+                abort(400)
+            g.profile = Profile(mode, app.config['PROFILE_INTERVAL_MS'] / 1000)
+
+    @app.after_request
+    def save_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        metadata = {
+            'kind': 'request',
+            'name': f'{request.method} {request.path}',
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'branch': current_branch(),
+            'pid': os.getpid(),
+        }
+        directory = profile_dir(app.config)
+
+        # Stop once the body has been sent so streamed pages are profiled to the end
+        def finish():
+            profile.stop()
+            profile.save(directory, metadata, app.config['PROFILE_KEEP'])
+
+        response.call_on_close(finish)
+        return response
+
+    def require_admin():
+        if not app.config['PROFILE_TOKEN']:
+            abort(404)
+        if _has_token(request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_PARAM)):
+            session['profile_admin'] = True
+        elif not session.get('profile_admin'):
+            abort(403)
+
+    @app.route('/admin/profiles')
+    def profiles():
+        """Recent request and job profiles"""
+        require_admin()
+        return render_template('profiles.html', profiles=recent_profiles(profile_dir(app.config)))
+
+    @app.route('/admin/profiles/<path:filename>')
+    def profile_file(filename):
+        """Download a collapsed-stack or pstats profile"""
+        require_admin()
+        return send_from_directory(profile_dir(app.config), filename, as_attachment=True)
+
+    return app
@@ -0,0 +1,163 @@
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import func, literal, select, union_all, delete, insert
+
+from archive import archived_through
+from models import db
+from models.inventory import Inventory
+from models.work_status import WorkStatus, WorkItem
+from models.claims import Claim
+from models.approvals import Approval
+from models.registration_status import RegistrationStatus
+from models.delivery import Delivery
+from models.kpis import DailyKpi
+
+ALL_INSURERS = ''
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+
+def _hours_since_check_in(column):
+    return ((func.julianday(column) - func.julianday(Inventory.check_in_date)) * 24).label('hours')
+
+
+def stage_durations_query(start, end):
+    """One set-based query returning (stage, insurer, hours) for every stage event in [start, end)
+
+    Each stage is timed from check-in to the timestamp already recorded for it:
+    registration completion, claim number entry, approval, each work item
+    completion and delivery.
+    """
+    start, end = _as_datetime(start), _as_datetime(end)
+    insurer = func.coalesce(Inventory.insurance_name, '').label('insurer')
+
+    def stage(name, model, timestamp, *conditions):
+        return select(
+            literal(name).label('stage'), insurer, _hours_since_check_in(timestamp)
+        ).join(model, model.inventory_id == Inventory.id).where(
+            timestamp >= start, timestamp < end, *conditions
+        )
+
+    work_items = select(
+        (literal('work:') + WorkItem.item_name).label('stage'), insurer, _hours_since_check_in(WorkItem.completion_date)
+    ).join(WorkStatus, WorkStatus.inventory_id == Inventory.id).join(
+        WorkItem, WorkItem.work_status_id == WorkStatus.id
+    ).where(
+        WorkItem.is_completed.is_(True), WorkItem.completion_date >= start, WorkItem.completion_date < end
+    )
+
+    return union_all(
+        stage('registration', RegistrationStatus, RegistrationStatus.completion_date,
+              RegistrationStatus.is_completed.is_(True)),
+        stage('claim', Claim, Claim.updated_date, func.coalesce(Claim.claim_number, '') != ''),
+        stage('approval', Approval, Approval.approval_date, Approval.is_approved.is_(True)),
+        work_items,
+        stage('delivery', Delivery, Delivery.delivery_date, Delivery.is_delivered.is_(True)),
+    )
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean_hours': round(sum(values) / len(values), 2) if values else None,
+        'p50_hours': round(percentile(values, 0.5), 2) if values else None,
+        'p90_hours': round(percentile(values, 0.9), 2) if values else None,
+    }
+
+
+def group_durations(start, end):
+    """Bucket stage durations by (insurer, stage), including an all-insurers bucket"""
+    groups = defaultdict(list)
+    for stage, insurer, hours in db.session.execute(stage_durations_query(start, end)):
+        if hours is None or hours < 0:
+            continue  # event recorded before check-in: bad data, not a cycle time
+        groups[(ALL_INSURERS, stage)].append(hours)
+        if insurer:
+            groups[(insurer, stage)].append(hours)
+    return groups
+
+
+def turnaround_summary(start, end):
+    """Cycle-time percentiles for any date range, per stage, insurer and work item"""
+    by_insurer = defaultdict(dict)
+    for (insurer, stage), values in sorted(group_durations(start, end).items()):
+        by_insurer[insurer][stage] = summarize(values)
+
+    overall = by_insurer.pop(ALL_INSURERS, {})
+    return {
+        'start': _as_datetime(start).isoformat(),
+        'end': _as_datetime(end).isoformat(),
+        'stages': {stage: stats for stage, stats in overall.items() if not stage.startswith('work:')},
+        'work_items': {stage[5:]: stats for stage, stats in overall.items() if stage.startswith('work:')},
+        'by_insurer': dict(by_insurer),
+    }
+
+
+def rollup_day(day):
+    """Recompute the DailyKpi rows for one day in a single transaction
+
+    Days up to the latest archived delivery are left alone: some of their
+    vehicles are no longer in the working tables, and the rows rolled up
+    while they still were are the complete ones.
+    """
+    horizon = archived_through()
+    if horizon is not None and day <= horizon:
+        return 0
+    next_day = day + timedelta(days=1)
+    rows = []
+    for (insurer, stage), values in group_durations(day, next_day).items():
+        rows.append(dict(day=day, stage=stage, insurer=insurer, computed_at=datetime.utcnow(), **summarize(values)))
+
+    check_ins = db.session.execute(
+        select(func.coalesce(Inventory.insurance_name, ''), func.count(Inventory.id)).where(
+            Inventory.check_in_date >= _as_datetime(day), Inventory.check_in_date < _as_datetime(next_day)
+        ).group_by(func.coalesce(Inventory.insurance_name, ''))
+    ).all()
+    total = sum(count for _, count in check_ins)
+    if total:
+        rows.append(dict(day=day, stage='check_in', insurer=ALL_INSURERS, count=total, computed_at=datetime.utcnow()))
+    rows.extend(dict(day=day, stage='check_in', insurer=insurer, count=count, computed_at=datetime.utcnow())
+                for insurer, count in check_ins if insurer)
+
+    db.session.execute(delete(DailyKpi).where(DailyKpi.day == day))
+    if rows:
+        db.session.execute(insert(DailyKpi), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def rollup_range(start, end):
+    """Roll up every day in [start, end)"""
+    written = 0
+    day = start
+    while day < end:
+        written += rollup_day(day)
+        day += timedelta(days=1)
+    return written
+
+
+def kpi_trend(stage, insurer=ALL_INSURERS, days=365, today=None):
+    """Daily KPI series for a stage, read from the roll-up table"""
+    today = today or date.today()
+    rows = DailyKpi.query.filter(
+        DailyKpi.stage == stage,
+        DailyKpi.insurer == insurer,
+        DailyKpi.day >= today - timedelta(days=days)
+    ).order_by(DailyKpi.day.asc()).all()
+    return [row.to_dict() for row in rows]
@@ -1,72 +1,190 @@
 import os
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+from reportlab import rl_config
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from models import db
 from models.inventory import Inventory
-from models.photos import Photo
-from models.work_status import WorkStatus, WorkItem
-from models.claims import Claim
-from models.approvals import Approval
-from models.registration_status import RegistrationStatus
+from models.photos import STANDARD_PHOTO_TYPES
+from metrics import REPORT_BUILD_SECONDS
+from thumbnails import downscale_many
+
+# Embed image streams as raw binary: ASCII85 makes PDFs a quarter larger and,
+# without reportlab's C accelerator, dominates the time to embed photos
+rl_config.useA85 = 0
 
 class ReportGenerator:
     """Generate various reports for the car service management system"""
     
-    def __init__(self):
-        self.reports_dir = 'reports'
+    def __init__(self, reports_dir='reports', session=None):
+        self.reports_dir = reports_dir
+        # Pass a backup.snapshot_session() to build from a point-in-time copy
+        self.session = session or db.session
         os.makedirs(self.reports_dir, exist_ok=True)
     
+    @contextmanager
+    def _atomic_output(self, filepath):
+        """Yield a temporary path that replaces filepath only once it is fully written"""
+        fd, temp_path = tempfile.mkstemp(dir=self.reports_dir, prefix='.', suffix='.tmp')
+        os.close(fd)
+        try:
+            yield temp_path
+            os.replace(temp_path, filepath)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
     def generate_daily_report(self, format_type='pdf'):
         """Generate daily report"""
         today = date.today()
-        vehicles = Inventory.query.filter(
+        vehicles = self.session.query(Inventory).filter(
             Inventory.check_in_date >= datetime.combine(today, datetime.min.time()),
             Inventory.check_in_date < datetime.combine(today + timedelta(days=1), datetime.min.time())
         ).all()
         
         filename = f"daily_report_{today.strftime('%Y%m%d')}"
         
-        if format_type == 'pdf':
-            return self._generate_pdf_report(vehicles, f"Daily Report - {today.strftime('%B %d, %Y')}", filename)
-        else:
-            return self._generate_excel_report(vehicles, f"Daily Report - {today.strftime('%B %d, %Y')}", filename)
+        with REPORT_BUILD_SECONDS.labels(report_type='daily', format=format_type).time():
+            if format_type == 'pdf':
+                return self._generate_pdf_report(vehicles, f"Daily Report - {today.strftime('%B %d, %Y')}", filename)
+            else:
+                return self._generate_excel_report(vehicles, f"Daily Report - {today.strftime('%B %d, %Y')}", filename)
     
     def generate_monthly_report(self, format_type='pdf'):
         """Generate monthly report"""
         today = date.today()
         first_day = today.replace(day=1)
-        vehicles = Inventory.query.filter(
+        vehicles = self.session.query(Inventory).filter(
             Inventory.check_in_date >= datetime.combine(first_day, datetime.min.time()),
             Inventory.check_in_date < datetime.combine(today + timedelta(days=1), datetime.min.time())
         ).all()
         
         filename = f"monthly_report_{today.strftime('%Y%m')}"
         
-        if format_type == 'pdf':
-            return self._generate_pdf_report(vehicles, f"Monthly Report - {today.strftime('%B %Y')}", filename)
-        else:
-            return self._generate_excel_report(vehicles, f"Monthly Report - {today.strftime('%B %Y')}", filename)
+        with REPORT_BUILD_SECONDS.labels(report_type='monthly', format=format_type).time():
+            if format_type == 'pdf':
+                return self._generate_pdf_report(vehicles, f"Monthly Report - {today.strftime('%B %Y')}", filename)
+            else:
+                return self._generate_excel_report(vehicles, f"Monthly Report - {today.strftime('%B %Y')}", filename)
 
     def generate_all_cars_report(self, format_type='pdf'):
         """Generate a report of all cars"""
-        vehicles = Inventory.query.order_by(Inventory.serial_number.asc()).all()
+        vehicles = self.session.query(Inventory).order_by(Inventory.serial_number.asc()).all()
         filename = f"all_cars_report_{datetime.now().strftime('%Y%m%d')}"
         
-        if format_type == 'pdf':
-            return self._generate_all_cars_pdf_report(vehicles, "All Cars Report", filename)
-        else:
-            # Optionally, implement Excel generation for this report as well
-            return None
+        with REPORT_BUILD_SECONDS.labels(report_type='all_cars', format=format_type).time():
+            if format_type == 'pdf':
+                return self._generate_all_cars_pdf_report(vehicles, "All Cars Report", filename)
+            else:
+                return self._generate_all_cars_excel_report(vehicles, "All Cars Report", filename)
 
+    def generate_vehicle_photo_sheet(self, vehicle_number, cache_dir, max_px=800, workers=None):
+        """Generate the insurer inspection sheet for one vehicle"""
+        vehicle = self.session.query(Inventory).filter(Inventory.vehicle_number == vehicle_number).first()
+        if vehicle is None:
+            return None
+        
+        with REPORT_BUILD_SECONDS.labels(report_type='photo_sheet', format='pdf').time():
+            return self._generate_photo_sheet_pdf([vehicle], f"photo_sheet_{vehicle_number}",
+                                                  cache_dir, max_px, workers)
+    
+    def generate_insurer_photo_sheets(self, insurance_name, cache_dir, start=None, end=None, max_px=800, workers=None):
+        """Generate one document with the inspection sheets of an insurer's vehicles, by check-in date"""
+        query = self.session.query(Inventory).filter(Inventory.insurance_name == insurance_name)
+        if start:
+            query = query.filter(Inventory.check_in_date >= datetime.combine(start, datetime.min.time()))
+        if end:
+            query = query.filter(Inventory.check_in_date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        vehicles = query.order_by(Inventory.serial_number.asc()).all()
+        
+        slug = ''.join(ch if ch.isalnum() else '_' for ch in insurance_name).strip('_') or 'insurer'
+        filename = f"photo_sheets_{slug}_{date.today().strftime('%Y%m%d')}"
+        with REPORT_BUILD_SECONDS.labels(report_type='photo_sheet_batch', format='pdf').time():
+            return self._generate_photo_sheet_pdf(vehicles, filename, cache_dir, max_px, workers)
+    
+    def _generate_photo_sheet_pdf(self, vehicles, filename, cache_dir, max_px, workers):
+        """Render inspection sheets: vehicle details, claim number and a grid of downscaled photos"""
+        filepath = os.path.join(self.reports_dir, f"{filename}.pdf")
+        
+        # Decode and downscale every photo of the batch up front, in parallel
+        sources = [photo.filepath.replace('\\', '/') for vehicle in vehicles for photo in vehicle.photos]
+        scaled = downscale_many(sources, cache_dir, max_px=max_px, workers=workers)
+        
+        styles = getSampleStyleSheet()
+        caption_style = ParagraphStyle('Caption', parent=styles['Normal'], fontSize=9, alignment=1)
+        cell_width, cell_height = 3.3*inch, 2.3*inch
+        
+        content = []
+        for index, vehicle in enumerate(vehicles):
+            if index:
+                content.append(PageBreak())
+            content.append(Paragraph(f"Inspection Sheet - {vehicle.vehicle_number}", styles['Heading1']))
+            
+            claim = vehicle.claim
+            details = [
+                ['Serial No.', str(vehicle.serial_number), 'Vehicle', vehicle.vehicle_name or ''],
+                ['Customer', vehicle.customer_name or '', 'Phone', vehicle.phone_number or ''],
+                ['Insurance', vehicle.insurance_name or '', 'Claim No.', claim.claim_number if claim and claim.claim_number else 'N/A'],
+                ['KM Reading', f"{vehicle.kilometer_reading:,}", 'Check-in', vehicle.check_in_date.strftime('%Y-%m-%d')],
+                ['Engine No.', vehicle.engine_number, 'Chassis No.', vehicle.chassis_number],
+            ]
+            details_table = Table(details, colWidths=[1.1*inch, 2.3*inch, 1.1*inch, 2.3*inch])
+            details_table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('BACKGROUND', (0, 0), (0, -1), colors.beige),
+                ('BACKGROUND', (2, 0), (2, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+            ]))
+            content.append(details_table)
+            content.append(Spacer(1, 12))
+            
+            # Standard views in their fixed order, gaps marked, then every damage photo
+            by_type = {}
+            for photo in vehicle.photos:
+                by_type.setdefault(photo.photo_type, []).append(photo)
+            slots = [(photo_type, (by_type.get(photo_type) or [None])[-1]) for photo_type in STANDARD_PHOTO_TYPES]
+            slots += [(f"damage {number}", photo) for number, photo in enumerate(by_type.get('damage', []), 1)]
+            
+            cells = []
+            for label, photo in slots:
+                image = scaled.get(photo.filepath.replace('\\', '/')) if photo else None
+                if image:
+                    path, width, height = image
+                    scale = min(cell_width / width, (cell_height - 14) / height)
+                    picture = Image(path, width=width * scale, height=height * scale)
+                else:
+                    picture = Paragraph('Not provided' if photo is None else 'Unreadable image', caption_style)
+                cells.append([picture, Paragraph(label.replace('_', ' ').title(), caption_style)])
+            
+            rows = [cells[i:i + 2] + [''] * (2 - len(cells[i:i + 2])) for i in range(0, len(cells), 2)]
+            grid = Table(rows, colWidths=[cell_width + 0.1*inch] * 2, rowHeights=[cell_height + 0.1*inch] * len(rows))
+            grid.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+            ]))
+            content.append(grid)
+        
+        if not vehicles:
+            content.append(Paragraph("No vehicles match this selection.", styles['Normal']))
+        
+        with self._atomic_output(filepath) as temp_path:
+            SimpleDocTemplate(temp_path, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch).build(content)
+        return filepath
+    
     def _generate_all_cars_pdf_report(self, vehicles, title, filename):
         """Generate PDF report for all cars"""
         filepath = os.path.join(self.reports_dir, f"{filename}.pdf")
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         
         styles = getSampleStyleSheet()
         title_style = ParagraphStyle(
@@ -83,7 +201,7 @@ class ReportGenerator:
         data = [['S.No', 'Vehicle No.', 'Customer', 'Phone', 'Insurance', 'Claim No.', 'Engine No.', 'Chassis No.', 'Check-in']]
         
         for vehicle in vehicles:
-            claim = Claim.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+            claim = vehicle.claim
             data.append([
                 str(vehicle.serial_number),
                 vehicle.vehicle_number,
@@ -109,13 +227,13 @@ class ReportGenerator:
         ]))
         
         content.append(table)
-        doc.build(content)
+        with self._atomic_output(filepath) as temp_path:
+            SimpleDocTemplate(temp_path, pagesize=A4).build(content)
         return filepath
     
     def _generate_pdf_report(self, vehicles, title, filename):
         """Generate PDF report"""
         filepath = os.path.join(self.reports_dir, f"{filename}.pdf")
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         
         # Styles
         styles = getSampleStyleSheet()
@@ -195,7 +313,8 @@ class ReportGenerator:
             content.append(table)
         
         # Build PDF
-        doc.build(content)
+        with self._atomic_output(filepath) as temp_path:
+            SimpleDocTemplate(temp_path, pagesize=A4).build(content)
         return filepath
     
     def _generate_excel_report(self, vehicles, title, filename):
@@ -246,10 +365,54 @@ class ReportGenerator:
             sheet.cell(row=row, column=4).value = status
             sheet.cell(row=row, column=5).value = f"{progress}%"
         
-        # Auto-adjust column widths
+        self._autosize_columns(sheet)
+        with self._atomic_output(filepath) as temp_path:
+            workbook.save(temp_path)
+        return filepath
+    
+    def _generate_all_cars_excel_report(self, vehicles, title, filename):
+        """Generate Excel report for all cars, with the columns of the PDF version"""
+        filepath = os.path.join(self.reports_dir, f"{filename}.xlsx")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = "All Cars"
+        
+        headers = ['S.No', 'Vehicle No.', 'Customer', 'Phone', 'Insurance', 'Claim No.', 'Engine No.', 'Chassis No.', 'Check-in']
+        sheet['A1'] = title
+        sheet['A1'].font = Font(size=16, bold=True)
+        sheet['A1'].alignment = Alignment(horizontal='center')
+        sheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(headers))
+        
+        for col, header in enumerate(headers, 1):
+            cell = sheet.cell(row=3, column=col)
+            cell.value = header
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+        
+        for vehicle in vehicles:
+            claim = vehicle.claim
+            sheet.append([
+                vehicle.serial_number,
+                vehicle.vehicle_number,
+                vehicle.customer_name,
+                vehicle.phone_number,
+                vehicle.insurance_name,
+                claim.claim_number if claim else 'N/A',
+                vehicle.engine_number,
+                vehicle.chassis_number,
+                vehicle.check_in_date.strftime('%Y-%m-%d %H:%M')
+            ])
+        
+        self._autosize_columns(sheet)
+        with self._atomic_output(filepath) as temp_path:
+            workbook.save(temp_path)
+        return filepath
+    
+    def _autosize_columns(self, sheet):
+        """Fit each column to its longest value, up to 50 characters"""
         for column in sheet.columns:
             max_length = 0
-            column_letter = column[0].column_letter
+            column_letter = get_column_letter(column[0].column)  # column[0] is the merged title cell
             for cell in column:
                 try:
                     if len(str(cell.value)) > max_length:
@@ -258,33 +421,30 @@ class ReportGenerator:
                     pass
             adjusted_width = min(max_length + 2, 50)
             sheet.column_dimensions[column_letter].width = adjusted_width
-        
-        workbook.save(filepath)
-        return filepath
     
     def _is_vehicle_completed(self, vehicle):
         """Check if a vehicle has completed all steps"""
         # Check registration
-        registration = RegistrationStatus.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        registration = vehicle.registration
         if not (registration and registration.is_completed):
             return False
         
         # Check claim
-        claim = Claim.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        claim = vehicle.claim
         if not (claim and claim.claim_number):
             return False
         
         # Check approval
-        approval = Approval.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        approval = vehicle.approval
         if not (approval and approval.is_approved):
             return False
         
         # Check work status
-        work_status = WorkStatus.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        work_status = vehicle.work_status
         if not work_status:
             return False
         
-        work_items = WorkItem.query.filter_by(work_status_id=work_status.id).all()
+        work_items = work_status.work_items
         if not work_items or not all(item.is_completed for item in work_items):
             return False
         
@@ -296,24 +456,24 @@ class ReportGenerator:
         completed_steps = 1  # Inventory is always completed
         
         # Check photos
-        if Photo.query.filter_by(vehicle_number=vehicle.vehicle_number).first():
+        if vehicle.photos:
             completed_steps += 1
         
         # Check registration
-        registration = RegistrationStatus.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        registration = vehicle.registration
         if registration and registration.is_completed:
             completed_steps += 1
         
         # Check claim
-        claim = Claim.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        claim = vehicle.claim
         if claim and claim.claim_number:
             completed_steps += 1
         
         # Check work status
-        work_status = WorkStatus.query.filter_by(vehicle_number=vehicle.vehicle_number).first()
+        work_status = vehicle.work_status
         if work_status:
-            work_items = WorkItem.query.filter_by(work_status_id=work_status.id).all()
+            work_items = work_status.work_items
             if work_items and all(item.is_completed for item in work_items):
                 completed_steps += 1
         
-        return int((completed_steps / total_steps) * 100)
+        return int((completed_steps / total_steps) * 100)
\ No newline at end of file
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, date, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from backup import snapshot_session
+from branches import branch_dir
+from models import db
+from models.change_log import ChangeLog
+from models.inventory import Inventory
+from models.photos import Photo
+from models.claims import Claim
+from models.approvals import Approval
+from models.registration_status import RegistrationStatus
+from models.work_status import WorkStatus, WorkItem
+from models.delivery import Delivery
+from profiler import profiled_job
+
+# Reports built off-peak are recorded in <REPORTS_DIR>/manifest.json together
+# with a fingerprint of the data they were built from. /generate_report
+# serves an artifact only while it was built today and the fingerprint still
+# matches, so a prebuilt report is never staler than one built on demand.
+
+STANDARD_REPORTS = [
+    ('daily', 'pdf'), ('daily', 'excel'),
+    ('monthly', 'pdf'), ('monthly', 'excel'),
+    ('all_cars', 'pdf'), ('all_cars', 'excel'),
+]
+
+MANIFEST_NAME = 'manifest.json'
+STAMP_NAME = '.data-changed'
+
+REPORT_MODELS = (Inventory, Photo, Claim, Approval, RegistrationStatus, WorkStatus, WorkItem, Delivery)
+
+
+class CronSchedule:
+    """A five-field cron expression: minute hour day-of-month month day-of-week"""
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'Expected 5 cron fields, got {len(fields)}: {expression!r}')
+        self.expression = expression
+        (self.minutes, self.hours, self.days, self.months, weekdays) = [
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        ]
+        self.weekdays = {day % 7 for day in weekdays}  # 0 and 7 are both Sunday
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = end = int(part)
+                if step:
+                    end = high
+            if start < low or end > high or start > end:
+                raise ValueError(f'Cron field {field!r} is outside {low}-{high}')
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment):
+        if moment.month not in self.months:
+            return False
+        day_match = moment.day in self.days
+        weekday_match = (moment.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match  # cron matches either when both are restricted
+
+    def next_run(self, after):
+        """First matching minute strictly after the given datetime"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'Cron expression {self.expression!r} never matches')
+
+
+def _stamp_path(reports_dir):
+    return os.path.join(reports_dir, STAMP_NAME)
+
+
+def mark_reports_stale(reports_dir):
+    """Record that report data changed; checked by every worker through the file's mtime"""
+    os.makedirs(reports_dir, exist_ok=True)
+    with open(_stamp_path(reports_dir), 'a'):
+        os.utime(_stamp_path(reports_dir))
+
+
+def data_fingerprint(reports_dir):
+    """The change feed's high-water mark and the change stamp, which move with every write reports read
+
+    Every commit touching a vehicle or its records appends to change_log, whose
+    AUTOINCREMENT ids never go back, so this is one primary-key lookup.
+    """
+    high_water = db.session.execute(select(func.max(ChangeLog.id))).scalar() or 0
+    try:
+        stamp = os.stat(_stamp_path(reports_dir)).st_mtime_ns
+    except OSError:
+        stamp = 0
+    return hashlib.sha1(repr((high_water, stamp)).encode()).hexdigest()
+
+
+def read_manifest(reports_dir):
+    try:
+        with open(os.path.join(reports_dir, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json_atomically(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            json.dump(data, temp_file, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def record_reports(reports_dir, entries):
+    """Merge built artifacts into the manifest
+
+    Concurrent writers can drop each other's entries; that only costs a
+    rebuild on the next request, never a stale download.
+    """
+    manifest = read_manifest(reports_dir)
+    manifest.update(entries)
+    _write_json_atomically(os.path.join(reports_dir, MANIFEST_NAME), manifest)
+
+
+def manifest_key(report_type, format_type):
+    return f'{report_type}:{format_type}'
+
+
+def manifest_entry(filepath, fingerprint):
+    return {
+        'file': os.path.basename(filepath),
+        'day': date.today().isoformat(),
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'fingerprint': fingerprint,
+    }
+
+
+def find_current_report(reports_dir, report_type, format_type):
+    """Path of a prebuilt report that still matches today's data, or None"""
+    entry = read_manifest(reports_dir).get(manifest_key(report_type, format_type))
+    if not entry or entry.get('day') != date.today().isoformat():
+        return None
+    filepath = os.path.join(reports_dir, entry['file'])
+    if not os.path.exists(filepath) or entry.get('fingerprint') != data_fingerprint(reports_dir):
+        return None
+    return filepath
+
+
+def build_report(reports_dir, report_type, format_type):
+    """Build one report with ReportGenerator and return its path"""
+    from reports.generator import ReportGenerator
+    database_path = db.session.get_bind().url.database
+    if not (current_app.config['REPORT_SNAPSHOT'] and database_path and os.path.exists(database_path)):
+        return _build(ReportGenerator(reports_dir), report_type, format_type)
+    with snapshot_session(database_path) as session:
+        return _build(ReportGenerator(reports_dir, session=session), report_type, format_type)
+
+
+def _build(generator, report_type, format_type):
+    build = {
+        'daily': generator.generate_daily_report,
+        'monthly': generator.generate_monthly_report,
+        'all_cars': generator.generate_all_cars_report,
+    }[report_type]
+    return build(format_type)
+
+
+_worker_app = None
+
+
+def _init_worker(config):
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app(config)
+
+
+def _build_in_worker(reports_dir, report_type, format_type):
+    with _worker_app.app_context(), profiled_job(f'prebuild {report_type} {format_type}'):
+        return report_type, format_type, build_report(reports_dir, report_type, format_type)
+
+
+def prebuild_reports(app, reports=STANDARD_REPORTS, workers=None, log=print):
+    """Build the standard reports in a bounded process pool and record them in the manifest"""
+    workers = workers or app.config['REPORT_PREBUILD_WORKERS']
+
+    with app.app_context():
+        reports_dir = branch_dir(app.config['REPORTS_DIR'])
+        os.makedirs(reports_dir, exist_ok=True)
+        # Taken before building: a change made mid-build leaves the artifact stale, never wrongly current
+        fingerprint = data_fingerprint(reports_dir)
+        for engine in db.engines.values():
+            engine.dispose()  # do not share pooled SQLite connections with the forked workers
+
+    worker_config = {key: app.config[key]
+                     for key in ('SQLALCHEMY_DATABASE_URI', 'REPORTS_DIR', 'UPLOAD_FOLDER', 'REPORT_SNAPSHOT',
+                                 'BRANCH_DATABASES', 'BRANCH', 'PROFILE_MODE', 'PROFILE_INTERVAL_MS',
+                                 'PROFILE_JOB_RATE', 'PROFILE_DIR', 'PROFILE_KEEP')}
+    entries = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(worker_config,)) as pool:
+        futures = [pool.submit(_build_in_worker, reports_dir, report_type, format_type)
+                   for report_type, format_type in reports]
+        for future in as_completed(futures):
+            try:
+                report_type, format_type, filepath = future.result()
+            except Exception as error:
+                log(f'Report build failed: {error!r}')
+                continue
+            if filepath:
+                entries[manifest_key(report_type, format_type)] = manifest_entry(filepath, fingerprint)
+                log(f'Built {filepath}')
+
+    record_reports(reports_dir, entries)
+    return entries
+
+
+def run_schedule(app, expression, log=print):
+    """Sleep until each matching cron minute and prebuild the standard reports"""
+    schedule = CronSchedule(expression)
+    while True:
+        next_run = schedule.next_run(datetime.now())
+        log(f'Next report build at {next_run:%Y-%m-%d %H:%M}')
+        while (remaining := (next_run - datetime.now()).total_seconds()) > 0:
+            time.sleep(min(remaining, 60))  # re-check so clock changes are picked up
+        prebuild_reports(app, log=log)
+
+
+@event.listens_for(Session, 'before_flush')
+def _note_report_changes(session, flush_context, instances):
+    if any(isinstance(obj, REPORT_MODELS) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['reports_stale'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _touch_report_stamp(session):
+    if session.info.pop('reports_stale', False):
+        if has_app_context():
+            mark_reports_stale(branch_dir(current_app.config['REPORTS_DIR']))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_report_changes(session):
+    session.info.pop('reports_stale', None)
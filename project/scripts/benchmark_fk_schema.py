@@ -0,0 +1,120 @@
+"""Compare the vehicle_number string-key schema with the inventory_id foreign keys
+
+Builds a synthetic database in the old layout, measures index sizes (via the
+dbstat virtual table) and a dashboard-style join, runs the in-place
+migration, then measures again.
+
+    python scripts/benchmark_fk_schema.py [vehicles]
+"""
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import upgrade_database  # noqa: E402
+
+OLD_SCHEMA = '''
+CREATE TABLE inventory (
+    id INTEGER NOT NULL PRIMARY KEY, serial_number INTEGER NOT NULL UNIQUE,
+    vehicle_number VARCHAR(20) NOT NULL UNIQUE, vehicle_name VARCHAR(100), customer_name VARCHAR(100),
+    phone_number VARCHAR(15), insurance_name VARCHAR(100), kilometer_reading INTEGER NOT NULL,
+    engine_number VARCHAR(50) NOT NULL, chassis_number VARCHAR(50) NOT NULL, description TEXT,
+    check_in_date DATETIME);
+CREATE TABLE photos (id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL,
+    photo_type VARCHAR(50) NOT NULL, filename VARCHAR(255) NOT NULL, filepath VARCHAR(500) NOT NULL,
+    upload_date DATETIME);
+CREATE TABLE registration_status (id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE,
+    is_completed BOOLEAN, completion_date DATETIME);
+CREATE TABLE claims (id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE,
+    claim_number VARCHAR(100), updated_date DATETIME);
+CREATE TABLE approvals (id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE,
+    is_approved BOOLEAN, approval_date DATETIME);
+CREATE TABLE work_status (id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE,
+    created_date DATETIME);
+CREATE TABLE work_items (id INTEGER NOT NULL PRIMARY KEY,
+    work_status_id INTEGER NOT NULL REFERENCES work_status (id), item_name VARCHAR(100) NOT NULL,
+    is_completed BOOLEAN, completion_date DATETIME);
+CREATE TABLE deliveries (id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE,
+    is_delivered BOOLEAN, delivery_date DATETIME, delivered_by VARCHAR(100), notes TEXT);
+'''
+
+OLD_JOIN = '''
+SELECT COUNT(*), SUM(r.is_completed), COUNT(c.claim_number), SUM(d.is_delivered), COUNT(p.id)
+FROM inventory i
+LEFT JOIN registration_status r ON r.vehicle_number = i.vehicle_number
+LEFT JOIN claims c ON c.vehicle_number = i.vehicle_number
+LEFT JOIN work_status w ON w.vehicle_number = i.vehicle_number
+LEFT JOIN deliveries d ON d.vehicle_number = i.vehicle_number
+LEFT JOIN photos p ON p.vehicle_number = i.vehicle_number AND p.photo_type = 'front'
+'''
+
+NEW_JOIN = OLD_JOIN.replace('.vehicle_number = i.vehicle_number', '.inventory_id = i.id')
+
+
+def populate(conn, vehicles):
+    conn.executescript(OLD_SCHEMA)
+    numbers = [f'KA{n:02d}AB{n:05d}' for n in range(vehicles)]
+    conn.executemany(
+        'INSERT INTO inventory (serial_number, vehicle_number, kilometer_reading, engine_number, chassis_number, '
+        "check_in_date) VALUES (?, ?, 1000, 'ENG', 'CHS', '2025-01-01 10:00:00')",
+        [(n + 1, number) for n, number in enumerate(numbers)])
+    for table, extra in (('registration_status', 'is_completed'), ('claims', 'claim_number'),
+                         ('approvals', 'is_approved'), ('deliveries', 'is_delivered')):
+        conn.executemany(f'INSERT INTO {table} (vehicle_number, {extra}) VALUES (?, 1)', [(n,) for n in numbers])
+    conn.executemany('INSERT INTO work_status (vehicle_number) VALUES (?)', [(n,) for n in numbers])
+    conn.executemany(
+        "INSERT INTO work_items (work_status_id, item_name, is_completed) VALUES (?, 'Painting', 1)",
+        [(n + 1,) for n in range(vehicles) for _ in range(5)])
+    conn.executemany(
+        "INSERT INTO photos (vehicle_number, photo_type, filename, filepath) VALUES (?, ?, 'x.jpg', 'photos/x.jpg')",
+        [(n, kind) for n in numbers for kind in ('front', 'full_back', 'odometer', 'damage')])
+    conn.commit()
+
+
+def index_bytes(conn):
+    """Bytes used by the indexes on the tables that link to inventory"""
+    rows = conn.execute(
+        "SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+        "WHERE m.type = 'index' AND m.tbl_name != 'inventory' GROUP BY m.tbl_name"
+    ).fetchall()
+    return dict(rows)
+
+
+def time_query(conn, sql, repeats=15):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    vehicles = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = sqlite3.connect(path)
+        populate(conn, vehicles)
+        before = (index_bytes(conn), time_query(conn, OLD_JOIN))
+        conn.close()
+
+        upgrade_database(path, log=lambda message: None)
+
+        conn = sqlite3.connect(path)
+        conn.execute('VACUUM')
+        after = (index_bytes(conn), time_query(conn, NEW_JOIN))
+        conn.close()
+
+    print(f'{vehicles} vehicles, 4 photos and 5 work items each')
+    print(f"{'index size (KiB)':<22} {'vehicle_number':>15} {'inventory_id':>13}")
+    for table in sorted(set(before[0]) | set(after[0])):
+        print(f"{table:<22} {before[0].get(table, 0) / 1024:>15.0f} {after[0].get(table, 0) / 1024:>13.0f}")
+    print(f"{'join (ms)':<22} {before[1] * 1000:>15.1f} {after[1] * 1000:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Compare the async read API with the Flask routes under concurrent load
+
+Start both tiers on the same database, then point the script at them:
+
+    gunicorn -c gunicorn.conf.py                                  # :9696
+    uvicorn --factory asgi:create_asgi_app --port 9697 --no-access-log
+    python scripts/load_test_async.py --db instance/car_service.db [--concurrency 500] [--requests 5000]
+
+Each tier gets the same request mix: vehicle snapshots, dashboard counters,
+claim duplicate checks, photo listings and photo files, for vehicles and
+photos sampled from the database. Needs httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import time
+
+import httpx
+
+# (name, weight, WSGI request, ASGI request); each request is (method, path template, JSON body or None)
+MIX = [
+    ('vehicle', 40, ('GET', '/api/vehicle/{vehicle}', None), ('GET', '/api/vehicle/{vehicle}', None)),
+    ('dashboard_stats', 20, ('GET', '/api/dashboard_stats', None), ('GET', '/api/dashboard_stats', None)),
+    ('validate_claim', 20, ('POST', '/validate_claim', 'claim'), ('POST', '/validate_claim', 'claim')),
+    ('photo_listing', 10, ('GET', '/view_photos/{vehicle}', None), ('GET', '/api/photos/{vehicle}', None)),
+    ('photo_file', 10, ('GET', '/photo/{photo}', None), ('GET', '/photo/{photo}', None)),
+]
+
+
+def sample_data(database_path, limit=1000):
+    conn = sqlite3.connect(database_path)
+    try:
+        vehicles = [row[0] for row in conn.execute(
+            'SELECT vehicle_number FROM inventory ORDER BY RANDOM() LIMIT ?', (limit,))]
+        claims = [row[0] for row in conn.execute(
+            'SELECT claim_number FROM claims WHERE claim_number IS NOT NULL ORDER BY RANDOM() LIMIT ?', (limit,))]
+        photos = [row[0].replace('\\', '/') for row in conn.execute(
+            'SELECT filepath FROM photos ORDER BY RANDOM() LIMIT ?', (limit,))]
+    finally:
+        conn.close()
+    if not vehicles:
+        raise SystemExit(f'No vehicles in {database_path}')
+    return vehicles, claims or ['NONE'], photos
+
+
+def build_plan(requests, vehicles, claims, photos, seed=1):
+    """The same random sequence of (name, index into MIX) for both tiers"""
+    rng = random.Random(seed)
+    mix = [entry for entry in MIX if entry[0] != 'photo_file' or photos]
+    names = rng.choices(range(len(mix)), weights=[entry[1] for entry in mix], k=requests)
+    return [(mix[index], {'vehicle': rng.choice(vehicles), 'photo': rng.choice(photos) if photos else '',
+                          'claim': rng.choice(claims)}) for index in names]
+
+
+async def run_tier(base_url, plan, tier, concurrency):
+    """Send the plan with at most ``concurrency`` requests in flight; return per-endpoint latencies and errors"""
+    latencies, errors = {}, {}
+    queue = iter(plan)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            for entry, values in queue:
+                name = entry[0]
+                method, path, body = entry[2] if tier == 'wsgi' else entry[3]
+                json_body = {'claim_number': values['claim'], 'vehicle_number': values['vehicle']} if body else None
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path.format(**values), json=json_body)
+                    ok = response.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                latencies.setdefault(name, []).append(time.perf_counter() - start)
+                if not ok:
+                    errors[name] = errors.get(name, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(tier, latencies, errors, elapsed):
+    total = sum(len(values) for values in latencies.values())
+    print(f'\n{tier}: {total} requests in {elapsed:.2f} s = {total / elapsed:.0f} req/s')
+    print(f"{'endpoint':<16} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        print(f'{name:<16} {len(values):>7} {statistics.median(values) * 1000:>8.1f} '
+              f'{percentile(values, 0.95) * 1000:>8.1f} {percentile(values, 0.99) * 1000:>8.1f} {errors.get(name, 0):>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--wsgi', default='http://127.0.0.1:9696', help='Flask/gunicorn base URL')
+    parser.add_argument('--asgi', default='http://127.0.0.1:9697', help='Async API base URL')
+    parser.add_argument('--db', default='instance/car_service.db', help='Database to sample vehicles and photos from')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=500, help='Untimed requests first, to fill caches and pools')
+    args = parser.parse_args()
+
+    data = sample_data(args.db)
+    plan = build_plan(args.requests, *data)
+    warmup = build_plan(args.warmup, *data, seed=2)
+    results = {}
+    for tier, base_url in (('wsgi', args.wsgi), ('asgi', args.asgi)):
+        asyncio.run(run_tier(base_url, warmup, tier, min(args.concurrency, 10)))
+        results[tier] = asyncio.run(run_tier(base_url, plan, tier, args.concurrency))
+        report(f'{tier} ({base_url})', *results[tier])
+
+    (_, _, wsgi_elapsed), (_, _, asgi_elapsed) = results['wsgi'], results['asgi']
+    print(f'\nasync tier throughput: {wsgi_elapsed / asgi_elapsed:.1f}x the Flask routes')
+
+
+if __name__ == '__main__':
+    main()
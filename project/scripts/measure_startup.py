@@ -0,0 +1,48 @@
+"""Measure worker start-up cost: import time and peak RSS of create_app()
+
+Each scenario runs in a fresh interpreter, the way a recycled gunicorn
+worker starts. ``eager`` additionally imports the report engines up front,
+which is what every worker paid before they were imported lazily.
+
+    python scripts/measure_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = '''
+import resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+if sys.argv[1] == 'eager':
+    import reports.generator
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def measure(scenario, runs):
+    timings, rss = [], []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', SNIPPET, scenario], cwd=PROJECT_DIR, text=True)
+        elapsed, max_rss = output.split()
+        timings.append(float(elapsed))
+        rss.append(int(max_rss))
+    return statistics.median(timings), statistics.median(rss)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'scenario':<8} {'startup (ms)':>14} {'max RSS (MiB)':>14}")
+    for scenario in ('eager', 'lazy'):
+        elapsed, max_rss = measure(scenario, runs)
+        # ru_maxrss is reported in KiB on Linux
+        print(f"{scenario:<8} {elapsed * 1000:>14.1f} {max_rss / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
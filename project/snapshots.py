@@ -0,0 +1,215 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from cache import LRUCache
+from models import current_branch, db
+from models.inventory import Inventory
+from models.work_status import WorkStatus, WorkItem
+
+# Snapshots keyed by (branch, inventory id, version). Every commit that
+# touches a vehicle bumps inventory.version, so a write made by any worker
+# process is seen by the next lookup in all of them; old entries age out.
+snapshot_cache = LRUCache(maxsize=512, ttl=30)
+
+# work_status_id -> inventory id for cached snapshots, so WorkItem writes need
+# no extra query. Keys start with the branch, since ids repeat across branches.
+_work_status_owners = LRUCache(maxsize=4096)
+
+
+def calculate_progress(registration, claim, work_items):
+    """Calculate completion percentage from already loaded records"""
+    total_steps = 4  # Inventory, Registration, Claim, Work Status
+    completed_steps = 1  # Inventory is always completed if vehicle exists
+
+    if registration and registration.is_completed:
+        completed_steps += 1
+    if claim and claim.claim_number:
+        completed_steps += 1
+    if work_items and all(item.is_completed for item in work_items):
+        completed_steps += 1
+
+    return int((completed_steps / total_steps) * 100)
+
+
+def completion_stats(total_vehicles, completed_vehicles):
+    """Dashboard counters from the number of vehicles and how many are at 100%"""
+    in_progress = total_vehicles - completed_vehicles
+    completion_rate = int((completed_vehicles / total_vehicles) * 100) if total_vehicles > 0 else 0
+
+    return {
+        'total': total_vehicles,
+        'completed': completed_vehicles,
+        'in_progress': in_progress,
+        'completion_rate': completion_rate
+    }
+
+
+def _freeze(obj):
+    """Copy a model's column values into a plain, session-independent record"""
+    if obj is None:
+        return None
+    return SimpleNamespace(**{attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs})
+
+
+def _record_dict(record):
+    if record is None:
+        return None
+    return {key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in vars(record).items()}
+
+
+class VehicleSnapshot:
+    """A vehicle together with every record related to it"""
+
+    def __init__(self, vehicle, photos, registration, claim, approval, work_status, work_items, delivery, archived=False):
+        self.vehicle = vehicle
+        self.photos = photos
+        self.registration = registration
+        self.claim = claim
+        self.approval = approval
+        self.work_status = work_status
+        self.work_items = work_items
+        self.delivery = delivery
+        self.archived = archived
+        self.progress = calculate_progress(registration, claim, work_items)
+
+    def to_dict(self):
+        vehicle_number = self.vehicle.vehicle_number
+
+        def related(record):
+            # Rows are keyed by inventory_id now; API clients still get the vehicle_number they always had
+            data = _record_dict(record)
+            if data is not None:
+                data['vehicle_number'] = vehicle_number
+            return data
+
+        return {
+            'vehicle': _record_dict(self.vehicle),
+            'photos': [related(photo) for photo in self.photos],
+            'registration': related(self.registration),
+            'claim': related(self.claim),
+            'approval': related(self.approval),
+            'work_status': related(self.work_status),
+            'work_items': [_record_dict(item) for item in self.work_items],
+            'delivery': related(self.delivery),
+            'progress': self.progress,
+            'archived': self.archived
+        }
+
+
+def snapshot_query(vehicle_number):
+    """Select a vehicle with its one-to-one records and work items joined in, then its photos"""
+    return select(Inventory).options(
+        joinedload(Inventory.registration),
+        joinedload(Inventory.claim),
+        joinedload(Inventory.approval),
+        joinedload(Inventory.delivery),
+        joinedload(Inventory.work_status).joinedload(WorkStatus.work_items),
+        selectinload(Inventory.photos)
+    ).where(Inventory.vehicle_number == vehicle_number).limit(1)
+
+
+def build_snapshot(vehicle):
+    """Freeze a vehicle loaded by snapshot_query into a VehicleSnapshot"""
+    work_status = vehicle.work_status
+    return VehicleSnapshot(
+        vehicle=_freeze(vehicle),
+        photos=[_freeze(photo) for photo in vehicle.photos],
+        registration=_freeze(vehicle.registration),
+        claim=_freeze(vehicle.claim),
+        approval=_freeze(vehicle.approval),
+        work_status=_freeze(work_status),
+        work_items=[_freeze(item) for item in work_status.work_items] if work_status else [],
+        delivery=_freeze(vehicle.delivery)
+    )
+
+
+def _query_snapshot(vehicle_number):
+    vehicle = db.session.execute(snapshot_query(vehicle_number)).unique().scalar_one_or_none()
+    return build_snapshot(vehicle) if vehicle is not None else None
+
+
+def version_query(vehicle_number):
+    """Select a vehicle's (id, version) by number, one indexed lookup"""
+    return select(Inventory.id, Inventory.version).where(Inventory.vehicle_number == vehicle_number)
+
+
+def load_vehicle_snapshot(vehicle_number):
+    """Return the snapshot for a vehicle's current version, from the cache when it has it"""
+    snapshot_cache.maxsize = current_app.config.get('SNAPSHOT_CACHE_SIZE', 512)
+    snapshot_cache.ttl = current_app.config.get('SNAPSHOT_CACHE_TTL', 30)
+
+    stamp = db.session.execute(version_query(vehicle_number)).first()
+    if stamp is None:
+        return None
+    key = (current_branch(), stamp.id, stamp.version)
+    snapshot = snapshot_cache.get(key)
+    if snapshot is None:
+        snapshot = _query_snapshot(vehicle_number)
+        if snapshot is None:
+            return None
+        snapshot_cache.set(key, snapshot)
+        if snapshot.work_status:
+            _work_status_owners.set((key[0], snapshot.work_status.id), stamp.id)
+    return snapshot
+
+
+def mark_vehicle_changed(vehicle_id):
+    """Count a vehicle as changed on commit for writes that bypass the ORM unit of work"""
+    db.session.info.setdefault('snapshot_invalidations', set()).add(vehicle_id)
+
+
+def _work_status_owner(session, item):
+    """Inventory id behind a work item, from the owner cache, the loaded parent or one lookup"""
+    key = (current_branch(), item.work_status_id)
+    owner = _work_status_owners.get(key)
+    if owner is None:
+        work_status = item.__dict__.get('work_status')
+        if work_status is not None:
+            owner = work_status.inventory_id
+        elif item.work_status_id is not None:
+            owner = session.execute(
+                select(WorkStatus.inventory_id).where(WorkStatus.id == item.work_status_id)).scalar()
+        if owner is not None:
+            _work_status_owners.set(key, owner)
+    return owner
+
+
+def pending_vehicle_changes(session):
+    """Inventory ids changed so far in the session's current transaction"""
+    return session.info.get('snapshot_invalidations', set())
+
+
+def _affected_vehicles(session):
+    """Collect the inventory ids touched by pending changes in a session"""
+    vehicles = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Inventory):
+            vehicles.add(obj.id)
+        elif isinstance(obj, WorkItem):
+            vehicles.add(_work_status_owner(session, obj))
+        elif hasattr(obj, 'inventory_id'):
+            vehicle = obj.__dict__.get('vehicle')
+            vehicles.add(obj.inventory_id if obj.inventory_id is not None else getattr(vehicle, 'id', None))
+    vehicles.discard(None)
+    return vehicles
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_invalidations(session, flush_context, instances):
+    session.info.setdefault('snapshot_invalidations', set()).update(_affected_vehicles(session))
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_invalidations(session):
+    # The version bump made at commit already retired the cached snapshots
+    session.info.pop('snapshot_invalidations', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('snapshot_invalidations', None)
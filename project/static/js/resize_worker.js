@@ -0,0 +1,24 @@
+// Downscales photos off the main thread for the upload page.
+// Receives {id, file, maxPx, quality, mimeType}; replies {id, blob} or {id, error}.
+
+self.onmessage = async function(e) {
+    const { id, file, maxPx, quality, mimeType } = e.data;
+    try {
+        // Apply the EXIF rotation while decoding so the pixels come out upright
+        const bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+        const scale = Math.min(1, maxPx / Math.max(bitmap.width, bitmap.height));
+        const width = Math.round(bitmap.width * scale);
+        const height = Math.round(bitmap.height * scale);
+
+        const canvas = new OffscreenCanvas(width, height);
+        const ctx = canvas.getContext('2d');
+        ctx.imageSmoothingQuality = 'high';
+        ctx.drawImage(bitmap, 0, 0, width, height);
+        bitmap.close();
+
+        const blob = await canvas.convertToBlob({ type: mimeType, quality: quality });
+        self.postMessage({ id, blob });
+    } catch (error) {
+        self.postMessage({ id, error: String(error) });
+    }
+};
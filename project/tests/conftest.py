@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from fragments import fragment_cache  # noqa: E402
+from models import db  # noqa: E402
+from models.inventory import Inventory  # noqa: E402
+from snapshots import _work_status_owners, snapshot_cache  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh database in tmp_path, inside an app context"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'car_service.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'photos'),
+        'REPORTS_DIR': str(tmp_path / 'reports'),
+        'ARCHIVE_DIR': str(tmp_path / 'archive'),
+        'BACKUP_DIR': str(tmp_path / 'backups'),
+    })
+    # Per-process caches are keyed by ids, which every test database starts again from 1
+    for cache in (snapshot_cache, _work_status_owners, fragment_cache):
+        cache.clear()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def branch_app(tmp_path):
+    """A multi-branch app with branches north and south, inside an app context"""
+    branches = {name: f"sqlite:///{tmp_path / name}.db" for name in ('north', 'south')}
+    app = create_app({
+        'TESTING': True,
+        'BRANCH_DATABASES': branches,
+        'UPLOAD_FOLDER': str(tmp_path / 'photos'),
+        'REPORTS_DIR': str(tmp_path / 'reports'),
+        'ARCHIVE_DIR': str(tmp_path / 'archive'),
+        'BACKUP_DIR': str(tmp_path / 'backups'),
+    })
+    for cache in (snapshot_cache, _work_status_owners, fragment_cache):
+        cache.clear()
+    with app.app_context():
+        for name in branches:
+            db.metadata.create_all(db.engines[name])
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registered a metadata per bind on the shared db; later apps have no such binds
+    for name in branches:
+        db.metadatas.pop(name, None)
+
+
+@pytest.fixture
+def make_vehicle(app):
+    """Add a vehicle with the next serial number; keyword arguments override its columns"""
+    serials = iter(range(1, 10000))
+
+    def make(**columns):
+        serial = next(serials)
+        values = {'serial_number': serial, 'vehicle_number': f'KA01AB{serial:04d}', 'kilometer_reading': 1000,
+                  'engine_number': f'ENG{serial}', 'chassis_number': f'CH{serial}'}
+        values.update(columns)
+        vehicle = Inventory(**values)
+        db.session.add(vehicle)
+        db.session.commit()
+        return vehicle
+
+    return make
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+import archive
+from models import db
+from models.claims import Claim
+from models.delivery import Delivery
+from models.inventory import Inventory
+from models.kpis import DailyKpi
+from models.photos import Photo
+from reports.analytics import rollup_day
+from work_items import seed_work_status
+
+DELIVERED = datetime(2024, 5, 1, 12, 0)
+
+
+def _quiet(message):
+    pass
+
+
+@pytest.fixture
+def vehicle_with_records(make_vehicle):
+    """A vehicle with a checklist, claim and photo, delivered on DELIVERED when asked"""
+
+    def make(delivered=True, **columns):
+        vehicle = make_vehicle(**columns)
+        seed_work_status(vehicle)
+        db.session.add(Claim(inventory_id=vehicle.id, claim_number=f'CL-{vehicle.serial_number}'))
+        db.session.add(Photo(inventory_id=vehicle.id, photo_type='front', filename='front.jpg',
+                             filepath=f'2024-05/{vehicle.vehicle_number}/front.jpg'))
+        if delivered:
+            db.session.add(Delivery(inventory_id=vehicle.id, is_delivered=True, delivery_date=DELIVERED))
+        db.session.commit()
+        return vehicle
+
+    return make
+
+
+def test_round_trip(vehicle_with_records):
+    delivered = vehicle_with_records(vehicle_name='Swift')
+    vehicle_number, serial = delivered.vehicle_number, delivered.serial_number
+    vehicle_with_records(delivered=False)
+
+    assert archive.archive_delivered(days=30, log=_quiet) == 1
+
+    assert Inventory.query.filter_by(vehicle_number=vehicle_number).first() is None
+    assert Claim.query.count() == 1
+    assert [path.rsplit('/', 1)[-1] for path in archive.archive_paths()] == ['archive-2024.db']
+
+    snapshot = archive.load_archived_snapshot(vehicle_number)
+    assert snapshot.archived
+    assert snapshot.vehicle.serial_number == serial and snapshot.vehicle.vehicle_name == 'Swift'
+    assert snapshot.claim.claim_number == f'CL-{serial}'
+    assert snapshot.delivery.delivery_date == DELIVERED
+    assert [photo.filepath for photo in snapshot.photos] == [f'2024-05/{vehicle_number}/front.jpg']
+    assert [item.item_name for item in snapshot.work_items] == ['Tinkering', 'Painting', 'Fitting', 'Polish', 'Washing']
+    assert [(row.serial_number, row.claim_number) for row in archive.archived_vehicles()] == [(serial, f'CL-{serial}')]
+
+
+def test_newest_vehicle_stays(vehicle_with_records):
+    vehicle_with_records()
+    newest = vehicle_with_records()
+
+    assert archive.archive_delivered(days=30, log=_quiet) == 1
+    assert db.session.get(Inventory, newest.id) is not None
+
+
+def test_reused_ids_do_not_overwrite(vehicle_with_records):
+    first = vehicle_with_records()
+    archived = [(first.vehicle_number, first.serial_number)]
+    vehicle_with_records(delivered=False)
+    archive.archive_delivered(days=30, log=_quiet)
+
+    # SQLite may hand an archived row's id to a new row
+    second = vehicle_with_records()
+    db.session.execute(text('UPDATE claims SET id = 1 WHERE inventory_id = :id'), {'id': second.id})
+    db.session.execute(text('UPDATE photos SET id = 1 WHERE inventory_id = :id'), {'id': second.id})
+    db.session.commit()
+    archived.append((second.vehicle_number, second.serial_number))
+    vehicle_with_records(delivered=False)
+    assert archive.archive_delivered(days=30, log=_quiet) == 1
+
+    for vehicle_number, serial in archived:
+        snapshot = archive.load_archived_snapshot(vehicle_number)
+        assert snapshot.claim.claim_number == f'CL-{serial}'
+        assert [photo.filepath for photo in snapshot.photos] == [f'2024-05/{vehicle_number}/front.jpg']
+
+
+def test_rerun_after_interruption(vehicle_with_records):
+    vehicle = vehicle_with_records()
+    vehicle_with_records(delivered=False)
+    # An interrupted run: copied to the archive, not yet deleted from the working tables
+    archive._copy_to_archive(archive.archive_path(2024), [vehicle.id])
+
+    assert archive.archive_delivered(days=30, log=_quiet) == 1
+    snapshot = archive.load_archived_snapshot(vehicle.vehicle_number)
+    assert len(snapshot.photos) == 1 and len(snapshot.work_items) == 5
+
+
+def test_conflicting_vehicle_fails(vehicle_with_records):
+    vehicle = vehicle_with_records()
+    vehicle_with_records(delivered=False)
+    with archive.archive_engine(archive.archive_path(2024)).begin() as conn:
+        conn.execute(insert(archive.ARCHIVE_TABLES[Inventory]), [{
+            'id': vehicle.id, 'serial_number': 999, 'vehicle_number': 'OLD', 'kilometer_reading': 1,
+            'engine_number': 'E', 'chassis_number': 'C', 'version': 1}])
+
+    with pytest.raises(archive.ArchiveConflictError):
+        archive.archive_delivered(days=30, log=_quiet)
+    assert db.session.get(Inventory, vehicle.id) is not None
+
+
+def test_recent_deliveries_stay(vehicle_with_records):
+    vehicle = vehicle_with_records()
+    vehicle.delivery.delivery_date = datetime.now() - timedelta(days=5)
+    db.session.commit()
+    vehicle_with_records(delivered=False)
+
+    assert archive.archive_delivered(days=30, log=_quiet) == 0
+
+
+def test_rollup_keeps_days_with_archived_vehicles(vehicle_with_records):
+    day = DELIVERED.date()
+    vehicle_with_records(check_in_date=DELIVERED - timedelta(days=2))
+    vehicle_with_records(delivered=False, check_in_date=DELIVERED + timedelta(days=1))
+    rollup_day(day)
+    delivered = DailyKpi.query.filter_by(day=day, stage='delivery', insurer='').one().to_dict()
+
+    assert archive.archive_delivered(days=30, log=_quiet) == 1
+    assert archive.archived_through() == day
+
+    assert rollup_day(day) == 0
+    assert DailyKpi.query.filter_by(day=day, stage='delivery', insurer='').one().to_dict() == delivered
+    assert rollup_day(day + timedelta(days=1)) == 1
@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+from starlette.testclient import TestClient
+
+from asgi import create_asgi_app
+from models import db
+from models.claims import Claim
+from models.registration_status import RegistrationStatus
+from models.work_status import WorkItem, WorkStatus
+from snapshots import calculate_progress, completion_stats
+
+
+@pytest.fixture
+def client(app):
+    """The async tier on the same database and folders as the app fixture"""
+    keys = ('TESTING', 'SQLALCHEMY_DATABASE_URI', 'UPLOAD_FOLDER', 'REPORTS_DIR', 'ARCHIVE_DIR', 'BACKUP_DIR')
+    with TestClient(create_asgi_app({key: app.config[key] for key in keys})) as client:
+        yield client
+
+
+def _add_records(vehicle, registered=False, claim_number=None, items=()):
+    if registered is not None:
+        db.session.add(RegistrationStatus(inventory_id=vehicle.id, is_completed=registered))
+    if claim_number is not None:
+        db.session.add(Claim(inventory_id=vehicle.id, claim_number=claim_number))
+    if items:
+        work_status = WorkStatus(inventory_id=vehicle.id)
+        db.session.add(work_status)
+        db.session.flush()
+        for index, done in enumerate(items):
+            db.session.add(WorkItem(work_status_id=work_status.id, item_name=f'Item {index}', is_completed=done))
+    db.session.commit()
+
+
+def test_dashboard_counts_match_calculate_progress(client, make_vehicle):
+    fixtures = [
+        dict(registered=True, claim_number='CL-1', items=(True, True)),    # complete
+        dict(registered=True, claim_number='CL-2', items=(True, False)),   # one item open
+        dict(registered=True, claim_number='CL-3', items=(True, None)),    # item never marked
+        dict(registered=True, claim_number='', items=(True,)),             # blank claim number
+        dict(registered=True, claim_number='CL-5'),                        # no work items
+        dict(registered=False, claim_number='CL-6', items=(True,)),        # not registered
+        dict(registered=None, claim_number='CL-7', items=(True,)),         # no registration row
+        dict(registered=True, claim_number='CL-8', items=(True,)),         # complete
+    ]
+    vehicles = []
+    for records in fixtures:
+        vehicle = make_vehicle()
+        _add_records(vehicle, **records)
+        vehicles.append(vehicle)
+
+    completed = 0
+    for vehicle in vehicles:
+        db.session.refresh(vehicle)
+        work_items = vehicle.work_status.work_items if vehicle.work_status else []
+        if calculate_progress(vehicle.registration, vehicle.claim, work_items) == 100:
+            completed += 1
+
+    assert completed == 2
+    assert client.get('/api/dashboard_stats').json() == completion_stats(len(vehicles), completed)
+
+
+def test_snapshot_sees_write_committed_by_the_flask_app(app, client, make_vehicle):
+    vehicle = make_vehicle()
+    _add_records(vehicle, registered=None, claim_number='OLD')
+    url = f'/api/vehicle/{vehicle.vehicle_number}'
+    assert client.get(url).json()['claim']['claim_number'] == 'OLD'
+
+    # A Flask worker's commit: the row changes and inventory.version is bumped
+    conn = sqlite3.connect(db.engine.url.database)
+    with conn:
+        conn.execute('UPDATE claims SET claim_number = ? WHERE inventory_id = ?', ('NEW', vehicle.id))
+        conn.execute('UPDATE inventory SET version = version + 1 WHERE id = ?', (vehicle.id,))
+    conn.close()
+
+    assert client.get(url).json()['claim']['claim_number'] == 'NEW'
+
+
+def test_snapshot_of_deleted_vehicle_is_not_found(client, make_vehicle):
+    vehicle = make_vehicle()
+    url = f'/api/vehicle/{vehicle.vehicle_number}'
+    assert client.get(url).status_code == 200
+
+    db.session.delete(vehicle)
+    db.session.commit()
+    assert client.get(url).status_code == 404
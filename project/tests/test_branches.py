@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+from flask import g
+
+from branches import for_each_branch
+from models import db
+from models.inventory import Inventory
+from snapshots import load_vehicle_snapshot
+
+
+def _use(branch):
+    """Switch branch with a fresh session, as a new request would; ids repeat across branches"""
+    db.session.remove()
+    g.branch = branch
+
+
+def _add(branch, vehicle_number, serial_number=1):
+    _use(branch)
+    db.session.add(Inventory(serial_number=serial_number, vehicle_number=vehicle_number, kilometer_reading=1000,
+                             engine_number=f'ENG-{vehicle_number}', chassis_number=f'CH-{vehicle_number}'))
+    db.session.commit()
+
+
+def _numbers_in_file(tmp_path, branch):
+    conn = sqlite3.connect(tmp_path / f'{branch}.db')
+    try:
+        return [row[0] for row in conn.execute('SELECT vehicle_number FROM inventory ORDER BY id')]
+    finally:
+        conn.close()
+
+
+def test_writes_go_to_the_selected_branch(branch_app, tmp_path):
+    _add('north', 'KA01NN0001')
+    _add('south', 'KA01SS0001')
+    _add('south', 'KA01SS0002', serial_number=2)
+
+    assert _numbers_in_file(tmp_path, 'north') == ['KA01NN0001']
+    assert _numbers_in_file(tmp_path, 'south') == ['KA01SS0001', 'KA01SS0002']
+    _use('north')
+    assert [vehicle.vehicle_number for vehicle in Inventory.query] == ['KA01NN0001']
+
+
+def test_snapshots_do_not_cross_branches(branch_app):
+    _add('north', 'KA01AB0001')
+    _add('south', 'KA01AB0001')
+    _use('south')
+    south = Inventory.query.one()
+    south.customer_name = 'South customer'
+    db.session.commit()
+
+    # Both vehicles have id 1 in their own branch
+    _use('north')
+    assert load_vehicle_snapshot('KA01AB0001').vehicle.customer_name is None
+    _use('south')
+    assert load_vehicle_snapshot('KA01AB0001').vehicle.customer_name == 'South customer'
+
+
+def test_for_each_branch(branch_app):
+    _add('south', 'KA01SS0001')
+    _add('south', 'KA01SS0002', serial_number=2)
+
+    counts = for_each_branch(lambda: (g.branch, Inventory.query.count()))
+    assert counts == {'north': ('north', 0), 'south': ('south', 2)}
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({'headers': {'X-Branch': 'south'}}, 1),
+    ({'query_string': {'branch': 'south'}}, 1),
+    ({}, 0),  # BRANCH defaults to the first configured branch
+])
+def test_requests_pick_their_branch(branch_app, kwargs, expected):
+    _add('south', 'KA01SS0001')
+
+    response = branch_app.test_client().get('/api/dashboard_stats', **kwargs)
+    assert response.status_code == 200 and response.get_json()['total'] == expected
+
+
+def test_query_branch_is_remembered(branch_app):
+    _add('south', 'KA01SS0001')
+    client = branch_app.test_client()
+
+    client.get('/api/dashboard_stats?branch=south')
+    assert client.get('/api/dashboard_stats').get_json()['total'] == 1
+    # The header picks a branch for one request without changing the remembered one
+    assert client.get('/api/dashboard_stats', headers={'X-Branch': 'north'}).get_json()['total'] == 0
+    assert client.get('/api/dashboard_stats').get_json()['total'] == 1
+
+
+def test_unknown_branch_is_not_found(branch_app):
+    assert branch_app.test_client().get('/api/dashboard_stats', headers={'X-Branch': 'east'}).status_code == 404
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from changes import changes_since, compact_change_log
+from models import db
+from models.change_log import ChangeLog
+
+
+def _log():
+    return db.session.execute(select(ChangeLog.id, ChangeLog.inventory_id).order_by(ChangeLog.id)).all()
+
+
+def _age(vehicle_id, days):
+    db.session.execute(update(ChangeLog).where(ChangeLog.inventory_id == vehicle_id)
+                       .values(changed_at=datetime.now() - timedelta(days=days)))
+    db.session.commit()
+
+
+def _ids(feed):
+    return [vehicle['id'] for vehicle in feed['vehicles']]
+
+
+def test_feed_pages_through_changes(make_vehicle):
+    vehicles = [make_vehicle() for _ in range(3)]
+    vehicles[0].customer_name = 'Changed'
+    db.session.commit()
+
+    first = changes_since(0, limit=2)
+    assert _ids(first) == [vehicles[0].id, vehicles[1].id] and first['more']
+    second = changes_since(first['cursor'], limit=2)
+    assert _ids(second) == [vehicles[2].id, vehicles[0].id] and not second['more']
+    assert second['vehicles'][1]['customer_name'] == 'Changed'
+    assert changes_since(second['cursor']) == {
+        'cursor': second['cursor'], 'more': False, 'reset': False, 'vehicles': [], 'deleted': []}
+
+
+def test_deleted_vehicles(make_vehicle):
+    kept, deleted = make_vehicle(), make_vehicle()
+    cursor = changes_since(0)['cursor']
+    deleted_id = deleted.id
+    db.session.delete(deleted)
+    db.session.commit()
+
+    feed = changes_since(cursor)
+    assert feed['vehicles'] == [] and feed['deleted'] == [deleted_id]
+    assert _ids(changes_since(0)) == [kept.id]
+
+
+def test_compaction_keeps_newest_entry_per_vehicle(make_vehicle):
+    vehicle, other = make_vehicle(), make_vehicle()
+    vehicle.customer_name = 'Changed'
+    db.session.commit()
+    cursor = _log()[0].id
+
+    assert compact_change_log(retention_days=30) == 1
+    assert _log() == [(2, other.id), (3, vehicle.id)]
+    # No entry of a vanished vehicle was dropped, so old cursors stay valid
+    feed = changes_since(cursor)
+    assert not feed['reset'] and _ids(feed) == [other.id, vehicle.id]
+
+
+def test_recently_deleted_vehicles_are_kept(make_vehicle):
+    make_vehicle()
+    deleted = make_vehicle()
+    db.session.delete(deleted)
+    db.session.commit()
+
+    compact_change_log(retention_days=30)
+    assert db.session.execute(select(ChangeLog).where(ChangeLog.inventory_id.is_(None))).first() is None
+    assert changes_since(0)['deleted'] == [2]
+
+
+def test_expired_deletions_leave_a_horizon(make_vehicle):
+    first, deleted, last = make_vehicle(), make_vehicle(), make_vehicle()
+    deleted_id = deleted.id
+    db.session.delete(deleted)
+    db.session.commit()
+    assert _log() == [(1, first.id), (2, deleted_id), (3, last.id), (4, deleted_id)]
+    _age(deleted_id, days=40)
+
+    assert compact_change_log(retention_days=30) == 2
+    # The newest dropped id becomes the horizon marker; surviving entries keep their ids
+    assert _log() == [(1, first.id), (3, last.id), (4, None)]
+
+    for cursor in (1, 3):
+        assert changes_since(cursor) == {'cursor': 0, 'more': True, 'reset': True, 'vehicles': [], 'deleted': []}
+    # A sync from 0 pages below the horizon without being reset, then continues from it
+    resync = changes_since(0, limit=1)
+    assert not resync['reset'] and _ids(resync) == [first.id] and resync['more'] and resync['cursor'] == -1
+    resync = changes_since(resync['cursor'], limit=1)
+    assert not resync['reset'] and _ids(resync) == [last.id] and resync['deleted'] == []
+    assert resync['cursor'] == 4 and not resync['more']
+    assert changes_since(resync['cursor'])['vehicles'] == []
+
+    first.customer_name = 'Changed'
+    db.session.commit()
+    assert _ids(changes_since(resync['cursor'])) == [first.id]
+
+
+def test_repeated_compaction_keeps_one_horizon(make_vehicle):
+    vehicles = [make_vehicle() for _ in range(4)]
+    ids = [vehicle.id for vehicle in vehicles]
+    for index in (2, 0):
+        db.session.delete(vehicles[index])
+        db.session.commit()
+        _age(ids[index], days=40)
+        compact_change_log(retention_days=30)
+
+    markers = db.session.execute(select(ChangeLog.id).where(ChangeLog.inventory_id.is_(None))).scalars().all()
+    assert len(markers) == 1 and _log() == [(2, ids[1]), (4, ids[3]), (markers[0], None)]
+    assert changes_since(markers[0] - 1)['reset']
+    resync = changes_since(0)
+    assert _ids(resync) == [ids[1], ids[3]] and not changes_since(resync['cursor'])['reset']
+
+
+def test_cursors_past_the_horizon_survive_compaction(make_vehicle):
+    kept, deleted = make_vehicle(), make_vehicle()
+    deleted_id = deleted.id
+    db.session.delete(deleted)
+    db.session.commit()
+    cursor = changes_since(0)['cursor']
+    _age(deleted_id, days=40)
+
+    compact_change_log(retention_days=30)
+    # The tablet already saw the deletion, and nothing it has seen comes round again
+    assert changes_since(cursor) == {'cursor': cursor, 'more': False, 'reset': False, 'vehicles': [], 'deleted': []}
+    kept.customer_name = 'Changed'
+    db.session.commit()
+    assert _ids(changes_since(cursor)) == [kept.id]
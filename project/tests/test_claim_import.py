@@ -0,0 +1,126 @@
+import io
+
+import pytest
+
+from claim_import import ClaimImportError, apply_import, plan_import, read_rows, summarize
+from models import db
+from models.approvals import Approval
+from models.claims import Claim
+
+
+def _plan(csv_text):
+    return plan_import(read_rows(io.BytesIO(csv_text.encode()), 'claims.csv'))
+
+
+def _by_line(plan):
+    return {entry['line']: entry for entry in plan}
+
+
+@pytest.fixture
+def vehicles(make_vehicle):
+    first = make_vehicle(vehicle_number='KA01AA0001', chassis_number='CHASSIS1')
+    second = make_vehicle(vehicle_number='KA01AA0002', engine_number='ENGINE2')
+    third = make_vehicle(vehicle_number='KA01AA0003')
+    db.session.add(Claim(inventory_id=third.id, claim_number='TAKEN'))
+    db.session.commit()
+    return first, second, third
+
+
+def test_matches_by_any_identifier(vehicles):
+    first, second, _ = vehicles
+    plan = _by_line(_plan('Vehicle No,Chassis,Engine No,Claim No,Approved\n'
+                          'ka01aa0001,,,C-1,yes\n'
+                          ',,ENGINE2,C-2,\n'))
+
+    assert plan[2]['vehicle_id'] == first.id and plan[2]['error'] is None
+    assert plan[2]['claim'] == (None, 'C-1') and plan[2]['approval'] == (None, True)
+    assert plan[3]['vehicle_id'] == second.id and plan[3]['claim'] == (None, 'C-2')
+
+
+def test_unknown_vehicle(vehicles):
+    plan = _by_line(_plan('vehicle_number,claim_number\nNOPE,C-9\n'))
+
+    assert plan[2]['vehicle_id'] is None
+    assert plan[2]['error'] == 'No matching vehicle'
+
+
+def test_duplicate_claim_numbers(vehicles):
+    plan = _by_line(_plan('vehicle_number,claim_number\n'
+                          'KA01AA0001,SAME\n'
+                          'KA01AA0002,SAME\n'
+                          'KA01AA0001,C-3\n'
+                          'KA01AA0002,TAKEN\n'))
+
+    assert plan[2]['error'] == plan[3]['error'] == 'Claim number SAME appears on 2 rows'
+    assert plan[4]['error'] == 'Vehicle already listed on line 2'
+    assert plan[5]['error'] == 'Vehicle already listed on line 3'
+
+
+def test_claim_held_by_another_vehicle(vehicles):
+    plan = _by_line(_plan('vehicle_number,claim_number\nKA01AA0001,TAKEN\n'))
+
+    assert plan[2]['error'] == 'Claim number TAKEN already belongs to another vehicle'
+
+
+def test_claim_released_in_the_same_file(vehicles):
+    plan = _by_line(_plan('vehicle_number,claim_number\nKA01AA0003,NEW\nKA01AA0001,TAKEN\n'))
+
+    assert plan[2]['error'] is None and plan[2]['claim'] == ('TAKEN', 'NEW')
+    assert plan[3]['error'] is None and plan[3]['claim'] == (None, 'TAKEN')
+
+
+def test_claim_not_released_by_a_rejected_row(vehicles):
+    plan = _by_line(_plan('vehicle_number,claim_number\n'
+                          'KA01AA0003,SAME\n'
+                          'KA01AA0002,SAME\n'
+                          'KA01AA0001,TAKEN\n'))
+
+    assert plan[2]['error'] == plan[3]['error'] == 'Claim number SAME appears on 2 rows'
+    assert plan[4]['error'] == 'Claim number TAKEN already belongs to another vehicle'
+
+
+def test_unchanged_rows_and_bad_approvals(vehicles):
+    plan = _by_line(_plan('vehicle_number,claim_number,approved\nKA01AA0003,TAKEN,\nKA01AA0001,,maybe\n'))
+
+    assert plan[2]['error'] is None and plan[2]['claim'] is None and plan[2]['approval'] is None
+    assert plan[3]['error'] == 'Unrecognised approval value "maybe"'
+
+
+def test_apply_writes_only_valid_rows(vehicles):
+    first, second, _ = vehicles
+    plan = _plan('vehicle_number,claim_number,approved\n'
+                 'KA01AA0001,C-1,approved\n'
+                 'KA01AA0002,TAKEN,yes\n'
+                 'NOPE,C-9,yes\n')
+
+    summary = apply_import(plan)
+
+    assert summary == summarize(plan) == {'rows': 3, 'claims': 1, 'approvals': 1, 'unchanged': 0, 'errors': 2}
+    assert Claim.query.filter_by(inventory_id=first.id).one().claim_number == 'C-1'
+    assert Approval.query.filter_by(inventory_id=first.id).one().is_approved is True
+    assert Claim.query.filter_by(inventory_id=second.id).first() is None
+
+
+@pytest.mark.parametrize('csv_text, message', [
+    ('', 'The file is empty'),
+    ('claim_number\nC-1\n', 'No vehicle, chassis or engine number column found'),
+    ('vehicle_number,notes\nKA01AA0001,x\n', 'No claim number or approval column found'),
+])
+def test_unreadable_files(app, csv_text, message):
+    with pytest.raises(ClaimImportError, match=message):
+        _plan(csv_text)
+
+
+def test_reads_xlsx(vehicles):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.active.append(['Registration', 'Claim', 'Decision'])
+    workbook.active.append(['KA01AA0001', 123456.0, 'Approved'])
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+
+    plan = plan_import(read_rows(stream, 'claims.xlsx'))
+
+    assert plan[0]['claim'] == (None, '123456') and plan[0]['approval'] == (None, True)
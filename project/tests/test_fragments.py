@@ -0,0 +1,83 @@
+import pytest
+
+from fragments import vehicle_fragments
+from models import db
+from models.claims import Claim
+from models.inventory import Inventory
+from models.photos import Photo
+from models.work_status import WorkItem
+from work_items import seed_work_status
+
+
+def _version(vehicle_id):
+    db.session.expire_all()
+    return db.session.get(Inventory, vehicle_id).version
+
+
+@pytest.fixture
+def vehicle(make_vehicle):
+    vehicle = make_vehicle()
+    seed_work_status(vehicle)
+    db.session.commit()
+    return vehicle
+
+
+def test_photo_change_bumps_version(vehicle):
+    before = _version(vehicle.id)
+    db.session.add(Photo(inventory_id=vehicle.id, photo_type='front', filename='front.jpg', filepath='front.jpg'))
+    db.session.commit()
+    assert _version(vehicle.id) == before + 1
+
+    db.session.delete(Photo.query.filter_by(inventory_id=vehicle.id).one())
+    db.session.commit()
+    assert _version(vehicle.id) == before + 2
+
+
+def test_work_item_change_bumps_version(vehicle):
+    before = _version(vehicle.id)
+    # Loaded on its own, without the work status it belongs to
+    item = WorkItem.query.first()
+    item.is_completed = True
+    db.session.commit()
+    assert _version(vehicle.id) == before + 1
+
+
+def test_claim_change_bumps_version(vehicle):
+    before = _version(vehicle.id)
+    db.session.add(Claim(inventory_id=vehicle.id, claim_number='CL-1'))
+    db.session.commit()
+    assert _version(vehicle.id) == before + 1
+
+    Claim.query.filter_by(inventory_id=vehicle.id).one().claim_number = 'CL-2'
+    db.session.commit()
+    assert _version(vehicle.id) == before + 2
+
+
+def test_untouched_vehicles_keep_their_version(vehicle, make_vehicle):
+    other = make_vehicle()
+    before = _version(other.id)
+    db.session.add(Claim(inventory_id=vehicle.id, claim_number='CL-1'))
+    db.session.commit()
+    assert _version(other.id) == before
+
+
+def test_fragments_are_rebuilt_only_for_new_versions(vehicle, make_vehicle):
+    other = make_vehicle()
+    built = []
+
+    def build(vehicle_ids):
+        built.append(sorted(vehicle_ids))
+        return {vehicle_id: f'row {vehicle_id} v{_version(vehicle_id)}' for vehicle_id in vehicle_ids}
+
+    def stamps():
+        return [(vehicle.id, _version(vehicle.id)), (other.id, _version(other.id))]
+
+    first = vehicle_fragments('row', stamps(), build)
+    assert vehicle_fragments('row', stamps(), build) == first
+
+    db.session.add(Claim(inventory_id=vehicle.id, claim_number='CL-1'))
+    db.session.commit()
+    fragments = vehicle_fragments('row', stamps(), build)
+
+    assert built == [sorted([vehicle.id, other.id]), [vehicle.id]]
+    assert fragments[other.id] == first[other.id] and fragments[vehicle.id] != first[vehicle.id]
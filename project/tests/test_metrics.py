@@ -0,0 +1,13 @@
+def test_file_sizes_of_every_branch(branch_app, tmp_path):
+    body = branch_app.test_client().get('/metrics').get_data(as_text=True)
+
+    for name in ('north', 'south'):
+        size = (tmp_path / f'{name}.db').stat().st_size
+        assert f'sqlite_file_size_bytes{{bind="{name}",file="db"}} {float(size)}' in body
+    assert 'bind="default"' not in body
+
+
+def test_file_size_of_single_database(app):
+    body = app.test_client().get('/metrics').get_data(as_text=True)
+
+    assert 'sqlite_file_size_bytes{bind="default",file="db"}' in body
@@ -0,0 +1,102 @@
+import sqlite3
+
+from migrations import SCHEMA_VERSION, upgrade_database
+
+# The schema before any migration: related tables linked by vehicle_number
+V0_SCHEMA = '''
+CREATE TABLE inventory (
+    id INTEGER NOT NULL PRIMARY KEY, serial_number INTEGER NOT NULL UNIQUE,
+    vehicle_number VARCHAR(20) NOT NULL UNIQUE, vehicle_name VARCHAR(100), customer_name VARCHAR(100),
+    phone_number VARCHAR(15), insurance_name VARCHAR(100), kilometer_reading INTEGER NOT NULL,
+    engine_number VARCHAR(50) NOT NULL, chassis_number VARCHAR(50) NOT NULL, description TEXT,
+    check_in_date DATETIME);
+CREATE TABLE photos (
+    id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL, photo_type VARCHAR(50) NOT NULL,
+    filename VARCHAR(255) NOT NULL, filepath VARCHAR(500) NOT NULL, upload_date DATETIME);
+CREATE TABLE claims (
+    id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE, claim_number VARCHAR(100),
+    updated_date DATETIME);
+CREATE TABLE approvals (
+    id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE, is_approved BOOLEAN,
+    approval_date DATETIME);
+CREATE TABLE registration_status (
+    id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE, is_completed BOOLEAN,
+    completion_date DATETIME);
+CREATE TABLE work_status (
+    id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE, created_date DATETIME);
+CREATE TABLE work_items (
+    id INTEGER NOT NULL PRIMARY KEY, work_status_id INTEGER NOT NULL REFERENCES work_status (id),
+    item_name VARCHAR(100) NOT NULL, is_completed BOOLEAN, completion_date DATETIME);
+CREATE TABLE deliveries (
+    id INTEGER NOT NULL PRIMARY KEY, vehicle_number VARCHAR(20) NOT NULL UNIQUE, is_delivered BOOLEAN,
+    delivery_date DATETIME, delivered_by VARCHAR(100), notes TEXT);
+
+INSERT INTO inventory VALUES (7, 1, 'KA01', 'Swift', 'A', '1', 'Acme', 100, 'E1', 'C1', NULL, '2024-01-01 10:00:00');
+INSERT INTO inventory VALUES (9, 2, 'KA02', 'Alto', 'B', '2', 'Acme', 200, 'E2', 'C2', NULL, '2024-01-02 10:00:00');
+INSERT INTO photos VALUES (1, 'KA01', 'front', 'front.jpg', '2024-01/KA01/front.jpg', NULL);
+INSERT INTO photos VALUES (2, 'KA02', 'front', 'front.jpg', '2024-01/KA02/front.jpg', NULL);
+INSERT INTO photos VALUES (3, 'GONE', 'front', 'front.jpg', '2024-01/GONE/front.jpg', NULL);
+INSERT INTO claims VALUES (1, 'KA01', 'CL-1', NULL);
+INSERT INTO claims VALUES (2, 'GONE', 'CL-2', NULL);
+INSERT INTO approvals VALUES (1, 'KA02', 1, NULL);
+INSERT INTO registration_status VALUES (1, 'KA01', 1, NULL);
+INSERT INTO work_status VALUES (1, 'KA01', NULL);
+INSERT INTO work_status VALUES (2, 'GONE', NULL);
+INSERT INTO work_items VALUES (1, 1, 'Painting', 0, NULL);
+INSERT INTO work_items VALUES (2, 2, 'Painting', 0, NULL);
+INSERT INTO deliveries VALUES (1, 'KA02', 1, '2024-02-01 10:00:00', 'X', NULL);
+'''
+
+
+def _v0_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(V0_SCHEMA)
+    conn.close()
+
+
+def test_upgrade_from_v0(tmp_path):
+    path = str(tmp_path / 'car_service.db')
+    _v0_database(path)
+
+    assert upgrade_database(path, log=lambda message: None) == SCHEMA_VERSION == 4
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 4
+        assert conn.execute('PRAGMA foreign_key_check').fetchall() == []
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+
+        # Links now go through inventory.id; rows of unknown vehicles are dropped, ids kept
+        for table in ('photos', 'claims', 'approvals', 'registration_status', 'work_status', 'deliveries'):
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+            assert 'inventory_id' in columns and 'vehicle_number' not in columns
+        assert conn.execute('SELECT id, inventory_id FROM photos ORDER BY id').fetchall() == [(1, 7), (2, 9)]
+        assert conn.execute('SELECT inventory_id, claim_number FROM claims').fetchall() == [(7, 'CL-1')]
+        assert conn.execute('SELECT id, work_status_id FROM work_items').fetchall() == [(1, 1)]
+
+        assert conn.execute('SELECT version FROM inventory ORDER BY id').fetchall() == [(1,), (1,)]
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'ix_inventory_engine_number', 'ix_inventory_chassis_number', 'ix_claims_claim_number',
+                'ix_photos_inventory_id', 'ix_work_items_work_status_id'} <= indexes
+        # Every vehicle starts in the change feed, in serial order
+        assert conn.execute('SELECT inventory_id FROM change_log ORDER BY id').fetchall() == [(7,), (9,)]
+
+        # Deleting a vehicle now cascades to its records
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.execute('DELETE FROM inventory WHERE id = 7')
+        assert conn.execute('SELECT COUNT(*) FROM work_items').fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM claims').fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    assert list(tmp_path.glob('car_service.db.pre-v1-*.bak'))
+
+
+def test_upgrade_is_a_no_op_when_current(tmp_path):
+    path = str(tmp_path / 'car_service.db')
+    _v0_database(path)
+    upgrade_database(path, log=lambda message: None)
+    messages = []
+
+    assert upgrade_database(path, log=messages.append) == SCHEMA_VERSION
+    assert messages == []
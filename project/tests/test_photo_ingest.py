@@ -0,0 +1,62 @@
+import io
+import os
+from datetime import datetime
+
+from PIL import Image
+
+from models import db
+from models.photos import Photo
+from photo_ingest import backfill_photos, read_ledger
+
+
+def _png(path, size=(40, 30)):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', size, 'red').save(path, 'PNG')
+
+
+def test_backfill_relinks_rows_saved_with_backslashes(app, make_vehicle):
+    upload_folder = app.config['UPLOAD_FOLDER']
+    vehicle = make_vehicle(vehicle_number='KA02MU4493')
+    source = os.path.join(upload_folder, '2025-08', 'KA02MU4493', 'front.png')
+    _png(source)
+    legacy_path = source.replace('/', '\\')
+    db.session.add(Photo(inventory_id=vehicle.id, photo_type='front', filename='front.png', filepath=legacy_path))
+    db.session.commit()
+
+    files, _ = backfill_photos(upload_folder, 2560, 85, 'JPEG', workers=1, log=lambda message: None)
+
+    photo = Photo.query.one()
+    assert files == 1
+    assert photo.filepath == os.path.join(upload_folder, '2025-08', 'KA02MU4493', 'front.jpg')
+    assert photo.filename == 'front.jpg'
+    assert os.path.exists(photo.filepath) and not os.path.exists(source)
+    assert '2025-08/KA02MU4493/front.jpg' in read_ledger(upload_folder)[0]
+
+
+def test_backfill_keeps_originals_no_row_was_moved_off(app):
+    upload_folder = app.config['UPLOAD_FOLDER']
+    source = os.path.join(upload_folder, '2025-08', 'KA01', 'damage.png')
+    _png(source)
+
+    backfill_photos(upload_folder, 2560, 85, 'JPEG', workers=1, log=lambda message: None)
+
+    assert os.path.exists(source)
+    assert os.path.exists(source[:-len('.png')] + '.jpg')
+    # Recorded, so the next run does not pick it up again
+    assert backfill_photos(upload_folder, 2560, 85, 'JPEG', workers=1, log=lambda message: None) == (0, 0)
+
+
+def test_reupload_reuses_row_saved_with_backslashes(app, make_vehicle):
+    vehicle = make_vehicle(vehicle_number='KA02MU4493')
+    folder = os.path.join(app.config['UPLOAD_FOLDER'], datetime.now().strftime('%Y-%m'), 'KA02MU4493')
+    legacy_path = os.path.join(folder, 'front.jpg').replace('/', '\\')
+    db.session.add(Photo(inventory_id=vehicle.id, photo_type='front', filename='front.jpg', filepath=legacy_path))
+    db.session.commit()
+    upload = io.BytesIO()
+    Image.new('RGB', (40, 30), 'blue').save(upload, 'JPEG')
+    upload.seek(0)
+
+    app.test_client().post('/upload_photos/KA02MU4493', data={'front': (upload, 'front.jpg')},
+                           content_type='multipart/form-data')
+
+    assert [photo.filepath for photo in Photo.query] == [legacy_path]
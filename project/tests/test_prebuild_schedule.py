@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pytest
+
+from reports.prebuild import CronSchedule
+
+
+@pytest.mark.parametrize('expression, after, expected', [
+    ('30 6 * * *', datetime(2025, 3, 10, 5, 0), datetime(2025, 3, 10, 6, 30)),
+    ('30 6 * * *', datetime(2025, 3, 10, 6, 30), datetime(2025, 3, 11, 6, 30)),
+    ('30 6 * * *', datetime(2025, 3, 10, 6, 29, 59), datetime(2025, 3, 10, 6, 30)),
+    ('30 6 * * *', datetime(2025, 12, 31, 7, 0), datetime(2026, 1, 1, 6, 30)),
+    ('*/15 * * * *', datetime(2025, 3, 10, 6, 31), datetime(2025, 3, 10, 6, 45)),
+    ('0 9-17/4 * * *', datetime(2025, 3, 10, 13, 0), datetime(2025, 3, 10, 17, 0)),
+    ('0 2 * * 1-5', datetime(2025, 3, 14, 3, 0), datetime(2025, 3, 17, 2, 0)),  # Friday -> Monday
+    ('0 0 * * 7', datetime(2025, 3, 10, 0, 0), datetime(2025, 3, 16, 0, 0)),  # 7 is Sunday
+    ('0 0 29 2 *', datetime(2025, 1, 1), datetime(2028, 2, 29, 0, 0)),
+    # Day of month and day of week both restricted: either one matches
+    ('0 0 1 * 1', datetime(2025, 3, 1, 12, 0), datetime(2025, 3, 3, 0, 0)),
+])
+def test_next_run(expression, after, expected):
+    assert CronSchedule(expression).next_run(after) == expected
+
+
+@pytest.mark.parametrize('expression', ['30 6 * *', '60 * * * *', '0 24 * * *', '0 0 0 * *', '5-1 * * * *'])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_never_matching_expression():
+    with pytest.raises(ValueError):
+        CronSchedule('0 0 31 2 *').next_run(datetime(2025, 1, 1))
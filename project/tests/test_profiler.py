@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+
+from profiler import Profile, recent_profiles
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampled_profile_writes_collapsed_stacks(tmp_path):
+    profile = Profile('sample', interval=0.001)
+    _busy(0.05)
+    profile.stop()
+    name = profile.save(str(tmp_path), {'kind': 'job', 'name': 'test'})
+
+    lines = (tmp_path / name).read_text().splitlines()
+    assert name.endswith('.collapsed') and lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0 and '_busy (' in stack
+    assert recent_profiles(str(tmp_path))[0]['file'] == name
+
+
+def test_prunes_old_profiles(tmp_path):
+    names = []
+    for _ in range(4):
+        profile = Profile('cprofile')
+        profile.stop()
+        names.append(profile.save(str(tmp_path), {'kind': 'job', 'name': 'test'}, keep=2))
+
+    assert sorted(os.listdir(tmp_path)) == sorted(names[2:] + [name + '.json' for name in names[2:]])
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Profile('perf')
+
+
+def test_request_profiled_only_with_token(app, tmp_path):
+    app.config.update(PROFILE_TOKEN='secret', PROFILE_DIR=str(tmp_path / 'profiles'))
+    client = app.test_client()
+
+    client.get('/api/dashboard_stats', headers={'X-Profile': 'wrong'}).close()
+    assert recent_profiles(app.config['PROFILE_DIR']) == []
+
+    client.get('/api/dashboard_stats', headers={'X-Profile': 'secret'}).close()
+    profiles = recent_profiles(app.config['PROFILE_DIR'])
+    assert [(entry['kind'], entry['name'], entry['status']) for entry in profiles] == [
+        ('request', 'GET /api/dashboard_stats', 200)]
+
+    assert client.get('/admin/profiles').status_code == 403
+    assert client.get('/admin/profiles?_profile=secret').status_code == 200
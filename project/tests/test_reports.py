@@ -0,0 +1,40 @@
+from openpyxl import load_workbook
+
+from models import db
+from models.claims import Claim
+from reports.generator import ReportGenerator
+from reports.prebuild import data_fingerprint
+from work_items import seed_work_status
+
+
+def test_all_cars_excel_report(app, make_vehicle, tmp_path):
+    first = make_vehicle(customer_name='Asha')
+    make_vehicle()
+    db.session.add(Claim(inventory_id=first.id, claim_number='CL-1'))
+    db.session.commit()
+
+    filepath = ReportGenerator(str(tmp_path / 'reports')).generate_all_cars_report('excel')
+
+    rows = list(load_workbook(filepath).active.iter_rows(min_row=3, values_only=True))
+    assert rows[0][:3] == ('S.No', 'Vehicle No.', 'Customer')
+    assert [(row[0], row[1], row[5]) for row in rows[1:]] == [(1, 'KA01AB0001', 'CL-1'), (2, 'KA01AB0002', 'N/A')]
+    assert rows[1][2] == 'Asha'
+
+
+def test_fingerprint_moves_with_every_vehicle_write(app, make_vehicle, tmp_path):
+    # No change stamp is written here, so only the change feed's high-water mark can move
+    reports_dir = str(tmp_path / 'unstamped')
+    vehicle = make_vehicle()
+    seed_work_status(vehicle)
+    db.session.commit()
+    before = data_fingerprint(reports_dir)
+    assert data_fingerprint(reports_dir) == before
+
+    vehicle.work_status.work_items[0].is_completed = True
+    db.session.commit()
+    after_item = data_fingerprint(reports_dir)
+    assert after_item != before
+
+    db.session.add(Claim(inventory_id=vehicle.id, claim_number='CL-1'))
+    db.session.commit()
+    assert data_fingerprint(reports_dir) not in (before, after_item)
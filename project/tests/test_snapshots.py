@@ -0,0 +1,49 @@
+import sqlite3
+
+from models import db
+from models.claims import Claim
+from snapshots import load_vehicle_snapshot, snapshot_cache
+
+
+def _other_worker_commits(app, sql, **params):
+    """Write straight to the database file, as another gunicorn worker's commit would"""
+    conn = sqlite3.connect(db.engine.url.database)
+    with conn:
+        conn.execute(sql, params)
+        conn.execute('UPDATE inventory SET version = version + 1 WHERE id = :id', params)
+    conn.close()
+
+
+def test_snapshot_is_cached_per_version(make_vehicle):
+    vehicle = make_vehicle()
+    first = load_vehicle_snapshot(vehicle.vehicle_number)
+    assert load_vehicle_snapshot(vehicle.vehicle_number) is first
+
+    db.session.add(Claim(inventory_id=vehicle.id, claim_number='CL-1'))
+    db.session.commit()
+    assert load_vehicle_snapshot(vehicle.vehicle_number).claim.claim_number == 'CL-1'
+
+
+def test_change_committed_elsewhere_is_visible(app, make_vehicle):
+    vehicle = make_vehicle()
+    db.session.add(Claim(inventory_id=vehicle.id, claim_number='OLD'))
+    db.session.commit()
+    assert load_vehicle_snapshot(vehicle.vehicle_number).claim.claim_number == 'OLD'
+
+    # This process's cache still holds the old snapshot; no local invalidation happens
+    _other_worker_commits(app, 'UPDATE claims SET claim_number = :number WHERE inventory_id = :id',
+                          number='NEW', id=vehicle.id)
+    db.session.expire_all()
+
+    assert len(snapshot_cache) >= 1
+    assert load_vehicle_snapshot(vehicle.vehicle_number).claim.claim_number == 'NEW'
+
+
+def test_deleted_vehicle_is_not_served_from_cache(make_vehicle):
+    vehicle = make_vehicle()
+    number = vehicle.vehicle_number
+    assert load_vehicle_snapshot(number) is not None
+    db.session.delete(vehicle)
+    db.session.commit()
+
+    assert load_vehicle_snapshot(number) is None
@@ -0,0 +1,41 @@
+from models import db
+from models.work_status import WorkItem, WorkStatus
+from work_items import DEFAULT_WORK_ITEMS, seed_work_status, set_template
+
+
+def _items(vehicle):
+    return [item.item_name for item in
+            WorkItem.query.join(WorkStatus).filter(WorkStatus.inventory_id == vehicle.id).order_by(WorkItem.id)]
+
+
+def test_seed_creates_default_checklist(make_vehicle):
+    vehicle = make_vehicle()
+    assert seed_work_status(vehicle) is not None
+    db.session.commit()
+    assert _items(vehicle) == DEFAULT_WORK_ITEMS
+
+
+def test_seed_is_idempotent(make_vehicle):
+    vehicle = make_vehicle()
+    first = seed_work_status(vehicle)
+    db.session.commit()
+
+    assert seed_work_status(vehicle) is None
+    assert seed_work_status(vehicle) is None
+    db.session.commit()
+
+    assert WorkStatus.query.filter_by(inventory_id=vehicle.id).one().id == first
+    assert _items(vehicle) == DEFAULT_WORK_ITEMS
+
+
+def test_seed_uses_most_specific_template(make_vehicle):
+    set_template(['Dent repair', 'Washing'], insurance_name='Acme')
+    set_template(['Bumper'], insurance_name='Acme', vehicle_name='Swift')
+    swift = make_vehicle(insurance_name='acme ', vehicle_name='Swift')
+    other = make_vehicle(insurance_name='Acme', vehicle_name='Alto')
+    seed_work_status(swift)
+    seed_work_status(other)
+    db.session.commit()
+
+    assert _items(swift) == ['Bumper']
+    assert _items(other) == ['Dent repair', 'Washing']
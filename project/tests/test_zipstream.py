@@ -0,0 +1,54 @@
+import io
+import os
+import zipfile
+
+from models import db
+from models.photos import Photo
+from zipstream import stream_zip
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+    return str(path)
+
+
+def test_round_trip(tmp_path):
+    photo = _write(tmp_path / 'front.jpg', os.urandom(200_000))
+    notes = _write(tmp_path / 'notes.txt', b'dent on the left door\n' * 5000)
+    empty = _write(tmp_path / 'empty.txt', b'')
+    sizes = []
+
+    chunks = list(stream_zip([('front/front.jpg', photo), ('notes.txt', notes), ('empty.txt', empty)],
+                             chunk_size=4096, on_file=lambda path, size: sizes.append(size)))
+
+    assert len(chunks) > 3
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ['front/front.jpg', 'notes.txt', 'empty.txt']
+        assert archive.getinfo('front/front.jpg').compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo('notes.txt').compress_type == zipfile.ZIP_DEFLATED
+        for name, path in (('front/front.jpg', photo), ('notes.txt', notes), ('empty.txt', empty)):
+            with open(path, 'rb') as file:
+                assert archive.read(name) == file.read()
+    assert sizes == [200_000, 110_000, 0]
+
+
+def test_photo_bundle(app, make_vehicle, tmp_path):
+    vehicle = make_vehicle()
+    for photo_type, folder in (('front', 'a'), ('front', 'b'), ('rear', 'a')):
+        path = _write(tmp_path / 'photos' / folder / f'{photo_type}.jpg', photo_type.encode() + folder.encode())
+        db.session.add(Photo(inventory_id=vehicle.id, photo_type=photo_type, filename=f'{photo_type}.jpg',
+                             filepath=path))
+    db.session.commit()
+
+    client = app.test_client()
+    response = client.get(f'/photos/{vehicle.vehicle_number}/bundle.zip?type=front')
+
+    assert response.status_code == 200 and response.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        names = archive.namelist()
+        assert names[0] == 'front/front.jpg' and names[1].startswith('front/') and len(names) == 2
+        assert sorted(archive.read(name) for name in names) == [b'fronta', b'frontb']
+    assert client.get(f'/photos/{vehicle.vehicle_number}/bundle.zip?type=damage').status_code == 404
@@ -0,0 +1,67 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+# Downscaled copies of photos, keyed by source path, mtime, size and target
+# size, so a photo is decoded at full resolution at most once per size.
+
+
+def cache_path(cache_dir, source, max_px):
+    stat = os.stat(source)
+    key = hashlib.sha1(f'{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}:{max_px}'.encode()).hexdigest()
+    return os.path.join(cache_dir, key[:2], f'{key}.jpg')
+
+
+def downscale(source, target, max_px, quality=80):
+    """Write a JPEG of source no larger than max_px on either side and return its size"""
+    with Image.open(source) as image:
+        # Let JPEG decode straight to the smallest DCT scale still covering the target size
+        scale = min(1.0, max_px / max(image.size))
+        image.draft('RGB', (round(image.width * scale), round(image.height * scale)))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((max_px, max_px), Image.LANCZOS)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f'{target}.{os.getpid()}.tmp'
+        image.save(temp_path, 'JPEG', quality=quality, optimize=True)
+        os.replace(temp_path, target)
+        return image.size
+
+
+def _downscale_job(source, target, max_px):
+    try:
+        return source, target, downscale(source, target, max_px)
+    except (OSError, ValueError):
+        return source, None, None
+
+
+def downscale_many(sources, cache_dir, max_px=800, workers=None):
+    """Return {source: (cached_path, width, height)}, decoding cache misses in a process pool
+
+    Sources that are missing or cannot be decoded are left out.
+    """
+    results = {}
+    pending = []
+    for source in dict.fromkeys(sources):
+        try:
+            target = cache_path(cache_dir, source, max_px)
+        except OSError:
+            continue
+        if os.path.exists(target):
+            with Image.open(target) as cached:
+                results[source] = (target, *cached.size)
+        else:
+            pending.append((source, target))
+
+    if len(pending) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending))) as pool:
+            jobs = pool.map(_downscale_job, *zip(*pending), [max_px] * len(pending))
+            done = list(jobs)
+    else:
+        done = [_downscale_job(source, target, max_px) for source, target in pending]
+
+    for source, target, size in done:
+        if target:
+            results[source] = (target, *size)
+    return results
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db
+from models.work_status import WorkStatus, WorkItem, WorkItemTemplate
+from snapshots import mark_vehicle_changed
+
+DEFAULT_WORK_ITEMS = ['Tinkering', 'Painting', 'Fitting', 'Polish', 'Washing']
+
+
+def _matches(template_value, vehicle_value):
+    return (template_value or '').strip().casefold() == (vehicle_value or '').strip().casefold()
+
+
+def template_items_for(vehicle):
+    """Return the checklist item names that apply to a vehicle
+
+    The most specific template set wins: insurer and vehicle type, then
+    insurer only, then vehicle type only, then the shop-wide default.
+    """
+    groups = {}
+    for template in WorkItemTemplate.query.order_by(WorkItemTemplate.position.asc(), WorkItemTemplate.id.asc()):
+        if template.insurance_name and not _matches(template.insurance_name, vehicle.insurance_name):
+            continue
+        if template.vehicle_name and not _matches(template.vehicle_name, vehicle.vehicle_name):
+            continue
+        specificity = (bool(template.insurance_name), bool(template.vehicle_name))
+        groups.setdefault(specificity, []).append(template.item_name)
+
+    for specificity in [(True, True), (True, False), (False, True), (False, False)]:
+        if groups.get(specificity):
+            return groups[specificity]
+
+    return current_app.config.get('DEFAULT_WORK_ITEMS', DEFAULT_WORK_ITEMS)
+
+
+def seed_work_status(vehicle):
+    """Create a vehicle's work status and default checklist if it has none
+
+    Safe to call repeatedly or concurrently: the work status row is inserted
+    with ON CONFLICT DO NOTHING and the checklist is only seeded, in a single
+    bulk insert, by the caller whose insert actually created it. The caller
+    commits, so seeding joins the surrounding transaction.
+    """
+    if vehicle.id is None:
+        db.session.flush()
+    result = db.session.execute(
+        sqlite_insert(WorkStatus)
+        .values(inventory_id=vehicle.id, created_date=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=['inventory_id'])
+        .returning(WorkStatus.id)
+    )
+    work_status_id = result.scalar()
+    if work_status_id is None:
+        return None
+
+    items = [
+        {'work_status_id': work_status_id, 'item_name': item_name, 'is_completed': False}
+        for item_name in template_items_for(vehicle)
+    ]
+    if items:
+        db.session.execute(insert(WorkItem), items)
+
+    mark_vehicle_changed(vehicle.id)
+    return work_status_id
+
+
+def set_template(item_names, insurance_name=None, vehicle_name=None):
+    """Replace the template set for an insurer / vehicle type combination"""
+    WorkItemTemplate.query.filter_by(insurance_name=insurance_name or None,
+                                     vehicle_name=vehicle_name or None).delete()
+    if item_names:
+        db.session.execute(insert(WorkItemTemplate), [
+            {'item_name': item_name, 'position': position,
+             'insurance_name': insurance_name or None, 'vehicle_name': vehicle_name or None}
+            for position, item_name in enumerate(item_names)
+        ])
+    db.session.commit()
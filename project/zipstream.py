@@ -0,0 +1,68 @@
+import io
+import os
+import zipfile
+from datetime import datetime
+
+# Files that are already compressed gain nothing from deflate; they are
+# stored as-is so bundling costs no CPU beyond the CRC.
+PRECOMPRESSED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'heic', 'zip', 'pdf', 'xlsx'}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer that ZipFile writes into and the generator drains
+
+    Because it cannot seek, ZipFile writes each entry's sizes and CRC in a
+    data descriptor after the data instead of going back to patch the header.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _zip_info(arcname, path):
+    stat = os.stat(path)
+    modified = datetime.fromtimestamp(stat.st_mtime)
+    info = zipfile.ZipInfo(arcname, date_time=max(modified, datetime(1980, 1, 1)).timetuple()[:6])
+    info.file_size = stat.st_size  # lets ZipFile pick zip64 up front for very large files
+    extension = arcname.rsplit('.', 1)[-1].lower()
+    info.compress_type = zipfile.ZIP_STORED if extension in PRECOMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    return info
+
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE, on_file=None):
+    """Yield a ZIP archive of (arcname, path) entries chunk by chunk
+
+    Nothing is staged on disk and at most one chunk per entry is held in
+    memory, so the first bytes go out as soon as the first file is opened.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for arcname, path in entries:
+            info = _zip_info(arcname, path)
+            with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            if on_file:
+                on_file(path, info.file_size)
+            yield sink.drain()
+    yield sink.drain()